@@ -1,6 +1,5 @@
 import os
 import time
-from multiprocessing import Pool
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -8,7 +7,7 @@ import seaborn as sns
 import pandas as pd
 
 from pabutools.election import (
-    parse_pabulib,
+    load_pabulib_corpus,
     SatisfactionMultiProfile,
     Cost_Sat,
     SatisfactionProfile,
@@ -17,9 +16,8 @@ from pabutools.rules import greedy_utilitarian_welfare
 from pabutools.rules.maxwelfare import max_additive_utilitarian_welfare
 
 
-def multiprofile_analysis_pool(file):
-    print("File {}".format(file))
-    instance, profile = parse_pabulib(file)
+def multiprofile_analysis(instance, profile):
+    print("File {}".format(instance.file_name))
     multiprofile = profile.as_multiprofile()
     data = {}
     data["file"] = instance.file_name
@@ -40,16 +38,16 @@ def multiprofile_analysis_write_data(folder_path, csv_file="multiprofile_gain.cs
     files = []
     for file in os.listdir(os.path.join(folder_path)):
         if file.endswith(".pb"):
-            files.append(os.path.join("Pabulib", "all_app", file))
+            files.append(os.path.join(folder_path, file))
 
     print("A total of {} element will be computed".format(len(files)))
 
     with open(os.path.join("csv", csv_file), "w"):
         pass
 
-    pool = Pool()
     csv_keys = None
-    for line in pool.imap_unordered(multiprofile_analysis_pool, files):
+    for _, instance, profile in load_pabulib_corpus(files):
+        line = multiprofile_analysis(instance, profile)
         with open(os.path.join("csv", csv_file), "a") as f:
             if csv_keys is None:
                 csv_keys = tuple(line.keys())
@@ -1,8 +1,6 @@
 import os
 import time
 
-from multiprocessing import Pool
-
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -16,13 +14,11 @@ from analysis.rules import (
     mes_cost_res,
     mes_cost_res_ex,
 )
-from pabutools.election import parse_pabulib
+from pabutools.election import load_pabulib_corpus
 
 
-def runtime_analysis_pool(file_rule):
-    file, rule = file_rule
-    print("File {} for rule {}".format(file, rule.__name__))
-    instance, prof = parse_pabulib(file)
+def runtime_analysis_rule(instance, prof, rule):
+    print("File {} for rule {}".format(instance.file_name, rule.__name__))
 
     res = []
     for profile in [prof, prof.as_multiprofile()]:
@@ -45,26 +41,27 @@ def runtime_analysis_pool(file_rule):
 
 
 def runtime_analysis_write_data(folder_path, rules, csv_file="runtime.csv"):
-    file_rule_set = []
-    for file in os.listdir(os.path.join(folder_path)):
-        if file.endswith(".pb"):
-            for rule in rules:
-                file_rule_set.append((os.path.join(folder_path, file), rule))
+    files = [
+        os.path.join(folder_path, file)
+        for file in os.listdir(folder_path)
+        if file.endswith(".pb")
+    ]
 
-    print("A total of {} element will be computed".format(len(file_rule_set) * 2))
+    print("A total of {} element will be computed".format(len(files) * len(rules) * 2))
 
     with open(os.path.join("csv", csv_file), "w"):
         pass
 
-    pool = Pool()
+    # The files are parsed in parallel, the rules are then run one after the other to measure their runtime
     csv_keys = None
-    for res in pool.imap_unordered(runtime_analysis_pool, file_rule_set):
-        for line in res:
-            with open(os.path.join("csv", csv_file), "a") as f:
-                if csv_keys is None:
-                    csv_keys = tuple(line.keys())
-                    f.write(";".join((str(key) for key in csv_keys)) + "\n")
-                f.write(";".join((str(line[key]) for key in csv_keys)) + "\n")
+    for _, instance, prof in load_pabulib_corpus(files):
+        for rule in rules:
+            for line in runtime_analysis_rule(instance, prof, rule):
+                with open(os.path.join("csv", csv_file), "a") as f:
+                    if csv_keys is None:
+                        csv_keys = tuple(line.keys())
+                        f.write(";".join((str(key) for key in csv_keys)) + "\n")
+                    f.write(";".join((str(line[key]) for key in csv_keys)) + "\n")
 
 
 def runtime_analysis_plot(csv_file="runtime.csv", xaxis="num_projects_cat"):
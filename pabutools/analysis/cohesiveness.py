@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from collections.abc import Collection
 
+import numpy as np
+
 from pabutools.utils import Numeric
 
 from pabutools.election import (
@@ -13,6 +15,7 @@ from pabutools.election import (
     AbstractCardinalBallot,
     AbstractApprovalBallot,
     AbstractProfile,
+    BitsetApprovalProfile,
 )
 from pabutools.utils import powerset
 
@@ -95,17 +98,25 @@ def cohesive_groups(instance: Instance, profile: AbstractProfile, projects=None)
 
 
 def maximal_cohesive_for_projects_approval(
-    instance: Instance, profile: AbstractApprovalProfile, projects: Collection[Project]
+    instance: Instance,
+    profile: AbstractApprovalProfile,
+    projects: Collection[Project],
+    bitset_profile: BitsetApprovalProfile | None = None,
 ) -> list[AbstractApprovalBallot] | None:
-    res = []
-    for ballot in profile:
-        all_in = True
-        for p in projects:
-            if p not in ballot:
-                all_in = False
-                break
-        if all_in:
-            res.append(ballot)
+    if bitset_profile is not None:
+        # All the ballots approving of the projects are found at once on the bitsets
+        supporters = np.flatnonzero(bitset_profile.supporters(projects))
+        res = [bitset_profile.ballots[i] for i in supporters]
+    else:
+        res = []
+        for ballot in profile:
+            all_in = True
+            for p in projects:
+                if p not in ballot:
+                    all_in = False
+                    break
+            if all_in:
+                res.append(ballot)
     if len(res) > 0 and is_large_enough(
         len(res), profile.num_ballots(), total_cost(projects), instance.budget_limit
     ):
@@ -121,8 +132,13 @@ def maximal_cohesive_groups(
     if projects is None:
         projects = instance
     res = set()
+    bitset_profile = None
+    if isinstance(profile, AbstractApprovalProfile):
+        bitset_profile = BitsetApprovalProfile(profile, instance)
     for project_set in powerset(projects):
-        group = maximal_cohesive_for_projects_approval(instance, profile, project_set)
+        group = maximal_cohesive_for_projects_approval(
+            instance, profile, project_set, bitset_profile
+        )
         if group:
             if isinstance(profile, AbstractApprovalProfile):
                 if is_cohesive_approval(instance, profile, project_set, group):
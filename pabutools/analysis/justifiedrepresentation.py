@@ -1,7 +1,14 @@
+"""
+Justified representation axioms. The violations are searched for with mixed integer linear programs solved with the
+`mip` Python package, rather than by enumerating all the groups of voters and all the sets of projects.
+"""
+
 from __future__ import annotations
 
 from collections.abc import Collection, Callable, Iterable
 
+from mip import Model, xsum, BINARY, CONTINUOUS, INTEGER, OptimizationStatus
+
 from pabutools.utils import Numeric
 
 from pabutools.analysis.cohesiveness import cohesive_groups, is_large_enough
@@ -15,9 +22,18 @@ from pabutools.election import (
     ApprovalBallot,
     total_cost,
     AbstractProfile,
+    AbstractApprovalBallot,
+    AbstractCardinalBallot,
+    AdditiveSatisfaction,
 )
 from pabutools.utils import powerset
 
+VIOLATION_TOLERANCE = 1e-4
+"""
+Margin used in the mixed integer linear programs to encode the strict inequalities defining the violations. The
+candidate violations found by the programs are always checked exactly before being returned.
+"""
+
 
 def is_in_core(
     instance: Instance,
@@ -56,6 +72,395 @@ def is_in_core(
     return True
 
 
+def _voter_groups(
+    profile: AbstractProfile, key_func: Callable
+) -> tuple[list, list[list[AbstractBallot]], list[int]]:
+    # Ballots with the same content are represented by a single voter in the programs
+    index_of_key = {}
+    keys = []
+    ballots = []
+    weights = []
+    for ballot in profile:
+        key = key_func(ballot)
+        index = index_of_key.get(key)
+        if index is None:
+            index_of_key[key] = len(keys)
+            keys.append(key)
+            ballots.append([ballot])
+            weights.append(profile.multiplicity(ballot))
+        else:
+            ballots[index].append(ballot)
+            weights[index] += profile.multiplicity(ballot)
+    return keys, ballots, weights
+
+
+def _cohesion_model(
+    instance: Instance,
+    profile: AbstractProfile,
+    projects: list[Project],
+    weights: list[int],
+) -> tuple[Model, dict[Project, object], list]:
+    # Binary variables for the project set (y) and the group of voters (x), with the group large enough
+    model = Model()
+    model.verbose = 1
+    # CBC can crash when re-solving a presolved model to which cuts have been added
+    model.preprocess = -1
+    y = {p: model.add_var(var_type=BINARY) for p in projects}
+    x = [model.add_var(var_type=BINARY) for _ in weights]
+    model += profile.num_ballots() * xsum(
+        float(p.cost) * y[p] for p in projects
+    ) <= float(instance.budget_limit) * xsum(w * x_k for w, x_k in zip(weights, x))
+    model += xsum(x) >= 1
+    # The size of the project set, fixed to each possible value in turn when solving
+    model.size = model.add_var(var_type=INTEGER, lb=1, ub=max(len(projects), 1))
+    model += xsum(y.values()) == model.size
+    return model, y, x
+
+
+def _approve_all_constraints(
+    model: Model, projects: list[Project], y: dict, keys: list[frozenset], x: list
+) -> None:
+    # The voters in x approve of all the projects in y
+    for p in projects:
+        outsiders = [x_k for key, x_k in zip(keys, x) if p not in key]
+        if outsiders:
+            model += xsum(outsiders) <= len(outsiders) * (1 - y[p])
+
+
+def _score_constraints(
+    model: Model, projects: list[Project], y: dict, keys: list[frozenset], x: list
+) -> dict:
+    # The expression a[p] is the minimum score of the voters in x for the project p if p is in y, 0 otherwise. It
+    # is encoded with one binary variable per distinct score, indicating whether the minimum score reaches it.
+    scores = [dict(key) for key in keys]
+    a = {}
+    for p in projects:
+        levels = sorted({score.get(p, 0) for score in scores} - {0})
+        steps = []
+        previous_level, previous_var = 0, y[p]
+        for level in levels:
+            v = model.add_var(var_type=BINARY)
+            model += v <= previous_var
+            for score, x_k in zip(scores, x):
+                if score.get(p, 0) < level:
+                    model += x_k + v <= 1
+            steps.append(float(level - previous_level) * v)
+            previous_level, previous_var = level, v
+        a[p] = xsum(steps)
+    return a
+
+
+def _solve_with_cuts(model: Model, variables: list, check: Callable):
+    # The project sets are looked for by increasing size. The candidates are checked exactly, the ones that are not
+    # violations are cut off and the model is solved again.
+    if model.num_cols == 0:
+        return None
+    for size in range(1, int(model.size.ub) + 1):
+        model.size.lb = size
+        model.size.ub = size
+        while True:
+            status = model.optimize(max_solutions=1)
+            if status not in (OptimizationStatus.OPTIMAL, OptimizationStatus.FEASIBLE):
+                break
+            violation = check()
+            if violation is not None:
+                return violation
+            selected = [v.x >= 0.5 for v in variables]
+            model += (
+                xsum(1 - v for v, sel in zip(variables, selected) if sel)
+                + xsum(v for v, sel in zip(variables, selected) if not sel)
+                >= 1
+            )
+    return None
+
+
+def _candidate_projects(instance: Instance, keys: Iterable) -> list[Project]:
+    approved = set().union(*keys)
+    return sorted(
+        p for p in instance if p in approved and p.cost <= instance.budget_limit
+    )
+
+
+def _is_ejr_unsatisfied(
+    sat: SatisfactionMeasure,
+    budget_allocation: Collection[Project],
+    project_set: Collection[Project],
+    threshold: Numeric,
+    up_to_func: Callable[[Iterable[Numeric]], Numeric] | None,
+) -> bool:
+    surplus = 0
+    if up_to_func is not None:
+        surplus = up_to_func(
+            sat.sat_project(p) for p in project_set if p not in budget_allocation
+        )
+    return sat.sat(budget_allocation) + surplus < threshold
+
+
+def find_strong_EJR_violation_approval(
+    instance: Instance,
+    profile: AbstractApprovalProfile,
+    sat_class: type[SatisfactionMeasure],
+    budget_allocation: Collection[Project],
+) -> tuple[list[AbstractApprovalBallot], list[Project]] | None:
+    """
+    Looks for a violation of strong EJR for the given instance and the given profile of approval ballots, that is, a
+    cohesive group of voters together with a set of projects such that some voter of the group enjoys less
+    satisfaction from the budget allocation than from the set of projects.
+
+    For additive satisfaction measures, the violation is searched for with a mixed integer linear program: the group
+    of all the voters approving of the set of projects is the largest one, so only the set of projects and a voter
+    enjoying less satisfaction than from it are looked for. Otherwise, all the cohesive groups are enumerated.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.approvalprofile.AbstractApprovalProfile`
+            The profile.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction measure used.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.approvalballot.AbstractApprovalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    if not issubclass(sat_class, AdditiveSatisfaction):
+        for group, project_set in cohesive_groups(instance, profile):
+            for ballot in group:
+                sat = sat_class(instance, profile, ballot)
+                if sat.sat(budget_allocation) < sat.sat(project_set):
+                    return list(group), list(project_set)
+        return None
+
+    keys, ballots, weights = _voter_groups(profile, frozenset)
+    sats = [sat_class(instance, profile, group[0]) for group in ballots]
+    projects = _candidate_projects(instance, keys)
+    model, y, x = _cohesion_model(instance, profile, projects, weights)
+    _approve_all_constraints(model, projects, y, keys, x)
+    unsatisfied = [model.add_var(var_type=BINARY) for _ in keys]
+    model += xsum(unsatisfied) == 1
+    for k, key in enumerate(keys):
+        model += unsatisfied[k] <= x[k]
+        model += xsum(
+            float(sats[k].sat_project(p)) * y[p] for p in projects if p in key
+        ) >= (float(sats[k].sat(budget_allocation)) + VIOLATION_TOLERANCE) * (
+            unsatisfied[k]
+        )
+
+    def check():
+        project_set = [p for p in projects if y[p].x >= 0.5]
+        approvers = [k for k, key in enumerate(keys) if key.issuperset(project_set)]
+        if not is_large_enough(
+            sum(weights[k] for k in approvers),
+            profile.num_ballots(),
+            total_cost(project_set),
+            instance.budget_limit,
+        ):
+            return None
+        for k in approvers:
+            if sats[k].sat(budget_allocation) < sats[k].sat(project_set):
+                return [b for k in approvers for b in ballots[k]], project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()), check)
+
+
+def find_EJR_violation_approval(
+    instance: Instance,
+    profile: AbstractApprovalProfile,
+    sat_class: type[SatisfactionMeasure],
+    budget_allocation: Collection[Project],
+    up_to_func: Callable[[Iterable[Numeric]], Numeric] | None = None,
+) -> tuple[list[AbstractApprovalBallot], list[Project]] | None:
+    """
+    Looks for a violation of EJR for the given instance and the given profile of approval ballots, that is, a
+    cohesive group of voters together with a set of projects such that all the voters of the group enjoy less
+    satisfaction from the budget allocation (plus the value of `up_to_func` over the projects of the set that have
+    not been selected) than from the set of projects.
+
+    For additive satisfaction measures, the set of projects is searched for with a mixed integer linear program.
+    Since the condition on the voters does not depend on the other members of the group, a set of projects leads to
+    a violation if and only if the group of all the voters approving of it and not enjoying enough satisfaction is
+    large enough. The program only requires the voters to enjoy less satisfaction from the budget allocation than from
+    the set of projects, which is necessary as long as `up_to_func` is non-negative. Each set of projects it returns
+    is then checked exactly, and cut off from the program if it is not a violation. For other satisfaction measures,
+    all the cohesive groups are enumerated.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.approvalprofile.AbstractApprovalProfile`
+            The profile.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction measure used.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+        up_to_func : Callable[[Iterable[Numeric]], Numeric], optional
+            The function applied to the satisfaction of the projects of the set that have not been selected, whose
+            value is added to the satisfaction of the voters. Should be non-negative.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.approvalballot.AbstractApprovalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    if not issubclass(sat_class, AdditiveSatisfaction):
+        for group, project_set in cohesive_groups(instance, profile):
+            if all(
+                _is_ejr_unsatisfied(
+                    sat,
+                    budget_allocation,
+                    project_set,
+                    sat.sat(project_set),
+                    up_to_func,
+                )
+                for sat in (sat_class(instance, profile, b) for b in group)
+            ):
+                return list(group), list(project_set)
+        return None
+
+    keys, ballots, weights = _voter_groups(profile, frozenset)
+    sats = [sat_class(instance, profile, group[0]) for group in ballots]
+    # Voters enjoying as much satisfaction from the budget allocation as from all the projects they approve of
+    # cannot be part of a violation
+    candidates = [
+        k
+        for k, key in enumerate(keys)
+        if sats[k].sat(budget_allocation)
+        < sats[k].sat([p for p in key if p.cost <= instance.budget_limit])
+    ]
+    keys = [keys[k] for k in candidates]
+    ballots = [ballots[k] for k in candidates]
+    weights = [weights[k] for k in candidates]
+    sats = [sats[k] for k in candidates]
+    projects = _candidate_projects(instance, keys)
+    model, y, x = _cohesion_model(instance, profile, projects, weights)
+    _approve_all_constraints(model, projects, y, keys, x)
+    for k, key in enumerate(keys):
+        model += (
+            xsum(float(sats[k].sat_project(p)) * y[p] for p in projects if p in key)
+            >= (float(sats[k].sat(budget_allocation)) + VIOLATION_TOLERANCE) * x[k]
+        )
+
+    def check():
+        project_set = [p for p in projects if y[p].x >= 0.5]
+        group = [
+            k
+            for k, key in enumerate(keys)
+            if key.issuperset(project_set)
+            and _is_ejr_unsatisfied(
+                sats[k],
+                budget_allocation,
+                project_set,
+                sats[k].sat(project_set),
+                up_to_func,
+            )
+        ]
+        if group and is_large_enough(
+            sum(weights[k] for k in group),
+            profile.num_ballots(),
+            total_cost(project_set),
+            instance.budget_limit,
+        ):
+            return [b for k in group for b in ballots[k]], project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()), check)
+
+
+def find_PJR_violation_approval(
+    instance: Instance,
+    profile: AbstractApprovalProfile,
+    sat_class: type[SatisfactionMeasure],
+    budget_allocation: Collection[Project],
+    up_to_func: Callable[[Iterable[Numeric]], Numeric] | None = None,
+) -> tuple[list[AbstractApprovalBallot], list[Project]] | None:
+    """
+    Looks for a violation of PJR for the given instance and the given profile of approval ballots, that is, a
+    cohesive group of voters together with a set of projects such that the selected projects approved by at least one
+    voter of the group (plus the value of `up_to_func` over the projects of the set that have not been selected) bring
+    less satisfaction than the set of projects, both measured for a voter approving of all the projects.
+
+    For additive satisfaction measures, the violation is searched for with a mixed integer linear program over the
+    group, the set of projects, and the selected projects approved by the group. The program ignores `up_to_func`,
+    which is fine as long as it is non-negative: each candidate is checked exactly, and the combinations of a set of
+    projects and of selected projects approved by the group that are not violations are cut off from the program. For
+    other satisfaction measures, all the cohesive groups are enumerated.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.approvalprofile.AbstractApprovalProfile`
+            The profile.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction measure used.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+        up_to_func : Callable[[Iterable[Numeric]], Numeric], optional
+            The function applied to the satisfaction of the projects of the set that have not been selected, whose
+            value is added to the satisfaction of the group. Should be non-negative.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.approvalballot.AbstractApprovalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    sat = sat_class(instance, profile, ApprovalBallot(instance))
+
+    def is_violation(group, project_set):
+        group_approved = {p for p in budget_allocation if any(p in b for b in group)}
+        surplus = 0
+        if up_to_func is not None:
+            surplus = up_to_func(
+                sat.sat_project(p) for p in project_set if p not in budget_allocation
+            )
+        return sat.sat(group_approved) + surplus < sat.sat(project_set)
+
+    if not issubclass(sat_class, AdditiveSatisfaction):
+        for group, project_set in cohesive_groups(instance, profile):
+            if is_violation(group, project_set):
+                return list(group), list(project_set)
+        return None
+
+    keys, ballots, weights = _voter_groups(profile, frozenset)
+    projects = _candidate_projects(instance, keys)
+    model, y, x = _cohesion_model(instance, profile, projects, weights)
+    _approve_all_constraints(model, projects, y, keys, x)
+    # The variable z[p] is 1 if the selected project p is approved by a voter of the group
+    z = {}
+    for p in sorted(set(budget_allocation)):
+        supporters = [x_k for key, x_k in zip(keys, x) if p in key]
+        if not supporters:
+            continue
+        z[p] = model.add_var(var_type=BINARY)
+        for x_k in supporters:
+            model += x_k <= z[p]
+    model += xsum(
+        float(sat.sat_project(p)) * z[p] for p in z
+    ) + VIOLATION_TOLERANCE <= xsum(float(sat.sat_project(p)) * y[p] for p in projects)
+
+    def check():
+        project_set = [p for p in projects if y[p].x >= 0.5]
+        group = [k for k, x_k in enumerate(x) if x_k.x >= 0.5]
+        if is_large_enough(
+            sum(weights[k] for k in group),
+            profile.num_ballots(),
+            total_cost(project_set),
+            instance.budget_limit,
+        ):
+            group = [b for k in group for b in ballots[k]]
+            if is_violation(group, project_set):
+                return group, project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()) + list(z.values()), check)
+
+
 def is_strong_EJR_approval(
     instance: Instance,
     profile: AbstractApprovalProfile,
@@ -64,18 +469,14 @@ def is_strong_EJR_approval(
 ) -> bool:
     """
     Test if a budget allocation satisfies strong EJR for the given instance and the given profile of
-    approval ballots.
-    """
-    for group, project_set in cohesive_groups(instance, profile):
-        all_agents_sat = True
-        for ballot in group:
-            sat = sat_class(instance, profile, ballot)
-            if sat.sat(budget_allocation) < sat.sat(project_set):
-                all_agents_sat = False
-                break
-        if not all_agents_sat:
-            return False
-    return True
+    approval ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_strong_EJR_violation_approval`.
+    """
+    return (
+        find_strong_EJR_violation_approval(
+            instance, profile, sat_class, budget_allocation
+        )
+        is None
+    )
 
 
 def is_EJR_approval(
@@ -87,25 +488,14 @@ def is_EJR_approval(
 ) -> bool:
     """
     Test if a budget allocation satisfies EJR for the given instance and the given profile of
-    approval ballots.
-    """
-    for group, project_set in cohesive_groups(instance, profile):
-        one_agent_sat = False
-        for ballot in group:
-            sat = sat_class(instance, profile, ballot)
-            surplus = 0
-            if up_to_func is not None:
-                surplus = up_to_func(
-                    sat.sat_project(p)
-                    for p in project_set
-                    if p not in budget_allocation
-                )
-            if sat.sat(budget_allocation) + surplus >= sat.sat(project_set):
-                one_agent_sat = True
-                break
-        if not one_agent_sat:
-            return False
-    return True
+    approval ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_EJR_violation_approval`.
+    """
+    return (
+        find_EJR_violation_approval(
+            instance, profile, sat_class, budget_allocation, up_to_func
+        )
+        is None
+    )
 
 
 def is_EJR_any_approval(
@@ -155,21 +545,14 @@ def is_PJR_approval(
 ) -> bool:
     """
     Test if a budget allocation satisfies PJR for the given instance and the given profile of
-    approval ballots.
+    approval ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_PJR_violation_approval`.
     """
-    for group, project_set in cohesive_groups(instance, profile):
-        sat = sat_class(instance, profile, ApprovalBallot(instance))
-        threshold = sat.sat(project_set)
-        group_approved = {p for p in budget_allocation if any(p in b for b in group)}
-        surplus = 0
-        if up_to_func is not None:
-            surplus = up_to_func(
-                sat.sat_project(p) for p in project_set if p not in budget_allocation
-            )
-        group_sat = sat.sat(group_approved) + surplus
-        if group_sat < threshold:
-            return False
-    return True
+    return (
+        find_PJR_violation_approval(
+            instance, profile, sat_class, budget_allocation, up_to_func
+        )
+        is None
+    )
 
 
 def is_PJR_any_approval(
@@ -210,6 +593,256 @@ def is_PJR_one_approval(
     )
 
 
+def _cardinal_scores(group: Collection[AbstractCardinalBallot], p: Project) -> list:
+    return [b.get(p, 0) for b in group]
+
+
+def _cardinal_model(
+    instance: Instance,
+    profile: AbstractCardinalProfile,
+    sat_class: type[SatisfactionMeasure],
+    budget_allocation: Collection[Project],
+    only_unsatisfiable: bool,
+):
+    keys, ballots, weights = _voter_groups(profile, lambda b: frozenset(b.items()))
+    sats = [sat_class(instance, profile, group[0]) for group in ballots]
+    allocation_sats = [float(sat.sat(budget_allocation)) for sat in sats]
+    if only_unsatisfiable:
+        # Voters whose satisfaction is at least the sum of their scores cannot be part of a violation
+        candidates = [
+            k
+            for k, key in enumerate(keys)
+            if allocation_sats[k]
+            < sum(score for p, score in key if p.cost <= instance.budget_limit)
+        ]
+        keys = [keys[k] for k in candidates]
+        ballots = [ballots[k] for k in candidates]
+        weights = [weights[k] for k in candidates]
+        sats = [sats[k] for k in candidates]
+        allocation_sats = [allocation_sats[k] for k in candidates]
+    projects = sorted(p for p in instance if p.cost <= instance.budget_limit)
+    model, y, x = _cohesion_model(instance, profile, projects, weights)
+    a = _score_constraints(model, projects, y, keys, x)
+    return keys, ballots, weights, sats, projects, model, y, x, a, allocation_sats
+
+
+def _unsatisfied_constraints(
+    model: Model,
+    keys: list[frozenset],
+    y: dict,
+    a: dict,
+    allocation_sats: list[float],
+    variables: list,
+) -> None:
+    # The voters for which the variable is 1 enjoy less satisfaction than the threshold, hence also less than the sum
+    # of their own scores for the project set
+    for key, allocation_sat, v in zip(keys, allocation_sats, variables):
+        bound = (allocation_sat + VIOLATION_TOLERANCE) * v
+        model += xsum(a.values()) >= bound
+        model += xsum(float(score) * y[p] for p, score in key if p in y) >= bound
+
+
+def _cardinal_candidate(projects, y, x):
+    project_set = [p for p in projects if y[p].x >= 0.5]
+    group = [k for k, x_k in enumerate(x) if x_k.x >= 0.5]
+    return project_set, group
+
+
+def _cardinal_threshold(project_set, group):
+    return sum(min(_cardinal_scores(group, p)) for p in project_set)
+
+
+def find_strong_EJR_violation_cardinal(
+    instance: Instance,
+    profile: AbstractCardinalProfile,
+    budget_allocation: Collection[Project],
+    sat_class: type[SatisfactionMeasure] = Additive_Cardinal_Sat,
+) -> tuple[list[AbstractCardinalBallot], list[Project]] | None:
+    """
+    Looks for a violation of strong EJR for the given instance and the given profile of cardinal ballots, that is, a
+    large enough group of voters together with a set of projects such that some voter of the group enjoys less
+    satisfaction from the budget allocation than the sum over the set of projects of the minimum score given by the
+    voters of the group. The violation is searched for with a mixed integer linear program, each candidate is checked
+    exactly and cut off from the program if it is not a violation.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.cardinalprofile.AbstractCardinalProfile`
+            The profile.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`], optional
+            The satisfaction measure used to evaluate the budget allocation.
+            Defaults to :py:class:`~pabutools.election.satisfaction.additivesatisfaction.Additive_Cardinal_Sat`.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.cardinalballot.AbstractCardinalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    keys, ballots, weights, sats, projects, model, y, x, a, allocation_sats = (
+        _cardinal_model(instance, profile, sat_class, budget_allocation, False)
+    )
+    unsatisfied = [model.add_var(var_type=BINARY) for _ in keys]
+    model += xsum(unsatisfied) == 1
+    for k in range(len(keys)):
+        model += unsatisfied[k] <= x[k]
+    _unsatisfied_constraints(model, keys, y, a, allocation_sats, unsatisfied)
+
+    def check():
+        project_set, group = _cardinal_candidate(projects, y, x)
+        group_ballots = [b for k in group for b in ballots[k]]
+        threshold = _cardinal_threshold(project_set, group_ballots)
+        if any(sats[k].sat(budget_allocation) < threshold for k in group):
+            return group_ballots, project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()) + x, check)
+
+
+def find_EJR_violation_cardinal(
+    instance: Instance,
+    profile: AbstractCardinalProfile,
+    budget_allocation: Collection[Project],
+    sat_class: type[SatisfactionMeasure] = Additive_Cardinal_Sat,
+    up_to_func: Callable[[Iterable[Numeric]], Numeric] | None = None,
+) -> tuple[list[AbstractCardinalBallot], list[Project]] | None:
+    """
+    Looks for a violation of EJR for the given instance and the given profile of cardinal ballots, that is, a large
+    enough group of voters together with a set of projects such that all the voters of the group enjoy less
+    satisfaction from the budget allocation (plus the value of `up_to_func` over the projects of the set that have
+    not been selected) than the sum over the set of projects of the minimum score given by the voters of the group.
+
+    The violation is searched for with a mixed integer linear program that ignores `up_to_func`, which is fine as long
+    as it is non-negative. Each candidate is checked exactly: the voters that are satisfied are removed from the group
+    (which can only increase the minimum scores) until all remaining voters are not, and the candidate is cut off from
+    the program if the remaining group is not large enough.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.cardinalprofile.AbstractCardinalProfile`
+            The profile.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`], optional
+            The satisfaction measure used to evaluate the budget allocation.
+            Defaults to :py:class:`~pabutools.election.satisfaction.additivesatisfaction.Additive_Cardinal_Sat`.
+        up_to_func : Callable[[Iterable[Numeric]], Numeric], optional
+            The function applied to the satisfaction of the projects of the set that have not been selected, whose
+            value is added to the satisfaction of the voters. Should be non-negative.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.cardinalballot.AbstractCardinalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    keys, ballots, weights, sats, projects, model, y, x, a, allocation_sats = (
+        _cardinal_model(instance, profile, sat_class, budget_allocation, True)
+    )
+    _unsatisfied_constraints(model, keys, y, a, allocation_sats, x)
+
+    def check():
+        project_set, group = _cardinal_candidate(projects, y, x)
+        while group:
+            threshold = _cardinal_threshold(project_set, [ballots[k][0] for k in group])
+            unsatisfied = [
+                k
+                for k in group
+                if _is_ejr_unsatisfied(
+                    sats[k], budget_allocation, project_set, threshold, up_to_func
+                )
+            ]
+            if len(unsatisfied) == len(group):
+                break
+            group = unsatisfied
+        if group and is_large_enough(
+            sum(weights[k] for k in group),
+            profile.num_ballots(),
+            total_cost(project_set),
+            instance.budget_limit,
+        ):
+            return [b for k in group for b in ballots[k]], project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()) + x, check)
+
+
+def find_PJR_violation_cardinal(
+    instance: Instance,
+    profile: AbstractCardinalProfile,
+    budget_allocation: Collection[Project],
+    up_to_func: Callable[[Iterable[Numeric]], Numeric] | None = None,
+) -> tuple[list[AbstractCardinalBallot], list[Project]] | None:
+    """
+    Looks for a violation of PJR for the given instance and the given profile of cardinal ballots, that is, a large
+    enough group of voters together with a set of projects such that the sum over the selected projects of the
+    maximum score given by the voters of the group (plus the value of `up_to_func` over the maximum scores of the
+    projects of the set that have not been selected) is less than the sum over the set of projects of the minimum
+    score given by the voters of the group.
+
+    The violation is searched for with a mixed integer linear program that ignores `up_to_func`, which is fine as long
+    as it is non-negative. Each candidate is checked exactly and cut off from the program if it is not a violation.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.cardinalprofile.AbstractCardinalProfile`
+            The profile.
+        budget_allocation : Collection[:py:class:`~pabutools.election.instance.Project`]
+            The budget allocation.
+        up_to_func : Callable[[Iterable[Numeric]], Numeric], optional
+            The function applied to the maximum scores of the projects of the set that have not been selected, whose
+            value is added to the score of the group. Should be non-negative.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.election.ballot.cardinalballot.AbstractCardinalBallot`], list[:py:class:`~pabutools.election.instance.Project`]] | None
+            The group of voters and the set of projects witnessing the violation, `None` if there is none.
+    """
+    keys, ballots, weights, sats, projects, model, y, x, a, allocation_sats = (
+        _cardinal_model(
+            instance, profile, Additive_Cardinal_Sat, budget_allocation, True
+        )
+    )
+    # The variable g[p] is at least the maximum score of the voters of the group for the selected project p
+    g = []
+    for p in sorted(set(budget_allocation)):
+        g_p = model.add_var(var_type=CONTINUOUS, lb=0)
+        for key, x_k in zip(keys, x):
+            score = float(dict(key).get(p, 0))
+            if score > 0:
+                model += g_p >= score * x_k
+        g.append(g_p)
+    model += xsum(g) + VIOLATION_TOLERANCE <= xsum(a.values())
+    # The score of the group for the selected projects is at least the one of each of its members
+    _unsatisfied_constraints(model, keys, y, a, allocation_sats, x)
+
+    def check():
+        project_set, group = _cardinal_candidate(projects, y, x)
+        group_ballots = [b for k in group for b in ballots[k]]
+        threshold = _cardinal_threshold(project_set, group_ballots)
+        group_sat = sum(
+            max(_cardinal_scores(group_ballots, p)) for p in budget_allocation
+        )
+        surplus = 0
+        if up_to_func is not None:
+            surplus = up_to_func(
+                max(_cardinal_scores(group_ballots, p))
+                for p in project_set
+                if p not in budget_allocation
+            )
+        if group_sat + surplus < threshold:
+            return group_ballots, project_set
+        return None
+
+    return _solve_with_cuts(model, list(y.values()) + x, check)
+
+
 def is_strong_EJR_cardinal(
     instance: Instance,
     profile: AbstractCardinalProfile,
@@ -218,19 +851,14 @@ def is_strong_EJR_cardinal(
 ) -> bool:
     """
     Test if a budget allocation satisfies strong EJR for the given instance and the given profile
-    of cardinal ballots.
-    """
-    for group, project_set in cohesive_groups(instance, profile):
-        all_agents_sat = True
-        threshold = sum(min(b[p] for b in group) for p in project_set)
-        for ballot in group:
-            sat = sat_class(instance, profile, ballot)
-            if sat.sat(budget_allocation) < threshold:
-                all_agents_sat = False
-                break
-        if not all_agents_sat:
-            return False
-    return True
+    of cardinal ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_strong_EJR_violation_cardinal`.
+    """
+    return (
+        find_strong_EJR_violation_cardinal(
+            instance, profile, budget_allocation, sat_class
+        )
+        is None
+    )
 
 
 def is_EJR_cardinal(
@@ -242,26 +870,14 @@ def is_EJR_cardinal(
 ) -> bool:
     """
     Test if a budget allocation satisfies EJR for the given instance and the given profile of
-    cardinal ballots.
-    """
-    for group, project_set in cohesive_groups(instance, profile):
-        one_agent_sat = False
-        threshold = sum(min(b[p] for b in group) for p in project_set)
-        for ballot in group:
-            sat = sat_class(instance, profile, ballot)
-            surplus = 0
-            if up_to_func is not None:
-                surplus = up_to_func(
-                    sat.sat_project(p)
-                    for p in project_set
-                    if p not in budget_allocation
-                )
-            if sat.sat(budget_allocation) + surplus >= threshold:
-                one_agent_sat = True
-                break
-        if not one_agent_sat:
-            return False
-    return True
+    cardinal ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_EJR_violation_cardinal`.
+    """
+    return (
+        find_EJR_violation_cardinal(
+            instance, profile, budget_allocation, sat_class, up_to_func
+        )
+        is None
+    )
 
 
 def is_EJR_any_cardinal(
@@ -300,21 +916,14 @@ def is_PJR_cardinal(
 ) -> bool:
     """
     Test if a budget allocation satisfies PJR for the given instance and the given profile of
-    cardinal ballots.
+    cardinal ballots. See :py:func:`~pabutools.analysis.justifiedrepresentation.find_PJR_violation_cardinal`.
     """
-    for group, project_set in cohesive_groups(instance, profile):
-        threshold = sum(min(b[p] for b in group) for p in project_set)
-        group_sat = sum(max(b[p] for b in group) for p in budget_allocation)
-        surplus = 0
-        if up_to_func is not None:
-            surplus = up_to_func(
-                max(b[p] for b in group)
-                for p in project_set
-                if p not in budget_allocation
-            )
-        if group_sat + surplus < threshold:
-            return False
-    return True
+    return (
+        find_PJR_violation_cardinal(
+            instance, profile, list(budget_allocation), up_to_func
+        )
+        is None
+    )
 
 
 def is_PJR_any_cardinal(
@@ -6,6 +6,7 @@ from pabutools.election import (
     AbstractApprovalProfile,
     AbstractCardinalProfile,
     AbstractProfile,
+    BitsetApprovalProfile,
 )
 from pabutools.election import Instance, total_cost
 
@@ -130,7 +131,9 @@ def avg_approval_score(instance: Instance, profile: AbstractApprovalProfile) ->
             The average approval score of projects.
 
     """
-    return mean_generator([profile.approval_score(project) for project in instance])
+    return mean_generator(
+        BitsetApprovalProfile(profile, instance).approval_scores().tolist()
+    )
 
 
 def median_approval_score(
@@ -155,7 +158,14 @@ def median_approval_score(
     if len(instance) == 0:
         return 0
     return float(
-        np.median([frac(profile.approval_score(project)) for project in instance])
+        np.median(
+            [
+                frac(score)
+                for score in BitsetApprovalProfile(profile, instance)
+                .approval_scores()
+                .tolist()
+            ]
+        )
     )
 
 
@@ -252,6 +262,23 @@ def voter_flow_matrix(
             The voter flow matrix.
 
     """
+    if isinstance(profile, AbstractApprovalProfile):
+        # Co-approval counts on the bitset profile, each ballot is counted once as below
+        bitset_profile = BitsetApprovalProfile(profile, instance)
+        dense = bitset_profile.as_boolean_matrix()
+        co_approvals = np.rint(dense.T.astype(np.float64) @ dense).astype(np.int64)
+        singletons = dense[bitset_profile.ballot_lengths() == 1].sum(axis=0)
+        np.fill_diagonal(co_approvals, singletons)
+        names = [str(project) for project in bitset_profile.projects]
+        index = {name: k for k, name in enumerate(names)}
+        return {
+            str(project): {
+                str(other): int(co_approvals[index[str(project)], index[str(other)]])
+                for other in instance
+            }
+            for project in instance
+        }
+
     voter_flow = {}
     for project in instance:
         voter_flow[str(project)] = {}
@@ -4,8 +4,15 @@ from pabutools.election.instance import (
     total_cost,
     max_budget_allocation_cost,
     max_budget_allocation_cardinality,
+    max_budget_allocation_score,
 )
-from pabutools.election.pabulib import parse_pabulib, write_pabulib
+from pabutools.election.pabulib import (
+    parse_pabulib,
+    iter_pabulib,
+    load_pabulib_corpus,
+    write_pabulib,
+)
+from pabutools.election.snapshot import save_election, load_election
 
 from pabutools.election.profile import *
 from pabutools.election.ballot import *
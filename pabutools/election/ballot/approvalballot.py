@@ -24,6 +24,11 @@ class FrozenApprovalBallot(tuple[Project], FrozenBallot, AbstractApprovalBallot)
     Frozen approval ballot, that is, a ballot in which the voter expressed their preferences by simply selecting
     some projects they approve of. It derives from the Python class `tuple` and can be used as one.
 
+    The projects are stored in a canonical order, sorted by their names, whatever the order in which they are given.
+    Two frozen approval ballots approving of the same projects are thus equal and have the same hash, which is what
+    allows identical ballots to be merged in an
+    :py:class:`~pabutools.election.profile.approvalprofile.ApprovalMultiProfile`.
+
     Parameters
     ----------
         init: Iterable[:py:class:`~pabutools.election.instance.Project`], optional
@@ -74,7 +79,7 @@ class FrozenApprovalBallot(tuple[Project], FrozenBallot, AbstractApprovalBallot)
         name: str = "",
         meta: dict | None = None,
     ):
-        return tuple.__new__(cls, tuple(approved))
+        return tuple.__new__(cls, sorted(approved))
 
     def __hash__(self):
         return tuple.__hash__(self)
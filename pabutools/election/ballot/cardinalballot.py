@@ -74,6 +74,10 @@ class FrozenCardinalBallot(
     def __setitem__(self, key, value):
         raise ValueError("You cannot set values of a FrozenCardinalBallot")
 
+    def __reduce__(self):
+        # The scores are passed to the constructor since they cannot be set afterwards
+        return type(self), (dict(self),), self.__dict__
+
     def __hash__(self):
         return tuple.__hash__(tuple(self.keys()))
 
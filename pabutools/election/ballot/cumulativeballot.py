@@ -82,6 +82,10 @@ class FrozenCumulativeBallot(
     def __setitem__(self, key, value):
         raise ValueError("You cannot set values of a FrozenCumulativeBallot")
 
+    def __reduce__(self):
+        # The scores are passed to the constructor since they cannot be set afterwards
+        return type(self), (dict(self),), self.__dict__
+
     def __hash__(self):
         return tuple.__hash__(tuple(self.keys()))
 
@@ -6,14 +6,16 @@ The :py:class:`~pabutools.election.instance.Project` and the
 
 from __future__ import annotations
 
-from collections.abc import Collection, Generator
+from collections.abc import Collection, Generator, Iterable
 
 from pabutools.utils import Numeric
 
 from pabutools.fractions import frac
 from pabutools.utils import powerset
 
-from math import ceil
+import numpy as np
+
+from math import ceil, floor, gcd
 from mip import Model, xsum, maximize, BINARY, OptimizationStatus
 
 import random
@@ -54,6 +56,9 @@ class Project:
         targets: set[str]
             The target groups that the project is targeting. These can be "Citizens above 60 years old" or
             "Residents of district A" for instance.
+        index : int | None
+            The integer id of the project in an indexed instance, see
+            :py:meth:`~pabutools.election.instance.Instance.index_projects`. `None` until the project is indexed.
     """
 
     def __str__(self) -> str:
@@ -77,6 +82,7 @@ class Project:
         self.cost = cost
         self.categories = categories
         self.targets = targets
+        self.index = None
 
     def __eq__(self, other) -> bool:
         if isinstance(other, Project):
@@ -149,12 +155,26 @@ def max_budget_allocation_cardinality(
     return selected
 
 
+SUBSET_SUM_MAX_CAPACITY = 10**7
+"""
+Largest scaled budget limit for which :py:func:`~pabutools.election.instance.max_budget_allocation_cost` solves the
+problem by dynamic programming rather than with an ILP solver.
+"""
+
+
 def max_budget_allocation_cost(
     projects: Collection[Project], budget_limit: Numeric
 ) -> Numeric:
     """
     Returns the maximum total cost over all subsets of projects with respect to the budget limit.
 
+    If all the projects fit in the budget, their total cost is returned directly. Otherwise, when the costs and the
+    budget limit are integers, the problem is solved as a subset sum problem: the reachable total costs are
+    represented by the bits of a Python integer, divided by the greatest common divisor of the costs, and updated
+    with one shift per project. An ILP solver is used as a fallback when the costs are not integers, or when the
+    scaled budget limit exceeds
+    :py:const:`~pabutools.election.instance.SUBSET_SUM_MAX_CAPACITY`.
+
     Parameters
     ----------
         projects : iterable[:py:class:`~pabutools.election.instance.Project`]
@@ -168,22 +188,91 @@ def max_budget_allocation_cost(
             The maximum total cost over all subsets of projects with respect to the budget limit.
 
     """
+    projects = [p for p in projects if p.cost <= budget_limit]
+    if not projects:
+        return 0
+    if total_cost(projects) <= budget_limit:
+        return frac(total_cost(projects))
+    if all(int(p.cost) == p.cost for p in projects):
+        weights = [int(p.cost) for p in projects]
+        divisor = gcd(*weights)
+        capacity = int(floor(budget_limit)) // divisor
+        if capacity <= SUBSET_SUM_MAX_CAPACITY:
+            mask = (1 << (capacity + 1)) - 1
+            reachable = 1
+            for weight in weights:
+                reachable |= reachable << (weight // divisor)
+                reachable &= mask
+                if reachable >> capacity:
+                    break
+            return frac((reachable.bit_length() - 1) * divisor)
     mip_model = Model()
     mip_model.verbose = 0
     p_vars = {
         p: mip_model.add_var(var_type=BINARY, name="x_{}".format(p)) for p in projects
     }
-    if p_vars:
-        mip_model.objective = maximize(xsum(p_vars[p] * p.cost for p in projects))
-        mip_model += xsum(p_vars[p] * p.cost for p in projects) <= budget_limit
-        opt_status = mip_model.optimize()
-        if opt_status == OptimizationStatus.OPTIMAL:
-            max_cost = mip_model.objective.x
-            return frac(float(max_cost))
-        raise ValueError(
-            "The MIP to find the maximum cost of a budget allocation failed to find an optimal solution."
-        )
-    return 0
+    mip_model.objective = maximize(xsum(p_vars[p] * p.cost for p in projects))
+    mip_model += xsum(p_vars[p] * p.cost for p in projects) <= budget_limit
+    opt_status = mip_model.optimize()
+    if opt_status == OptimizationStatus.OPTIMAL:
+        max_cost = mip_model.objective.x
+        return frac(float(max_cost))
+    raise ValueError(
+        "The MIP to find the maximum cost of a budget allocation failed to find an optimal solution."
+    )
+
+
+def max_budget_allocation_score(
+    scores: dict[Project, Numeric], budget_limit: Numeric
+) -> Numeric:
+    """
+    Returns the maximum total score over all subsets of projects with respect to the budget limit, the score of each
+    project being given by the dictionary `scores`. Projects with a non-positive score are never selected.
+
+    If all the projects with a positive score fit in the budget, their total score is returned directly. Otherwise,
+    when the scores and the costs are integers, the problem is solved by dynamic programming over the scores: the
+    minimum cost needed to reach each total score is computed with NumPy operations, one project at a time. An ILP
+    solver is used as a fallback for non-integer scores or costs.
+
+    Parameters
+    ----------
+        scores : dict[:py:class:`~pabutools.election.instance.Project`, Numeric]
+            The score of each project.
+        budget_limit : Numeric
+            the budget limit
+
+    Returns
+    -------
+        Numeric
+            The maximum total score over all subsets of projects with respect to the budget limit.
+    """
+    scores = {p: s for p, s in scores.items() if s > 0 and p.cost <= budget_limit}
+    if not scores:
+        return 0
+    if total_cost(scores) <= budget_limit:
+        return frac(sum(scores.values()))
+    if all(int(p.cost) == p.cost and int(s) == s for p, s in scores.items()):
+        max_score = int(sum(scores.values()))
+        unreachable = int(total_cost(scores)) + 1
+        min_cost = np.full(max_score + 1, unreachable, dtype=np.int64)
+        min_cost[0] = 0
+        for p, s in scores.items():
+            s = int(s)
+            min_cost[s:] = np.minimum(min_cost[s:], min_cost[:-s] + int(p.cost))
+        return frac(int(np.flatnonzero(min_cost <= budget_limit)[-1]))
+    mip_model = Model()
+    mip_model.verbose = 0
+    p_vars = {
+        p: mip_model.add_var(var_type=BINARY, name="x_{}".format(p)) for p in scores
+    }
+    mip_model.objective = maximize(xsum(p_vars[p] * s for p, s in scores.items()))
+    mip_model += xsum(p_vars[p] * p.cost for p in scores) <= budget_limit
+    opt_status = mip_model.optimize()
+    if opt_status == OptimizationStatus.OPTIMAL:
+        return frac(mip_model.objective.x)
+    raise ValueError(
+        "The MIP to find the maximum score of a budget allocation failed to find an optimal solution."
+    )
 
 
 class Instance(set[Project]):
@@ -254,6 +343,9 @@ class Instance(set[Project]):
         project_meta : dict[:py:class:`~pabutools.election.instance.Project`: dict]
             All kinds of relevant information about the projects, stored in a dictionary. Keys are
             :py:class:`~pabutools.election.instance.Project` and values are dictionaries.
+        projects_by_index : list[:py:class:`~pabutools.election.instance.Project`] | None
+            In an indexed instance, the projects ordered by their integer id, see
+            :py:meth:`~pabutools.election.instance.Instance.index_projects`. `None` if the instance is not indexed.
     """
 
     def __init__(
@@ -347,6 +439,127 @@ class Instance(set[Project]):
             else:
                 project_meta = dict()
         self.project_meta = project_meta
+        self.projects_by_index = None
+        self._project_ids = None
+
+    def index_projects(self) -> list[Project]:
+        """
+        Turns on the indexed mode of the instance: every project receives a dense integer id, stored in its `index`
+        attribute, following the order of the names of the projects. Profiles and rules can then represent
+        collections of projects as integers (see
+        :py:meth:`~pabutools.election.instance.Instance.project_ids`), which avoids hashing and comparing the projects
+        in their inner loops. The method needs to be called again if projects are added to or removed from the
+        instance, otherwise the instance is no longer considered as indexed.
+
+        Returns
+        -------
+            list[:py:class:`~pabutools.election.instance.Project`]
+                The projects, ordered by their id.
+        """
+        self.projects_by_index = sorted(self)
+        self._project_ids = dict()
+        for index, project in enumerate(self.projects_by_index):
+            project.index = index
+            self._project_ids[project] = index
+        return self.projects_by_index
+
+    def is_indexed(self) -> bool:
+        """
+        Tests whether the instance is indexed, that is, whether
+        :py:meth:`~pabutools.election.instance.Instance.index_projects` has been called and the projects have not
+        changed since then.
+
+        Returns
+        -------
+            bool
+                `True` if the instance is indexed, `False` otherwise.
+        """
+        if self.projects_by_index is None or len(self.projects_by_index) != len(self):
+            return False
+        return all(
+            project.index == index and project in self
+            for index, project in enumerate(self.projects_by_index)
+        )
+
+    def project_id(self, project: Project) -> int | None:
+        """
+        Returns the id of a project in the indexed instance, `None` if the project does not belong to the instance.
+        The `index` attribute is used directly when the project is the object stored in the instance, other projects
+        (with the same name) are looked up by name.
+
+        Parameters
+        ----------
+            project : :py:class:`~pabutools.election.instance.Project`
+                The project.
+
+        Returns
+        -------
+            int | None
+                The id of the project.
+        """
+        index = project.index
+        if (
+            index is not None
+            and index < len(self.projects_by_index)
+            and self.projects_by_index[index] is project
+        ):
+            return index
+        return self._project_ids.get(project)
+
+    def project_ids(self, projects: Iterable[Project]) -> list[int]:
+        """
+        Returns the ids of the projects that belong to the indexed instance, in increasing order. Projects that do not
+        belong to the instance are ignored. See :py:meth:`~pabutools.election.instance.Instance.project_id`.
+
+        Parameters
+        ----------
+            projects : Iterable[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            list[int]
+                The sorted ids of the projects.
+        """
+        # Same as project_id, inlined since it is called for every ballot
+        projects_by_index = self.projects_by_index
+        num_projects = len(projects_by_index)
+        ids = []
+        for project in projects:
+            index = project.index
+            if (
+                index is None
+                or index >= num_projects
+                or projects_by_index[index] is not project
+            ):
+                index = self._project_ids.get(project)
+                if index is None:
+                    continue
+            ids.append(index)
+        ids.sort()
+        return ids
+
+    def supporters_by_id(self, ballots: Iterable[Iterable[Project]]) -> list[list[int]]:
+        """
+        Returns, for each project id of the indexed instance, the positions of the ballots in which the project
+        appears, in increasing order. Ballots are only iterated over once, which is much faster than testing the
+        membership of every project in every ballot.
+
+        Parameters
+        ----------
+            ballots : Iterable[Iterable[:py:class:`~pabutools.election.instance.Project`]]
+                The ballots, typically approval ballots.
+
+        Returns
+        -------
+            list[list[int]]
+                The positions of the ballots mentioning each project, indexed by project id.
+        """
+        supporters = [[] for _ in self.projects_by_index]
+        for position, ballot in enumerate(ballots):
+            for index in self.project_ids(ballot):
+                supporters[index].append(position)
+        return supporters
 
     def get_project(self, project_name: str) -> Project:
         """
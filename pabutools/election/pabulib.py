@@ -2,8 +2,12 @@
 Tools to work with PaBuLib.
 """
 
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from multiprocessing import Pool
+
 from natsort import natsorted
-from copy import deepcopy
 
 from pabutools.fractions import str_as_frac
 from pabutools.election.instance import Instance, Project
@@ -13,54 +17,131 @@ from pabutools.election.ballot import (
     OrdinalBallot,
     CumulativeBallot,
     AbstractCardinalBallot,
+    AbstractBallot,
 )
 from pabutools.election.profile import (
     AbstractProfile,
     Profile,
     ApprovalProfile,
+    ApprovalMultiProfile,
     AbstractApprovalProfile,
     CardinalProfile,
+    CardinalMultiProfile,
     AbstractCardinalProfile,
     CumulativeProfile,
+    CumulativeMultiProfile,
     AbstractCumulativeProfile,
     OrdinalProfile,
+    OrdinalMultiProfile,
     AbstractOrdinalProfile,
 )
 
 import urllib.request
 import csv
+import io
 import os
 
 
-def parse_pabulib_from_string(file_content: str) -> tuple[Instance, Profile]:
+def parse_pabulib_ballot(
+    instance: Instance, header: list[str], row: list[str]
+) -> AbstractBallot:
     """
-    Parses a PaBuLib file given as a string and returns the corresponding instance and profile. The
-    returned profile will be of the correct type depending on the metadata in the file.
+    Parses a row of the VOTES section of a PaBuLib file and returns the corresponding ballot. The type of the ballot
+    depends on the metadata of the instance.
 
     Parameters
     ----------
-        file_content : str
-            String containing the contents of the PaBuLib file to be parsed.
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance, with its metadata and its projects already parsed.
+        header : list[str]
+            The header of the VOTES section.
+        row : list[str]
+            The row to parse.
 
     Returns
     -------
-        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.Profile`]
-            The instance and the profile corresponding to the file.
+        :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
+            The ballot.
+    """
+    ballot_meta = dict()
+    for i in range(len(row)):
+        if row[i].strip().lower() != "none":
+            ballot_meta[header[i].strip()] = row[i].strip()
+    vote_type = instance.meta["vote_type"]
+    if vote_type == "approval":
+        ballot = ApprovalBallot()
+        for project_name in ballot_meta["vote"].split(","):
+            ballot.add(instance.get_project(project_name))
+        ballot_meta.pop("vote")
+    elif vote_type in ["scoring", "cumulative"]:
+        if vote_type == "scoring":
+            ballot = CardinalBallot()
+        else:
+            ballot = CumulativeBallot()
+        points = ballot_meta["points"].split(",")
+        for index, project_name in enumerate(ballot_meta["vote"].split(",")):
+            ballot[instance.get_project(project_name)] = str_as_frac(
+                points[index].strip()
+            )
+        ballot_meta.pop("vote")
+        ballot_meta.pop("points")
+    elif vote_type == "ordinal":
+        ballot = OrdinalBallot()
+        for project_name in ballot_meta["vote"].split(","):
+            ballot.append(instance.get_project(project_name))
+        ballot_meta.pop("vote")
+    else:
+        raise NotImplementedError(
+            "The PaBuLib parser cannot parse {} profiles for now.".format(
+                instance.meta["vote_type"]
+            )
+        )
+    ballot.meta = ballot_meta
+    return ballot
+
+
+def iter_pabulib_from_lines(
+    lines: Iterable[str],
+) -> Iterator[Instance | AbstractBallot]:
+    """
+    Parses the lines of a PaBuLib file one by one. The first element yielded is the instance, once the META and
+    PROJECTS sections have been read. Then, the ballots of the VOTES section are yielded one at a time, as they are
+    read. Only the current line is held in memory.
+
+    Parameters
+    ----------
+        lines : Iterable[str]
+            The lines of the PaBuLib file, typically a file handle.
+
+    Yields
+    ------
+        :py:class:`~pabutools.election.instance.Instance` | :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
+            The instance first, and then the ballots.
     """
     instance = Instance()
-    ballots = []
     optional_sets = {"categories": set(), "targets": set()}
+    instance_complete = False
+
+    def complete_instance():
+        # We retrieve the budget limit from the meta information
+        instance.budget_limit = str_as_frac(instance.meta["budget"].replace(",", "."))
+        # We add the category and target information that we collected from the projects
+        instance.categories = optional_sets["categories"]
+        instance.targets = optional_sets["targets"]
 
-    lines = file_content.splitlines()
     section = ""
     header = []
     reader = csv.reader(lines, delimiter=";")
     for row in reader:
-        if len(row) == 1 and len(row[0].strip()) == 0:
+        if len(row) == 0 or (len(row) == 1 and len(row[0].strip()) == 0):
             continue
         if str(row[0]).strip().lower() in ["meta", "projects", "votes"]:
             section = str(row[0]).strip().lower()
             header = next(reader)
+            if section == "votes" and not instance_complete:
+                complete_instance()
+                instance_complete = True
+                yield instance
         elif section == "meta":
             instance.meta[row[0].strip()] = row[1].strip()
         elif section == "projects":
@@ -88,42 +169,61 @@ def parse_pabulib_from_string(file_content: str) -> tuple[Instance, Profile]:
             instance.add(p)
             instance.project_meta[p] = project_meta
         elif section == "votes":
-            ballot_meta = dict()
-            for i in range(len(row)):
-                if row[i].strip().lower() != "none":
-                    ballot_meta[header[i].strip()] = row[i].strip()
-            vote_type = instance.meta["vote_type"]
-            if vote_type == "approval":
-                ballot = ApprovalBallot()
-                for project_name in ballot_meta["vote"].split(","):
-                    ballot.add(instance.get_project(project_name))
-                ballot_meta.pop("vote")
-            elif vote_type in ["scoring", "cumulative"]:
-                if vote_type == "scoring":
-                    ballot = CardinalBallot()
-                else:
-                    ballot = CumulativeBallot()
-                points = ballot_meta["points"].split(",")
-                for index, project_name in enumerate(ballot_meta["vote"].split(",")):
-                    ballot[instance.get_project(project_name)] = str_as_frac(
-                        points[index].strip()
-                    )
-                ballot_meta.pop("vote")
-                ballot_meta.pop("points")
-            elif vote_type == "ordinal":
-                ballot = OrdinalBallot()
-                for project_name in ballot_meta["vote"].split(","):
-                    ballot.append(instance.get_project(project_name))
-                ballot_meta.pop("vote")
-            else:
-                raise NotImplementedError(
-                    "The PaBuLib parser cannot parse {} profiles for now.".format(
-                        instance.meta["vote_type"]
-                    )
-                )
-            ballot.meta = ballot_meta
-            ballots.append(ballot)
+            yield parse_pabulib_ballot(instance, header, row)
+
+    if not instance_complete:
+        complete_instance()
+        yield instance
+
 
+def iter_pabulib(file_path: str) -> Iterator[Instance | AbstractBallot]:
+    """
+    Parses a PaBuLib file lazily, reading it line by line. The first element yielded is the instance, then the
+    ballots are yielded one at a time. Files larger than the available memory can thus be processed, as long as the
+    ballots are not all stored.
+
+    Parameters
+    ----------
+        file_path : str
+            Path to the PaBuLib file to be parsed.
+
+    Yields
+    ------
+        :py:class:`~pabutools.election.instance.Instance` | :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
+            The instance first, and then the ballots.
+    """
+    with open(file_path, "r", newline="", encoding="utf-8-sig") as csvfile:
+        items = iter_pabulib_from_lines(csvfile)
+        instance = next(items)
+        instance.file_path = file_path
+        instance.file_name = os.path.basename(file_path)
+        yield instance
+        yield from items
+
+
+def pabulib_profile(
+    instance: Instance, ballots: Iterable[AbstractBallot], as_multiprofile: bool = False
+) -> AbstractProfile | None:
+    """
+    Builds the profile corresponding to ballots parsed from a PaBuLib file. The type of the profile, and the legal
+    constraints it enforces, depend on the metadata of the instance.
+
+    Parameters
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        ballots : Iterable[:py:class:`~pabutools.election.ballot.ballot.AbstractBallot`]
+            The ballots, consumed only once.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain a multiprofile. The ballots are then frozen and collapsed one at a time, so that
+            only the distinct ballots are stored.
+            Defaults to `False`.
+
+    Returns
+    -------
+        :py:class:`~pabutools.election.profile.profile.AbstractProfile` | None
+            The profile, `None` if the type of vote is unknown.
+    """
     legal_min_length = instance.meta.get("min_length", None)
     if legal_min_length is not None:
         legal_min_length = int(legal_min_length)
@@ -163,26 +263,33 @@ def parse_pabulib_from_string(file_content: str) -> tuple[Instance, Profile]:
         if legal_max_score == legal_max_total_score:
             legal_max_score = None
 
-    profile = None
-    if instance.meta["vote_type"] == "approval":
-        profile = ApprovalProfile(
-            deepcopy(ballots),
+    # Multiprofiles are filled one ballot at a time so that only the distinct ballots are ever stored
+    init = () if as_multiprofile else ballots
+    vote_type = instance.meta["vote_type"]
+    if vote_type == "approval":
+        profile_class = ApprovalMultiProfile if as_multiprofile else ApprovalProfile
+        profile = profile_class(
+            init,
             legal_min_length=legal_min_length,
             legal_max_length=legal_max_length,
             legal_min_cost=legal_min_cost,
             legal_max_cost=legal_max_cost,
         )
-    elif instance.meta["vote_type"] == "scoring":
-        profile = CardinalProfile(
-            deepcopy(ballots),
+    elif vote_type == "scoring":
+        profile_class = CardinalMultiProfile if as_multiprofile else CardinalProfile
+        profile = profile_class(
+            init,
             legal_min_length=legal_min_length,
             legal_max_length=legal_max_length,
             legal_min_score=legal_min_score,
             legal_max_score=legal_max_score,
         )
-    elif instance.meta["vote_type"] == "cumulative":
-        profile = CumulativeProfile(
-            deepcopy(ballots),
+    elif vote_type == "cumulative":
+        profile_class = (
+            CumulativeMultiProfile if as_multiprofile else CumulativeProfile
+        )
+        profile = profile_class(
+            init,
             legal_min_length=legal_min_length,
             legal_max_length=legal_max_length,
             legal_min_score=legal_min_score,
@@ -190,49 +297,103 @@ def parse_pabulib_from_string(file_content: str) -> tuple[Instance, Profile]:
             legal_min_total_score=legal_min_total_score,
             legal_max_total_score=legal_max_total_score,
         )
-    elif instance.meta["vote_type"] == "ordinal":
-        profile = OrdinalProfile(
-            deepcopy(ballots),
+    elif vote_type == "ordinal":
+        profile_class = OrdinalMultiProfile if as_multiprofile else OrdinalProfile
+        profile = profile_class(
+            init,
             legal_min_length=legal_min_length,
             legal_max_length=legal_max_length,
         )
+    else:
+        return None
+    if as_multiprofile:
+        # Frozen approval ballots are canonical, identical votes are merged whatever their order
+        profile.extend(ballots)
+    return profile
 
-    # We retrieve the budget limit from the meta information
-    instance.budget_limit = str_as_frac(instance.meta["budget"].replace(",", "."))
 
-    # We add the category and target information that we collected from the projects
-    instance.categories = optional_sets["categories"]
-    instance.targets = optional_sets["targets"]
+def parse_pabulib_from_lines(
+    lines: Iterable[str], as_multiprofile: bool = False
+) -> tuple[Instance, AbstractProfile]:
+    """
+    Parses the lines of a PaBuLib file and returns the corresponding instance and profile. The returned profile will
+    be of the correct type depending on the metadata in the file.
 
-    return instance, profile
+    Parameters
+    ----------
+        lines : Iterable[str]
+            The lines of the PaBuLib file, typically a file handle.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain a :py:class:`~pabutools.election.profile.profile.MultiProfile` built directly from
+            the ballots, without going through a :py:class:`~pabutools.election.profile.profile.Profile` first.
+            Defaults to `False`.
+
+    Returns
+    -------
+        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`]
+            The instance and the profile (or multiprofile) corresponding to the file.
+    """
+    items = iter_pabulib_from_lines(lines)
+    instance = next(items)
+    return instance, pabulib_profile(instance, items, as_multiprofile=as_multiprofile)
 
 
-def parse_pabulib(file_path: str) -> tuple[Instance, Profile]:
+def parse_pabulib_from_string(
+    file_content: str, as_multiprofile: bool = False
+) -> tuple[Instance, AbstractProfile]:
     """
-    Parses a PaBuLib files and returns the corresponding instance and profile. The returned profile will be of the
-    correct type depending on the metadata in the file.
+    Parses a PaBuLib file given as a string and returns the corresponding instance and profile. The
+    returned profile will be of the correct type depending on the metadata in the file.
 
     Parameters
     ----------
-        file_path : str
-            Path to the PaBuLib file to be parsed.
+        file_content : str
+            String containing the contents of the PaBuLib file to be parsed.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain a :py:class:`~pabutools.election.profile.profile.MultiProfile` built directly from
+            the ballots, without going through a :py:class:`~pabutools.election.profile.profile.Profile` first.
+            Defaults to `False`.
 
     Returns
     -------
-        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.Profile`]
-            The instance and the profile corresponding to the file.
+        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`]
+            The instance and the profile (or multiprofile) corresponding to the file.
     """
+    return parse_pabulib_from_lines(
+        io.StringIO(file_content, newline=""), as_multiprofile=as_multiprofile
+    )
 
-    with open(file_path, "r", newline="", encoding="utf-8-sig") as csvfile:
-        instance, profile = parse_pabulib_from_string(csvfile.read())
 
-    instance.file_path = file_path
-    instance.file_name = os.path.basename(file_path)
+def parse_pabulib(
+    file_path: str, as_multiprofile: bool = False
+) -> tuple[Instance, AbstractProfile]:
+    """
+    Parses a PaBuLib files and returns the corresponding instance and profile. The returned profile will be of the
+    correct type depending on the metadata in the file. The file is read line by line, see
+    :py:func:`~pabutools.election.pabulib.iter_pabulib`.
+
+    Parameters
+    ----------
+        file_path : str
+            Path to the PaBuLib file to be parsed.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain a :py:class:`~pabutools.election.profile.profile.MultiProfile` built directly from
+            the ballots, without going through a :py:class:`~pabutools.election.profile.profile.Profile` first.
+            Defaults to `False`.
 
-    return instance, profile
+    Returns
+    -------
+        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`]
+            The instance and the profile (or multiprofile) corresponding to the file.
+    """
+    items = iter_pabulib(file_path)
+    instance = next(items)
+    return instance, pabulib_profile(instance, items, as_multiprofile=as_multiprofile)
 
 
-def parse_pabulib_from_url(url: str) -> tuple[Instance, Profile]:
+def parse_pabulib_from_url(
+    url: str, as_multiprofile: bool = False
+) -> tuple[Instance, AbstractProfile]:
     """
     Parses a PaBuLib files given a URL and returns the corresponding instance and profile. The returned profile will be
     of the correct type depending on the metadata in the file.
@@ -241,18 +402,22 @@ def parse_pabulib_from_url(url: str) -> tuple[Instance, Profile]:
     ----------
         url : str
             URL to the PaBuLib file to be parsed.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain a :py:class:`~pabutools.election.profile.profile.MultiProfile` built directly from
+            the ballots, without going through a :py:class:`~pabutools.election.profile.profile.Profile` first.
+            Defaults to `False`.
 
     Returns
     -------
-        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.Profile`]
-            The instance and the profile corresponding to the file.
+        tuple[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`]
+            The instance and the profile (or multiprofile) corresponding to the file.
     """
 
-    data = urllib.request.urlopen(url)
-    lines = data.read().decode("utf-8-sig")
-    data.close()
-
-    instance, profile = parse_pabulib_from_string(lines)
+    with urllib.request.urlopen(url) as data:
+        instance, profile = parse_pabulib_from_lines(
+            io.TextIOWrapper(data, encoding="utf-8-sig", newline=""),
+            as_multiprofile=as_multiprofile,
+        )
 
     instance.file_path = url
     instance.file_name = url.split("/")[-1]
@@ -260,6 +425,128 @@ def parse_pabulib_from_url(url: str) -> tuple[Instance, Profile]:
     return instance, profile
 
 
+def _parse_corpus_file(
+    file_path: str,
+    meta_filter: Callable[[dict], bool] | None = None,
+    as_multiprofile: bool = False,
+) -> tuple[str, Instance, AbstractProfile] | None:
+    items = iter_pabulib(file_path)
+    instance = next(items)
+    if meta_filter is not None and not meta_filter(instance.meta):
+        items.close()
+        return None
+    profile = pabulib_profile(instance, items, as_multiprofile=as_multiprofile)
+    return instance.file_name, instance, profile
+
+
+_corpus_worker_arguments = dict()
+
+
+def _init_corpus_worker(meta_filter, as_multiprofile):
+    # The filter is given to the workers once, when they are created, so that it does not need to be picklable
+    _corpus_worker_arguments["meta_filter"] = meta_filter
+    _corpus_worker_arguments["as_multiprofile"] = as_multiprofile
+
+
+def _parse_corpus_file_in_worker(file_path):
+    result = _parse_corpus_file(file_path, **_corpus_worker_arguments)
+    if result is None:
+        return None
+    # Pickling the profile would be as slow as parsing the file again in the main process, the election is thus sent
+    # back in the much more compact snapshot format. The snapshot module is only needed here and in the parent
+    # process, it is imported lazily so that parsing a single file does not depend on it.
+    from pabutools.election.snapshot import election_as_snapshot
+
+    file_name, instance, profile = result
+    return file_name, election_as_snapshot(instance, profile)
+
+
+def load_pabulib_corpus(
+    paths_or_dir: str | Iterable[str],
+    workers: int | None = None,
+    filter: Callable[[dict], bool] | None = None,
+    as_multiprofile: bool = False,
+) -> Iterator[tuple[str, Instance, AbstractProfile]]:
+    """
+    Parses a collection of PaBuLib files in a pool of processes. The elections are yielded as soon as they have been
+    parsed, in the order in which they are completed. The largest files are parsed first to keep all the workers busy.
+
+    Files can be filtered out based on their metadata through the `filter` argument. It is applied to the `meta`
+    dictionary of the instance as soon as the META and PROJECTS sections have been read, so that the votes of the
+    files that are filtered out are never parsed. For instance, to only load the approval elections from Poland with
+    at least 1000 voters, one can use:
+
+    .. code-block:: python
+
+        load_pabulib_corpus(
+            "path/to/the/folder",
+            filter=lambda meta: meta.get("vote_type") == "approval"
+            and meta.get("country") == "Poland"
+            and int(meta.get("num_votes", 0)) >= 1000,
+        )
+
+    Parameters
+    ----------
+        paths_or_dir : str | Iterable[str]
+            Either the path to a directory, in which case all the `.pb` files it contains are parsed, or a collection
+            of paths to PaBuLib files.
+        workers : int, optional
+            The number of processes used. If 1, the files are parsed one after the other in the current process.
+            Defaults to the number of CPUs.
+        filter : Callable[[dict], bool], optional
+            Function called on the `meta` dictionary of the instance of each file, only the files for which it
+            returns `True` are parsed and yielded. Unless processes are started by forking, the function needs to be
+            picklable (a lambda function is not).
+            Defaults to `None`, in which case all files are parsed.
+        as_multiprofile : bool, optional
+            Set to `True` to obtain multiprofiles instead of profiles, see
+            :py:func:`~pabutools.election.pabulib.parse_pabulib`.
+            Defaults to `False`.
+
+    Yields
+    ------
+        tuple[str, :py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`]
+            The name of the file, the instance and the profile.
+    """
+    if isinstance(paths_or_dir, str):
+        if os.path.isdir(paths_or_dir):
+            paths = [
+                os.path.join(paths_or_dir, file_name)
+                for file_name in natsorted(os.listdir(paths_or_dir))
+                if file_name.endswith(".pb")
+            ]
+        else:
+            paths = [paths_or_dir]
+    else:
+        paths = list(paths_or_dir)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(
+            f"The number of workers needs to be at least 1, not {workers}."
+        )
+
+    if workers == 1 or len(paths) <= 1:
+        for file_path in paths:
+            result = _parse_corpus_file(file_path, filter, as_multiprofile)
+            if result is not None:
+                yield result
+        return
+
+    from pabutools.election.snapshot import election_from_snapshot
+
+    paths.sort(key=os.path.getsize, reverse=True)
+    with Pool(
+        min(workers, len(paths)),
+        initializer=_init_corpus_worker,
+        initargs=(filter, as_multiprofile),
+    ) as pool:
+        for result in pool.imap_unordered(_parse_corpus_file_in_worker, paths):
+            if result is not None:
+                file_name, (description, arrays) = result
+                yield file_name, *election_from_snapshot(description, arrays)
+
+
 def election_as_pabulib_string(instance: Instance, profile: AbstractProfile) -> str:
     """
     Creates a string representing the instance and the profile according to the Pabulib standard
@@ -31,6 +31,10 @@ for attributes and methods that apply both to the profile and the multiprofile.
 * :py:class:`~pabutools.election.profile.cumulativeprofile.AbstractCumulativeProfile`
 * :py:class:`~pabutools.election.profile.ordinalprofile.AbstractOrdinalProfile`
 
+Finally, approval profiles can be converted into a
+:py:class:`~pabutools.election.profile.bitsetprofile.BitsetApprovalProfile`, which stores the ballots as bitsets for
+fast set operations on large elections.
+
 """
 
 from pabutools.election.profile.profile import AbstractProfile, Profile, MultiProfile
@@ -56,6 +60,7 @@ from pabutools.election.profile.ordinalprofile import (
     OrdinalProfile,
     OrdinalMultiProfile,
 )
+from pabutools.election.profile.bitsetprofile import BitsetApprovalProfile
 
 __all__ = [
     "AbstractProfile",
@@ -75,4 +80,5 @@ __all__ = [
     "AbstractOrdinalProfile",
     "OrdinalProfile",
     "OrdinalMultiProfile",
+    "BitsetApprovalProfile",
 ]
@@ -11,7 +11,7 @@ from itertools import product
 from pabutools.utils import Numeric
 
 from pabutools.election.ballot.approvalballot import AbstractApprovalBallot
-from pabutools.election.ballot.ballot import AbstractBallot
+from pabutools.election.ballot.ballot import AbstractBallot, Ballot
 
 from pabutools.election.ballot import (
     ApprovalBallot,
@@ -462,6 +462,38 @@ class ApprovalMultiProfile(MultiProfile, AbstractApprovalProfile):
         if profile is not None:
             self.extend(profile)
 
+    def extend(self, iterable: Iterable[AbstractApprovalBallot], force_freeze=True):
+        """
+        Extends the profile by appending all the ballots in the iterable. The ballots are grouped on the set of
+        projects they approve of in a single pass over the iterable, so that only one ballot per group is frozen and
+        validated.
+
+        Parameters
+        ----------
+            iterable : Iterable[:py:class:`~pabutools.election.ballot.approvalballot.AbstractApprovalBallot`]
+                An iterable of ballots to add to the profile.
+            force_freeze : bool, optional
+                Boolean indicating whether subclasses of :py:class:`~pabutools.election.ballot.ballot.Ballot` should be
+                frozen beforehand.
+                Defaults to `True`.
+
+        """
+        counts = {}
+        representatives = {}
+        for ballot in iterable:
+            key = frozenset(ballot)
+            if key in counts:
+                counts[key] += 1
+            else:
+                counts[key] = 1
+                representatives[key] = ballot
+        frozen_counts = {}
+        for key, ballot in representatives.items():
+            if isinstance(ballot, Ballot) and force_freeze:
+                ballot = ballot.frozen()
+            frozen_counts[ballot] = counts[key]
+        self._add_counts(frozen_counts)
+
     @classmethod
     def _wrap_methods(cls, names):
         def wrap_method_closure(name):
@@ -0,0 +1,389 @@
+"""
+Approval profiles stored as bitsets, for fast set operations on large elections.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable, Iterator
+
+import numpy as np
+
+from pabutools.election.ballot import (
+    ApprovalBallot,
+    AbstractApprovalBallot,
+    FrozenApprovalBallot,
+)
+from pabutools.election.instance import Instance, Project
+from pabutools.election.profile.approvalprofile import (
+    AbstractApprovalProfile,
+    ApprovalProfile,
+    ApprovalMultiProfile,
+)
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Counts the number of bits set in each entry of an array of unsigned 64-bit integers. Uses `numpy.bitwise_count`
+    when it is available (NumPy 2.0 and later), and a lookup table on the bytes of the words otherwise.
+
+    Parameters
+    ----------
+        words : np.ndarray
+            The array, of dtype `uint64`.
+
+    Returns
+    -------
+        np.ndarray
+            The number of bits set in each entry, with the same shape as `words`.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].reshape(words.shape + (8,)).sum(-1)
+
+
+class BitsetApprovalProfile:
+    """
+    An approval profile in which every ballot is stored as a bitset over the projects of the instance, packed in
+    unsigned 64-bit integers: the bit `k % 64` of the word `k // 64` of a row is set if the ballot approves of the
+    project with index `k`. Approval scores, co-approval counts or the set of voters approving of a collection of
+    projects are then computed with NumPy operations on all the ballots at once, instead of Python loops over sets.
+
+    The projects are indexed following the order of their names, that is, with the same indices as in an indexed
+    instance (see :py:meth:`~pabutools.election.instance.Instance.index_projects`). Projects of the ballots that do
+    not belong to the instance are ignored.
+
+    The profile is built from an approval profile or multiprofile, one row per ballot of the profile (or per distinct
+    ballot of the multiprofile, together with its multiplicity). It can be converted back with
+    :py:meth:`~pabutools.election.profile.bitsetprofile.BitsetApprovalProfile.as_profile` and
+    :py:meth:`~pabutools.election.profile.bitsetprofile.BitsetApprovalProfile.as_multiprofile`.
+
+    Parameters
+    ----------
+        profile : :py:class:`~pabutools.election.profile.approvalprofile.AbstractApprovalProfile`
+            The approval profile.
+        instance : :py:class:`~pabutools.election.instance.Instance`, optional
+            The instance. Defaults to the instance of the profile.
+
+    Attributes
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects, indexed by their position in the list.
+        ballots : list[:py:class:`~pabutools.election.ballot.approvalballot.AbstractApprovalBallot`]
+            The ballots corresponding to the rows.
+        bits : np.ndarray
+            The bitsets, an array of dtype `uint64` with one row per ballot.
+        multiplicities : np.ndarray
+            The multiplicity of each row.
+        legal_min_length : int | None
+            The legal minimum length of the ballots, copied from the profile.
+        legal_max_length : int | None
+            The legal maximum length of the ballots, copied from the profile.
+        legal_min_cost : Numeric | None
+            The legal minimum cost of the ballots, copied from the profile.
+        legal_max_cost : Numeric | None
+            The legal maximum cost of the ballots, copied from the profile.
+    """
+
+    def __init__(
+        self, profile: AbstractApprovalProfile, instance: Instance | None = None
+    ) -> None:
+        if instance is None:
+            instance = profile.instance
+        self.instance = instance
+        self.legal_min_length = profile.legal_min_length
+        self.legal_max_length = profile.legal_max_length
+        self.legal_min_cost = profile.legal_min_cost
+        self.legal_max_cost = profile.legal_max_cost
+        if instance.is_indexed():
+            self.projects = list(instance.projects_by_index)
+            ballot_ids = instance.project_ids
+        else:
+            self.projects = sorted(instance)
+            ballot_ids = self.project_indices
+        self._project_index = {p: k for k, p in enumerate(self.projects)}
+
+        self.ballots = list(profile)
+        self.multiplicities = np.array(
+            [profile.multiplicity(ballot) for ballot in self.ballots], dtype=np.int64
+        )
+        rows = []
+        ids = []
+        for row, ballot in enumerate(self.ballots):
+            ballot_id_list = ballot_ids(ballot)
+            rows.extend([row] * len(ballot_id_list))
+            ids.extend(ballot_id_list)
+        rows = np.array(rows, dtype=np.int64)
+        ids = np.array(ids, dtype=np.int64)
+        self.bits = np.zeros((len(self.ballots), self.num_words()), dtype=np.uint64)
+        np.bitwise_or.at(
+            self.bits,
+            (rows, ids // 64),
+            np.left_shift(np.uint64(1), (ids % 64).astype(np.uint64)),
+        )
+
+    def num_words(self) -> int:
+        """
+        Returns the number of 64-bit words used for each ballot.
+
+        Returns
+        -------
+            int
+                The number of words.
+        """
+        return max(1, -(-len(self.projects) // 64))
+
+    def __len__(self) -> int:
+        return len(self.ballots)
+
+    def __iter__(self) -> Iterator[AbstractApprovalBallot]:
+        return iter(self.ballots)
+
+    def num_ballots(self) -> int:
+        """
+        Returns the number of voters, multiplicities included.
+
+        Returns
+        -------
+            int
+                The number of voters.
+        """
+        return int(self.multiplicities.sum())
+
+    def project_indices(self, projects: Iterable[Project]) -> list[int]:
+        """
+        Returns the indices of the given projects, ignoring the ones that do not belong to the instance.
+
+        Parameters
+        ----------
+            projects : Iterable[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            list[int]
+                The indices of the projects.
+        """
+        return sorted(
+            self._project_index[p] for p in projects if p in self._project_index
+        )
+
+    def mask(self, projects: Iterable[Project]) -> np.ndarray:
+        """
+        Returns the bitset of a collection of projects.
+
+        Parameters
+        ----------
+            projects : Iterable[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            np.ndarray
+                The bitset, an array of dtype `uint64` of length
+                :py:meth:`~pabutools.election.profile.bitsetprofile.BitsetApprovalProfile.num_words`.
+        """
+        res = np.zeros(self.num_words(), dtype=np.uint64)
+        for index in self.project_indices(projects):
+            res[index // 64] |= np.uint64(1) << np.uint64(index % 64)
+        return res
+
+    def as_boolean_matrix(self) -> np.ndarray:
+        """
+        Returns the profile as a dense boolean matrix, with one row per ballot and one column per project.
+
+        Returns
+        -------
+            np.ndarray
+                The boolean matrix.
+        """
+        as_bytes = self.bits.astype("<u8", copy=False).view(np.uint8)
+        unpacked = np.unpackbits(as_bytes, axis=1, bitorder="little")
+        return unpacked[:, : len(self.projects)].astype(bool)
+
+    def approval_scores(self) -> np.ndarray:
+        """
+        Returns the approval score of every project, multiplicities included.
+
+        Returns
+        -------
+            np.ndarray
+                The approval score of each project, indexed as `projects`.
+        """
+        return self.multiplicities @ self.as_boolean_matrix()
+
+    def approval_score(self, project: Project) -> int:
+        """
+        Returns the approval score of a project, that is, the number of voters who approved of it.
+
+        Parameters
+        ----------
+            project : :py:class:`~pabutools.election.instance.Project`
+                The project.
+
+        Returns
+        -------
+            int
+                The approval score.
+        """
+        indices = self.project_indices([project])
+        if not indices:
+            return 0
+        index = indices[0]
+        bit = np.uint64(1) << np.uint64(index % 64)
+        approves = (self.bits[:, index // 64] & bit) != 0
+        return int(self.multiplicities[approves].sum())
+
+    def intersection_sizes(self, projects: Iterable[Project]) -> np.ndarray:
+        """
+        Returns, for each ballot, the number of projects of the collection it approves of.
+
+        Parameters
+        ----------
+            projects : Iterable[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            np.ndarray
+                The size of the intersection of each ballot with the collection of projects.
+        """
+        return popcount(self.bits & self.mask(projects)).sum(axis=1, dtype=np.int64)
+
+    def ballot_lengths(self) -> np.ndarray:
+        """
+        Returns the number of projects of the instance approved in each ballot.
+
+        Returns
+        -------
+            np.ndarray
+                The length of each ballot.
+        """
+        return popcount(self.bits).sum(axis=1, dtype=np.int64)
+
+    def supporters(self, projects: Collection[Project]) -> np.ndarray:
+        """
+        Returns which ballots approve of all the projects of the collection.
+
+        Parameters
+        ----------
+            projects : Collection[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            np.ndarray
+                A boolean array with one entry per ballot.
+        """
+        mask = self.mask(projects)
+        return ((self.bits & mask) == mask).all(axis=1)
+
+    def num_supporters(self, projects: Collection[Project]) -> int:
+        """
+        Returns the number of voters approving of all the projects of the collection, multiplicities included.
+
+        Parameters
+        ----------
+            projects : Collection[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+
+        Returns
+        -------
+            int
+                The number of voters.
+        """
+        return int(self.multiplicities[self.supporters(projects)].sum())
+
+    def co_approval_matrix(self) -> np.ndarray:
+        """
+        Returns the co-approval matrix of the profile: the entry `(i, j)` is the number of voters approving of both
+        the projects with indices `i` and `j`, multiplicities included. The diagonal contains the approval scores.
+
+        Returns
+        -------
+            np.ndarray
+                The co-approval matrix.
+        """
+        # Integer matrix products do not use BLAS, the counts are exact in floating point up to 2**53
+        dense = self.as_boolean_matrix().astype(np.float64)
+        weighted = dense * self.multiplicities[:, np.newaxis]
+        return np.rint(dense.T @ weighted).astype(np.int64)
+
+    def row_projects(self, row: int) -> list[Project]:
+        """
+        Returns the projects approved in the given row, restricted to the instance.
+
+        Parameters
+        ----------
+            row : int
+                The index of the row.
+
+        Returns
+        -------
+            list[:py:class:`~pabutools.election.instance.Project`]
+                The projects.
+        """
+        as_bytes = self.bits[row].astype("<u8", copy=False).view(np.uint8)
+        indices = np.flatnonzero(np.unpackbits(as_bytes, bitorder="little"))
+        return [self.projects[k] for k in indices if k < len(self.projects)]
+
+    def as_profile(self) -> ApprovalProfile:
+        """
+        Converts the bitset profile into an approval profile, with as many copies of each ballot as its multiplicity.
+        The ballots are restricted to the projects of the instance.
+
+        Returns
+        -------
+            :py:class:`~pabutools.election.profile.approvalprofile.ApprovalProfile`
+                The approval profile.
+        """
+        ballots = []
+        for row, ballot in enumerate(self.ballots):
+            for _ in range(int(self.multiplicities[row])):
+                new_ballot = ApprovalBallot(self.row_projects(row))
+                new_ballot.name = ballot.name
+                new_ballot.meta = ballot.meta
+                ballots.append(new_ballot)
+        return ApprovalProfile(
+            ballots,
+            instance=self.instance,
+            legal_min_length=self.legal_min_length,
+            legal_max_length=self.legal_max_length,
+            legal_min_cost=self.legal_min_cost,
+            legal_max_cost=self.legal_max_cost,
+        )
+
+    def as_multiprofile(self) -> ApprovalMultiProfile:
+        """
+        Converts the bitset profile into an approval multiprofile. The ballots are restricted to the projects of the
+        instance.
+
+        Returns
+        -------
+            :py:class:`~pabutools.election.profile.approvalprofile.ApprovalMultiProfile`
+                The approval multiprofile.
+        """
+        multiprofile = ApprovalMultiProfile(
+            instance=self.instance,
+            legal_min_length=self.legal_min_length,
+            legal_max_length=self.legal_max_length,
+            legal_min_cost=self.legal_min_cost,
+            legal_max_cost=self.legal_max_cost,
+        )
+        for row, multiplicity in enumerate(self.multiplicities.tolist()):
+            # The projects are listed in the order of their indices, the frozen ballots are thus canonical
+            ballot = FrozenApprovalBallot(self.row_projects(row))
+            multiprofile[ballot] = multiprofile.get(ballot, 0) + multiplicity
+        return multiprofile
+
+    def __str__(self) -> str:
+        return "BitsetApprovalProfile[{} ballots, {} projects]".format(
+            len(self.ballots), len(self.projects)
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -4,8 +4,9 @@ Profiles, i.e., collections of ballots.
 
 from __future__ import annotations
 
+import copyreg
 from collections import Counter
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 from abc import ABC, abstractmethod
 
 from pabutools.election.satisfaction import (
@@ -261,6 +262,15 @@ class Profile(list, AbstractProfile):
             self.validate_ballot(item)
         list.extend(self, other)
 
+    def __reduce__(self):
+        # The attributes are restored before the ballots since they are needed to validate the ballots
+        return copyreg.__newobj__, (type(self),), (self.__dict__, list(self))
+
+    def __setstate__(self, state):
+        attributes, ballots = state
+        self.__dict__.update(attributes)
+        list.extend(self, ballots)
+
 
 class MultiProfile(Counter, AbstractProfile):
     """
@@ -320,9 +330,11 @@ class MultiProfile(Counter, AbstractProfile):
             else:
                 instance = Instance()
         AbstractProfile.__init__(self, instance, ballot_validation, ballot_type)
-        if ballot_validation:
-            for item in init:
-                self.validate_ballot(item)
+        # The multiplicities are counted before the validation, which is then done once per distinct ballot
+        if not isinstance(init, Mapping):
+            init = Counter(init)
+        for item in init:
+            self.validate_ballot(item)
         Counter.__init__(self, init)
 
     def multiplicity(self, ballot: FrozenBallot) -> int:
@@ -344,6 +356,15 @@ class MultiProfile(Counter, AbstractProfile):
         self.validate_ballot(key)
         Counter.__setitem__(self, key, value)
 
+    def __reduce__(self):
+        # Counter only pickles the multiplicities, the attributes of the multiprofile would be lost
+        return copyreg.__newobj__, (type(self),), (self.__dict__, dict(self))
+
+    def __setstate__(self, state):
+        attributes, multiplicities = state
+        self.__dict__.update(attributes)
+        dict.update(self, multiplicities)
+
     def append(self, ballot: AbstractBallot):
         """
         Appends a ballot to the profile and update the multiplicity if necessary.
@@ -362,7 +383,8 @@ class MultiProfile(Counter, AbstractProfile):
 
     def extend(self, iterable: Iterable[AbstractBallot], force_freeze=True):
         """
-        Extends the profile by appending all the ballots in the iterable.
+        Extends the profile by appending all the ballots in the iterable. The multiplicities are counted in a single
+        pass over the iterable, and each distinct ballot is then validated and added once.
 
         Parameters
         ----------
@@ -374,8 +396,13 @@ class MultiProfile(Counter, AbstractProfile):
                 Defaults to `True`.
 
         """
-        for ballot in iterable:
-            if isinstance(ballot, Ballot) and force_freeze:
-                self.append(ballot.frozen())
-            else:
-                self.append(ballot)
+        counts = Counter(
+            (ballot.frozen() if isinstance(ballot, Ballot) and force_freeze else ballot)
+            for ballot in iterable
+        )
+        self._add_counts(counts)
+
+    def _add_counts(self, counts: Mapping[FrozenBallot, int]) -> None:
+        for ballot, multiplicity in counts.items():
+            self.validate_ballot(ballot)
+            Counter.__setitem__(self, ballot, self.get(ballot, 0) + multiplicity)
@@ -13,7 +13,10 @@ First thing first, two abstract classes define satisfaction measures:
 As is the case for the profiles (see the module :py:mod:`~pabutools.election.profile`), we introduce satisfaction
 profiles---in the class :py:class:`~pabutools.election.satisfaction.satisfactionprofile.SatisfactionProfile`---and
 satisfaction multiprofiles---in the class
-:py:class:`~pabutools.election.satisfaction.satisfactionprofile.SatisfactionMultiProfile`.
+:py:class:`~pabutools.election.satisfaction.satisfactionprofile.SatisfactionMultiProfile`. When the same
+satisfaction profile is used by several rules, it can be turned into a
+:py:class:`~pabutools.election.satisfaction.satisfactionmatrix.SatisfactionMatrix` that stores all the satisfactions
+in arrays, computed once.
 
 Individual satisfaction measures are defined according to three different classes:
 
@@ -120,12 +123,14 @@ from pabutools.election.satisfaction.positionalsatisfaction import (
     PositionalSatisfaction,
     Additive_Borda_Sat,
 )
+from pabutools.election.satisfaction.satisfactionmatrix import SatisfactionMatrix
 
 __all__ = [
     "SatisfactionMeasure",
     "GroupSatisfactionMeasure",
     "SatisfactionProfile",
     "SatisfactionMultiProfile",
+    "SatisfactionMatrix",
     "AdditiveSatisfaction",
     "Cost_Sat",
     "Cardinality_Sat",
@@ -4,12 +4,11 @@ Additive satisfaction measures.
 
 from __future__ import annotations
 
-from collections.abc import Callable, Collection
+from collections.abc import Callable, Collection, Hashable, Iterable
 
 from pabutools.utils import Numeric
 
 import numpy as np
-from mip import Model, BINARY, maximize, xsum
 
 from pabutools.election.satisfaction.satisfactionmeasure import SatisfactionMeasure
 from pabutools.election.ballot import (
@@ -23,6 +22,7 @@ from pabutools.election.instance import (
     total_cost,
     max_budget_allocation_cardinality,
     max_budget_allocation_cost,
+    max_budget_allocation_score,
 )
 from pabutools.fractions import frac
 
@@ -49,6 +49,10 @@ class AdditiveSatisfaction(SatisfactionMeasure):
         func : Callable[[:py:class:`~pabutools.election.instance.Instance`, :py:class:`~pabutools.election.profile.profile.AbstractProfile`,  :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`, :py:class:`~pabutools.election.instance.Project`, dict[str, str]], Numeric]
             A function taking as input an instance, a profile, a ballot, a project and dictionary of precomputed values
             and returning the score of the project as a fraction.
+        precomputed_values : dict[str, str], optional
+            The precomputed values, typically shared with another ballot with the same preprocessing key, see
+            :py:meth:`~pabutools.election.satisfaction.additivesatisfaction.AdditiveSatisfaction.preprocessing_key`.
+            If not provided, they are computed via the `preprocessing` method.
 
     Attributes
     ----------
@@ -73,11 +77,14 @@ class AdditiveSatisfaction(SatisfactionMeasure):
         func: Callable[
             [Instance, AbstractProfile, AbstractBallot, Project, dict], Numeric
         ],
+        precomputed_values: dict | None = None,
     ) -> None:
         SatisfactionMeasure.__init__(self, instance, profile, ballot)
         self.func = func
         self.scores = dict()
-        self.precomputed_values = self.preprocessing(instance, profile, ballot)
+        if precomputed_values is None:
+            precomputed_values = self.preprocessing(instance, profile, ballot)
+        self.precomputed_values = precomputed_values
 
     def preprocessing(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
@@ -102,6 +109,27 @@ class AdditiveSatisfaction(SatisfactionMeasure):
         """
         return {}
 
+    @classmethod
+    def preprocessing_key(cls, ballot: AbstractBallot) -> Hashable | None:
+        """
+        Returns a key such that two ballots with the same key have the same precomputed values, or `None` if the
+        precomputed values cannot be shared (the default). Satisfaction classes with an expensive preprocessing
+        override this method, typically returning the ballot as a frozen set, so that the preprocessing is only run
+        once per distinct ballot when a whole profile is converted, see
+        :py:func:`~pabutools.election.satisfaction.additivesatisfaction.sat_measures_from_ballots`.
+
+        Parameters
+        ----------
+            ballot : :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
+                The ballot.
+
+        Returns
+        -------
+            Hashable | None
+                The key.
+        """
+        return None
+
     def get_project_sat(self, project: Project) -> Numeric:
         """
         Given a project, computes the corresponding satisfaction. Stores the score after computation to avoid
@@ -137,6 +165,53 @@ class AdditiveSatisfaction(SatisfactionMeasure):
         return self.get_project_sat(project)
 
 
+def sat_measures_from_ballots(
+    sat_class: type[SatisfactionMeasure],
+    instance: Instance,
+    profile: AbstractProfile,
+    ballots: Iterable[AbstractBallot],
+) -> Iterable[SatisfactionMeasure]:
+    """
+    Converts ballots into satisfaction measures of the given class. For additive satisfaction classes that define a
+    preprocessing key (see
+    :py:meth:`~pabutools.election.satisfaction.additivesatisfaction.AdditiveSatisfaction.preprocessing_key`), the
+    preprocessing is memoised on the key: it only runs for the first ballot of each key, and all the other ballots
+    reuse its precomputed values. For the relative satisfaction measures, this avoids solving the same knapsack
+    problem for every voter with the same approval set.
+
+    Parameters
+    ----------
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction class.
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        ballots : Iterable[:py:class:`~pabutools.election.ballot.ballot.AbstractBallot`]
+            The ballots.
+
+    Yields
+    ------
+        :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`
+            The satisfaction measure of each ballot.
+    """
+    if not issubclass(sat_class, AdditiveSatisfaction):
+        for ballot in ballots:
+            yield sat_class(instance, profile, ballot)
+        return
+    memo = {}
+    for ballot in ballots:
+        key = sat_class.preprocessing_key(ballot)
+        if key is None:
+            yield sat_class(instance, profile, ballot)
+        elif key in memo:
+            yield sat_class(instance, profile, ballot, precomputed_values=memo[key])
+        else:
+            sat = sat_class(instance, profile, ballot)
+            memo[key] = sat.precomputed_values
+            yield sat
+
+
 def cardinality_sat_func(
     instance: Instance,
     profile: AbstractProfile,
@@ -184,6 +259,8 @@ class Cardinality_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -247,11 +324,22 @@ class Relative_Cardinality_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
-        self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
+        self,
+        instance: Instance,
+        profile: AbstractProfile,
+        ballot: AbstractBallot,
+        precomputed_values: dict | None = None,
     ):
         AdditiveSatisfaction.__init__(
-            self, instance, profile, ballot, relative_cardinality_sat_func
+            self,
+            instance,
+            profile,
+            ballot,
+            relative_cardinality_sat_func,
+            precomputed_values,
         )
 
     def preprocessing(
@@ -263,6 +351,10 @@ class Relative_Cardinality_Sat(AdditiveSatisfaction):
             )
         }
 
+    @classmethod
+    def preprocessing_key(cls, ballot: AbstractBallot) -> Hashable:
+        return frozenset(ballot)
+
 
 def cost_sat_func(
     instance: Instance,
@@ -311,6 +403,8 @@ class Cost_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -371,11 +465,17 @@ class Relative_Cost_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
-        self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
+        self,
+        instance: Instance,
+        profile: AbstractProfile,
+        ballot: AbstractBallot,
+        precomputed_values: dict | None = None,
     ):
         AdditiveSatisfaction.__init__(
-            self, instance, profile, ballot, relative_cost_sat_func
+            self, instance, profile, ballot, relative_cost_sat_func, precomputed_values
         )
 
     def preprocessing(
@@ -387,6 +487,10 @@ class Relative_Cost_Sat(AdditiveSatisfaction):
             )
         }
 
+    @classmethod
+    def preprocessing_key(cls, ballot: AbstractBallot) -> Hashable:
+        return frozenset(ballot)
+
 
 def relative_cost_approx_normaliser_sat_func(
     instance: Instance,
@@ -440,11 +544,22 @@ class Relative_Cost_Approx_Normaliser_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
-        self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
+        self,
+        instance: Instance,
+        profile: AbstractProfile,
+        ballot: AbstractBallot,
+        precomputed_values: dict | None = None,
     ):
         AdditiveSatisfaction.__init__(
-            self, instance, profile, ballot, relative_cost_approx_normaliser_sat_func
+            self,
+            instance,
+            profile,
+            ballot,
+            relative_cost_approx_normaliser_sat_func,
+            precomputed_values,
         )
 
     def preprocessing(
@@ -454,6 +569,10 @@ class Relative_Cost_Approx_Normaliser_Sat(AdditiveSatisfaction):
             "normalizer": min(total_cost([p for p in ballot]), instance.budget_limit)
         }
 
+    @classmethod
+    def preprocessing_key(cls, ballot: AbstractBallot) -> Hashable:
+        return frozenset(ballot)
+
 
 def add_cost_sqrt_sat_func(
     instance: Instance,
@@ -503,6 +622,8 @@ class Additive_Cost_Sqrt_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -566,6 +687,8 @@ class Additive_Cost_Log_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -632,6 +755,8 @@ class Effort_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -684,6 +809,8 @@ class Additive_Cardinal_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self,
         instance: Instance,
@@ -754,15 +881,23 @@ class Additive_Cardinal_Relative_Sat(AdditiveSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self,
         instance: Instance,
         profile: AbstractProfile,
         ballot: AbstractCardinalBallot,
+        precomputed_values: dict | None = None,
     ) -> None:
         if isinstance(ballot, AbstractCardinalBallot):
             AdditiveSatisfaction.__init__(
-                self, instance, profile, ballot, additive_card_relative_sat_func
+                self,
+                instance,
+                profile,
+                ballot,
+                additive_card_relative_sat_func,
+                precomputed_values,
             )
         else:
             raise ValueError(
@@ -777,20 +912,12 @@ class Additive_Cardinal_Relative_Sat(AdditiveSatisfaction):
         profile: AbstractProfile,
         ballot: AbstractCardinalBallot,
     ):
-        res = 0
-        mip_model = Model()
-        mip_model.verbose = 0
-        p_vars = {
-            p: mip_model.add_var(var_type=BINARY, name="x_{}".format(p))
-            for p in instance
-        }
-        if p_vars:
-            mip_model.objective = maximize(
-                xsum(p_vars[p] * ballot.get(p, 0) for p in instance)
-            )
-            mip_model += (
-                xsum(p_vars[p] * p.cost for p in instance) <= instance.budget_limit
+        return {
+            "max_budget_allocation_score": max_budget_allocation_score(
+                {p: ballot.get(p, 0) for p in instance}, instance.budget_limit
             )
-            mip_model.optimize()
-            res = mip_model.objective.x
-        return {"max_budget_allocation_score": frac(res)}
+        }
+
+    @classmethod
+    def preprocessing_key(cls, ballot: AbstractCardinalBallot) -> Hashable:
+        return frozenset(ballot.items())
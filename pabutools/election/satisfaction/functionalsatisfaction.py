@@ -160,6 +160,8 @@ class CC_Sat(FunctionalSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -224,6 +226,8 @@ class Cost_Sqrt_Sat(FunctionalSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
@@ -266,7 +270,7 @@ def cost_log_sat_func(
             The log cost satisfaction.
 
     """
-    return frac(np.log(1 + total_cost(p for p in projects if p in ballot)))
+    return frac(np.log(1 + float(total_cost(p for p in projects if p in ballot))))
 
 
 class Cost_Log_Sat(FunctionalSatisfaction):
@@ -284,6 +288,8 @@ class Cost_Log_Sat(FunctionalSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ):
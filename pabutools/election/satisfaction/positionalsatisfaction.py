@@ -111,6 +111,8 @@ class Additive_Borda_Sat(PositionalSatisfaction):
             The ballot.
     """
 
+    restricted_to_ballot = True
+
     def __init__(
         self,
         instance: Instance,
@@ -0,0 +1,289 @@
+"""
+Satisfaction matrices, storing the satisfaction of every voter for every project in arrays.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Iterator
+
+import numpy as np
+
+from pabutools.fractions import numeric_dtype, as_numeric_array
+from pabutools.utils import Numeric
+
+from pabutools.election.satisfaction.satisfactionmeasure import (
+    SatisfactionMeasure,
+    GroupSatisfactionMeasure,
+)
+from pabutools.election.satisfaction.additivesatisfaction import AdditiveSatisfaction
+from pabutools.election.instance import Instance, Project
+from pabutools.election.ballot.cardinalballot import AbstractCardinalBallot
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pabutools.election.profile import AbstractProfile
+
+
+class SatisfactionMatrix(GroupSatisfactionMeasure):
+    """
+    A satisfaction profile in which the satisfaction of every voter for every project has been computed once and for
+    all, and stored in NumPy arrays. The rows of the matrix correspond to the satisfaction measures (one per voter,
+    or per distinct ballot for multiprofiles) and the columns to the projects of the instance, in sorted order.
+
+    When all the satisfaction measures are restricted to the ballot (see
+    :py:attr:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure.restricted_to_ballot`), as is
+    the case for approval ballots, only the projects appearing in the ballots are stored, in a sparse matrix in the
+    compressed sparse row (CSR) format. Otherwise, typically for cardinal ballots, the matrix is dense.
+
+    A satisfaction matrix can be used everywhere a satisfaction profile is expected: iterating over it yields the
+    underlying satisfaction measures. The total satisfaction of the projects is however computed once when the
+    matrix is built, so that running several rules on the same election with the same matrix only pays the cost of
+    the satisfaction measures once.
+
+    Parameters
+    ----------
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`, optional
+            The satisfaction profile from which the matrix is built.
+        instance : :py:class:`~pabutools.election.instance.Instance`, optional
+            The instance. Defaults to the instance of the satisfaction profile, or of the profile.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`, optional
+            If no satisfaction profile is given, the matrix is built from the satisfaction profile of this profile for
+            the satisfaction class `sat_class`.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`], optional
+            The satisfaction class used together with the `profile` argument.
+
+    Attributes
+    ----------
+        instance : :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction class used to generate the satisfaction measures.
+        projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects, indexed by their position in the list.
+        project_index : dict[:py:class:`~pabutools.election.instance.Project`, int]
+            The index of each project.
+        sats : list[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction measures, one per row.
+        multiplicities : np.ndarray
+            The multiplicity of each row.
+        is_sparse : bool
+            Whether the matrix is stored in the CSR format.
+        indptr : np.ndarray | None
+            The index pointer of the CSR matrix, `None` if the matrix is dense.
+        indices : np.ndarray | None
+            The column indices of the CSR matrix, sorted within each row, `None` if the matrix is dense.
+        data : np.ndarray
+            The non-zero satisfactions of the CSR matrix, or the dense matrix itself.
+        project_totals : np.ndarray
+            The total satisfaction of each project, multiplicities included.
+    """
+
+    def __init__(
+        self,
+        sat_profile: GroupSatisfactionMeasure | None = None,
+        instance: Instance | None = None,
+        profile: AbstractProfile | None = None,
+        sat_class: type[SatisfactionMeasure] | None = None,
+    ) -> None:
+        GroupSatisfactionMeasure.__init__(self)
+        if sat_profile is None:
+            if profile is None and sat_class is None:
+                sat_profile = []
+            elif profile is None or sat_class is None:
+                raise TypeError(
+                    "If you do not provide a satisfaction profile, you need to provide a profile and a "
+                    "satisfaction class."
+                )
+            else:
+                sat_profile = profile.as_sat_profile(sat_class)
+        if instance is None:
+            instance = getattr(sat_profile, "instance", None)
+            if instance is None and profile is not None:
+                instance = profile.instance
+            if instance is None:
+                instance = Instance()
+        self.instance = instance
+        self.sat_class = getattr(sat_profile, "sat_class", None) or sat_class
+        self.projects = sorted(instance)
+        self.project_index = {p: i for i, p in enumerate(self.projects)}
+        sats = list(sat_profile)
+        self._build(sats, [sat_profile.multiplicity(sat) for sat in sats])
+
+    def _build(self, sats: list[SatisfactionMeasure], multiplicities: list[int]):
+        self.sats = sats
+        self.multiplicities = np.array(multiplicities, dtype=np.int64)
+        # Satisfaction measures built from non-frozen ballots are not hashable, they are identified by their id
+        self._multiplicity_by_id = {
+            id(sat): multiplicity for sat, multiplicity in zip(sats, multiplicities)
+        }
+        self._by_project = None
+        self.is_sparse = all(sat.restricted_to_ballot for sat in sats) and not any(
+            isinstance(sat.ballot, AbstractCardinalBallot) for sat in sats
+        )
+        num_projects = len(self.projects)
+        if self.is_sparse:
+            indptr = [0]
+            indices = []
+            data = []
+            # In an indexed instance, the ids of the projects are their column indices
+            indexed = self.instance.is_indexed()
+            for sat in sats:
+                if indexed:
+                    row = [
+                        (index, sat.sat_project(self.projects[index]))
+                        for index in self.instance.project_ids(sat.ballot)
+                    ]
+                else:
+                    row = sorted(
+                        (
+                            (self.project_index[p], sat.sat_project(p))
+                            for p in sat.ballot
+                            if p in self.project_index
+                        ),
+                        key=lambda entry: entry[0],
+                    )
+                for index, value in row:
+                    if value:
+                        indices.append(index)
+                        data.append(value)
+                indptr.append(len(indices))
+            self.indptr = np.array(indptr, dtype=np.int64)
+            self.indices = np.array(indices, dtype=np.int64)
+            self.data = as_numeric_array(data)
+            self.project_totals = np.zeros(num_projects, dtype=numeric_dtype())
+            row_multiplicities = np.repeat(self.multiplicities, np.diff(self.indptr))
+            np.add.at(self.project_totals, self.indices, self.data * row_multiplicities)
+        else:
+            self.indptr = None
+            self.indices = None
+            self.data = as_numeric_array(
+                [sat.sat_project(p) for sat in sats for p in self.projects]
+            ).reshape((len(sats), num_projects))
+            if len(sats) > 0:
+                self.project_totals = (
+                    self.data * self.multiplicities[:, np.newaxis]
+                ).sum(axis=0)
+            else:
+                self.project_totals = np.zeros(num_projects, dtype=numeric_dtype())
+
+    def __iter__(self) -> Iterator[SatisfactionMeasure]:
+        return iter(self.sats)
+
+    def __len__(self) -> int:
+        return len(self.sats)
+
+    def multiplicity(self, sat: SatisfactionMeasure) -> int:
+        """
+        Returns the multiplicity of the given satisfaction measure, 0 if it is not a row of the matrix.
+
+        Parameters
+        ----------
+            sat : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`
+                The satisfaction measure.
+
+        Returns
+        -------
+            int
+                The multiplicity of the satisfaction measure.
+        """
+        return self._multiplicity_by_id.get(id(sat), 0)
+
+    def row(self, index: int) -> dict[Project, Numeric]:
+        """
+        Returns the non-zero satisfactions of a row of the matrix.
+
+        Parameters
+        ----------
+            index : int
+                The index of the row.
+
+        Returns
+        -------
+            dict[:py:class:`~pabutools.election.instance.Project`, Numeric]
+                The satisfaction for each project with a non-zero satisfaction.
+        """
+        if self.is_sparse:
+            start, end = self.indptr[index], self.indptr[index + 1]
+            return {
+                self.projects[j]: value
+                for j, value in zip(self.indices[start:end], self.data[start:end])
+            }
+        return {
+            self.projects[j]: self.data[index, j]
+            for j in np.flatnonzero(self.data[index])
+        }
+
+    def by_project(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the non-zero entries of the matrix ordered by project, that is, the transpose of the matrix in the
+        CSR format: the rows with a non-zero satisfaction for the project with index `k` are
+        `row_indices[indptr[k]:indptr[k + 1]]`, in increasing order, and their satisfactions are the corresponding
+        entries of `values`. The result is computed once and then cached.
+
+        Returns
+        -------
+            tuple[np.ndarray, np.ndarray, np.ndarray]
+                The index pointer, the row indices and the satisfactions.
+        """
+        if self._by_project is None:
+            num_projects = len(self.projects)
+            if self.is_sparse:
+                rows = np.repeat(np.arange(len(self.sats)), np.diff(self.indptr))
+                order = np.argsort(self.indices, kind="stable")
+                columns = self.indices[order]
+                rows = rows[order]
+                values = self.data[order]
+            else:
+                columns, rows = np.nonzero(self.data.T)
+                values = self.data[rows, columns]
+            indptr = np.zeros(num_projects + 1, dtype=np.int64)
+            np.cumsum(np.bincount(columns, minlength=num_projects), out=indptr[1:])
+            self._by_project = (indptr, rows, values)
+        return self._by_project
+
+    def total_satisfaction_project(self, project: Project) -> Numeric:
+        index = self.project_index.get(project)
+        if index is None:
+            return 0
+        return self.project_totals[index]
+
+    def total_satisfaction_projects(
+        self, projects: Collection[Project]
+    ) -> dict[Project, Numeric]:
+        return {
+            project: self.total_satisfaction_project(project) for project in projects
+        }
+
+    def total_satisfaction(self, projects: Collection[Project]) -> Numeric:
+        # For additive satisfaction measures, the total satisfaction is read from the totals of the projects
+        if all(isinstance(sat, AdditiveSatisfaction) for sat in self.sats):
+            return sum(
+                self.total_satisfaction_project(project) for project in set(projects)
+            )
+        return GroupSatisfactionMeasure.total_satisfaction(self, projects)
+
+    def remove_satisfied(
+        self, sat_bound: dict[str, Numeric], projects: Collection[Project]
+    ) -> SatisfactionMatrix:
+        kept = [
+            (sat, multiplicity)
+            for sat, multiplicity in zip(self.sats, self.multiplicities.tolist())
+            if sat.sat(projects) < sat_bound[sat.ballot.name]
+        ]
+        res = SatisfactionMatrix.__new__(SatisfactionMatrix)
+        GroupSatisfactionMeasure.__init__(res)
+        res.instance = self.instance
+        res.sat_class = self.sat_class
+        res.projects = self.projects
+        res.project_index = self.project_index
+        res._build([sat for sat, _ in kept], [m for _, m in kept])
+        return res
+
+    def __str__(self):
+        return "SatisfactionMatrix[{} rows, {} projects, {}]".format(
+            len(self.sats), len(self.projects), "sparse" if self.is_sparse else "dense"
+        )
+
+    def __repr__(self):
+        return self.__str__()
@@ -46,9 +46,22 @@ class SatisfactionMeasure(ABC):
             The profile.
         ballot : :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
             The ballot.
+        restricted_to_ballot : bool
+            Class attribute indicating whether the satisfaction only depends on the selected projects that appear in
+            the ballot. Rules can then only consider the voters who mention a given project when computing the
+            satisfaction it brings. Defaults to `False`, sub-classes for which this holds should set it to `True`.
+            The attribute is not inherited: a sub-class that does not set it itself is considered as not restricted
+            to the ballot, since it may override the way the satisfaction is computed.
 
     """
 
+    restricted_to_ballot = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "restricted_to_ballot" not in cls.__dict__:
+            cls.restricted_to_ballot = False
+
     def __init__(
         self, instance: Instance, profile: AbstractProfile, ballot: AbstractBallot
     ) -> None:
@@ -174,6 +187,38 @@ class GroupSatisfactionMeasure(ABC, Iterable[SatisfactionMeasure]):
         """
         return sum(sat.sat_project(project) * self.multiplicity(sat) for sat in self)
 
+    def total_satisfaction_projects(
+        self, projects: Collection[Project]
+    ) -> dict[Project, Numeric]:
+        """
+        Computes the total satisfaction of every project in a single pass over the satisfaction measures. For
+        satisfaction measures that are restricted to their ballot, only the projects appearing in the ballot are
+        considered.
+
+        Parameters
+        ----------
+            projects : Iterable[:py:class:`~pabutools.election.instance.Project`]
+                The collection of projects.
+
+        Returns
+        -------
+            dict[:py:class:`~pabutools.election.instance.Project`, Numeric]
+                The total satisfaction of each project.
+
+        """
+        totals = {project: 0 for project in projects}
+        for sat in self:
+            multiplicity = self.multiplicity(sat)
+            if sat.restricted_to_ballot:
+                considered = [p for p in sat.ballot if p in totals]
+            else:
+                considered = totals
+            for project in considered:
+                score = sat.sat_project(project)
+                if score:
+                    totals[project] += score * multiplicity
+        return totals
+
     @abstractmethod
     def remove_satisfied(
         self, sat_bound: dict[AbstractBallot, Numeric], projects: Collection[Project]
@@ -13,6 +13,9 @@ from pabutools.election.satisfaction.satisfactionmeasure import (
     SatisfactionMeasure,
     GroupSatisfactionMeasure,
 )
+from pabutools.election.satisfaction.additivesatisfaction import (
+    sat_measures_from_ballots,
+)
 from pabutools.election.instance import Instance, Project
 from pabutools.election.ballot.ballot import AbstractBallot
 
@@ -103,8 +106,9 @@ class SatisfactionProfile(list[SatisfactionMeasure], GroupSatisfactionMeasure):
             sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
                 The satisfaction class used to convert the ballots into satisfaction measures.
         """
-        for ballot in profile:
-            self.append(sat_class(self.instance, profile, ballot))
+        self.extend(
+            sat_measures_from_ballots(sat_class, self.instance, profile, profile)
+        )
 
     def multiplicity(self, sat: SatisfactionMeasure) -> int:
         """
@@ -274,8 +278,10 @@ class SatisfactionMultiProfile(Counter, GroupSatisfactionMeasure):
             sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
                 The satisfaction class used to convert the ballots into satisfaction measures.
         """
-        for ballot in profile:
-            self.append(sat_class(self.instance, profile, ballot.frozen()))
+        for sat in sat_measures_from_ballots(
+            sat_class, self.instance, profile, (ballot.frozen() for ballot in profile)
+        ):
+            self.append(sat)
 
     def append(self, element: SatisfactionMeasure) -> None:
         """
@@ -305,8 +311,9 @@ class SatisfactionMultiProfile(Counter, GroupSatisfactionMeasure):
             sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
                 The satisfaction class used to convert the ballots into satisfaction measures.
         """
-        for ballot, multiplicity in profile.items():
-            sat = sat_class(self.instance, profile, ballot)
+        multiplicities = list(profile.values())
+        sats = sat_measures_from_ballots(sat_class, self.instance, profile, profile)
+        for sat, multiplicity in zip(sats, multiplicities):
             if sat in self:
                 self[sat] += multiplicity
             else:
@@ -6,6 +6,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
 from gmpy2 import mpq
 
 if TYPE_CHECKING:
@@ -86,3 +87,38 @@ def str_as_frac(s: str) -> Numeric:
         return float(s)
     else:
         raise ValueError(f"The `FRACTION` constant has an unknown value: {FRACTION}")
+
+
+def numeric_dtype() -> type:
+    """
+    Returns the NumPy dtype used to store budgets and satisfactions. It depends on the `FRACTION` constant: gmpy2
+    fractions are stored in object arrays so that all the computations remain exact, floats are stored in `float64`
+    arrays.
+
+    Returns
+    -------
+        type
+            The dtype.
+    """
+    if FRACTION == FLOAT_FRAC:
+        return np.float64
+    return object
+
+
+def as_numeric_array(values) -> np.ndarray:
+    """
+    Converts an iterable of numbers into a NumPy array whose dtype is given by
+    :py:func:`~pabutools.fractions.numeric_dtype`. All the values are passed through
+    :py:func:`~pabutools.fractions.frac` beforehand.
+
+    Parameters
+    ----------
+        values : Iterable[Numeric]
+            The values.
+
+    Returns
+    -------
+        np.ndarray
+            The array.
+    """
+    return np.array([frac(v) for v in values], dtype=numeric_dtype())
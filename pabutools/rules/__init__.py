@@ -25,10 +25,13 @@ from pabutools.rules.exhaustion import (
 from pabutools.rules.greedywelfare import greedy_utilitarian_welfare
 from pabutools.rules.maxwelfare import (
     max_additive_utilitarian_welfare,
+    iter_max_additive_utilitarian_welfare,
     MaxAddUtilWelfareAlgo,
+    MaxWelfareAllocationDetails,
 )
 from pabutools.rules.mes import (
     method_of_equal_shares,
+    method_of_equal_shares_incremental,
     MESAllocationDetails,
     MESIteration,
 )
@@ -44,8 +47,11 @@ __all__ = [
     "exhaustion_by_budget_increase",
     "greedy_utilitarian_welfare",
     "MaxAddUtilWelfareAlgo",
+    "MaxWelfareAllocationDetails",
     "max_additive_utilitarian_welfare",
+    "iter_max_additive_utilitarian_welfare",
     "method_of_equal_shares",
+    "method_of_equal_shares_incremental",
     "sequential_phragmen",
     "social_welfare_comparison",
     "popularity_comparison",
@@ -1,6 +1,7 @@
 from pabutools.rules.greedywelfare.greedywelfare_rule import (
     greedy_utilitarian_scheme,
     greedy_utilitarian_scheme_additive,
+    greedy_utilitarian_scheme_lazy,
     greedy_utilitarian_welfare,
 )
 from pabutools.rules.greedywelfare.greedywelfare_details import (
@@ -10,6 +11,7 @@ from pabutools.rules.greedywelfare.greedywelfare_details import (
 __all__ = [
     "greedy_utilitarian_scheme",
     "greedy_utilitarian_scheme_additive",
+    "greedy_utilitarian_scheme_lazy",
     "greedy_utilitarian_welfare",
     "GreedyWelfareAllocationDetails",
 ]
@@ -4,6 +4,7 @@ Greedy approximations of the maximum welfare.
 
 from __future__ import annotations
 
+import heapq
 from copy import copy
 from collections.abc import Collection, Iterable
 from math import inf
@@ -28,6 +29,52 @@ from pabutools.election.satisfaction import (
 from pabutools.tiebreaking import lexico_tie_breaking, TieBreakingRule
 
 
+def greedy_voter_projects(
+    instance: Instance,
+    sats: list[SatisfactionMeasure],
+    feasible_projects: list[Project],
+    restricted: bool,
+) -> list[list[Project]]:
+    """
+    Returns, for each satisfaction measure, the feasible projects that can change its satisfaction: the ones
+    appearing in its ballot if the measure is restricted to the ballot, all of them otherwise. The order of
+    `feasible_projects`, assumed to be sorted, is preserved. In an indexed instance (see
+    :py:meth:`~pabutools.election.instance.Instance.index_projects`), every ballot is read once through the ids of
+    its projects instead of testing the membership of every feasible project.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        sats : list[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The satisfaction measures.
+        feasible_projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The feasible projects, sorted.
+        restricted : bool
+            Whether all the satisfaction measures are restricted to their ballot.
+
+    Returns
+    -------
+        list[list[:py:class:`~pabutools.election.instance.Project`]]
+            The projects to consider for each satisfaction measure.
+    """
+    if not restricted:
+        return [feasible_projects] * len(sats)
+    if instance.is_indexed():
+        # The order of the ids is the order of the names, that is, the sorted order
+        feasible_by_id = [None] * len(instance)
+        for p in feasible_projects:
+            feasible_by_id[instance.project_id(p)] = p
+        voter_projects = []
+        for sat in sats:
+            ballot_projects = (
+                feasible_by_id[i] for i in instance.project_ids(sat.ballot)
+            )
+            voter_projects.append([p for p in ballot_projects if p is not None])
+        return voter_projects
+    return [[p for p in feasible_projects if p in sat.ballot] for sat in sats]
+
+
 def greedy_utilitarian_scheme(
     instance: Instance,
     profile: AbstractProfile,
@@ -67,56 +114,14 @@ def greedy_utilitarian_scheme(
             (:code:`resoluteness == False`).
     """
 
-    def aux(inst, prof, feasible, sats, allocs, alloc, tie, resolute):
-        if len(feasible) == 0:
-            if resolute:
-                allocs.append(alloc)
-            else:
-                alloc.sort()
-                if alloc not in allocs:
-                    allocs.append(alloc)
-        else:
-            best_marginal_score = None
-            argmax_marginal_score = []
-            for project in feasible:
-                new_alloc = copy(alloc)
-                new_alloc.append(project)
-                if project.cost > 0:
-                    total_marginal_score = frac(
-                        sats.total_satisfaction(new_alloc)
-                        - sats.total_satisfaction(alloc),
-                        project.cost,
-                    )
-                else:
-                    total_marginal_score = inf
-
-                if (
-                    best_marginal_score is None
-                    or total_marginal_score > best_marginal_score
-                ):
-                    best_marginal_score = total_marginal_score
-                    argmax_marginal_score = [project]
-                elif total_marginal_score == best_marginal_score:
-                    argmax_marginal_score.append(project)
-            tied_projects = tie.order(inst, prof, argmax_marginal_score)
-            if resolute:
-                tied_projects = tied_projects[:1]
-            for selected_project in tied_projects:
-                new_alloc = copy(alloc)
-                new_alloc.append(selected_project)
-                new_cost = total_cost(new_alloc)
-                new_feasible = []
-                for project in feasible:
-                    if (
-                        project != selected_project
-                        and new_cost + project.cost <= instance.budget_limit
-                    ):
-                        new_feasible.append(project)
-                aux(inst, prof, new_feasible, sats, allocs, new_alloc, tie, resolute)
+    sats = list(sat_profile)
+    multiplicities = [sat_profile.multiplicity(sat) for sat in sats]
+    # If the satisfaction of a voter only depends on the selected projects they mention, the marginal gains only need
+    # to be updated for the voters mentioning the last selected project.
+    restricted = all(sat.restricted_to_ballot for sat in sats)
 
     initial_budget_allocation = BudgetAllocation(budget_allocation)
     initial_cost = total_cost(initial_budget_allocation)
-    all_budget_allocations: list[BudgetAllocation] = []
     feasible_projects = []
     for p in instance:
         if (
@@ -125,22 +130,231 @@ def greedy_utilitarian_scheme(
         ):
             feasible_projects.append(p)
     feasible_projects = sorted(feasible_projects)
-    aux(
-        instance,
-        profile,
-        feasible_projects,
-        sat_profile,
-        all_budget_allocations,
-        initial_budget_allocation,
-        tie_breaking,
-        resoluteness,
+    voter_projects = greedy_voter_projects(
+        instance, sats, feasible_projects, restricted
     )
+    supporters = {p: [] for p in feasible_projects}
+    for i, projects in enumerate(voter_projects):
+        for p in projects:
+            supporters[p].append(i)
+
+    def marginal_gains(selection, current_sats, voters, gains, sign):
+        # Adds (or removes, if sign is -1) the marginal gains of the voters to the gains of the projects
+        for i in voters:
+            sat = sats[i]
+            if restricted:
+                voter_selection = [p for p in selection if p in sat.ballot]
+            else:
+                voter_selection = selection
+            for project in voter_projects[i]:
+                if project in gains:
+                    voter_selection.append(project)
+                    gain = sat.sat(voter_selection) - current_sats[i]
+                    voter_selection.pop()
+                    if gain:
+                        gains[project] += sign * gain * multiplicities[i]
+
+    selection = list(initial_budget_allocation)
+    current_sats = [sat.sat(selection) for sat in sats]
+    gains = {p: 0 for p in feasible_projects}
+    marginal_gains(selection, current_sats, range(len(sats)), gains, 1)
+
+    all_budget_allocations: list[BudgetAllocation] = []
+    # Explicit depth-first exploration of the tied branches:
+    # (budget allocation, cost, satisfaction of the voters, marginal gain of the feasible projects)
+    states = [(initial_budget_allocation, initial_cost, current_sats, gains)]
+    while states:
+        alloc, cost, current_sats, gains = states.pop()
+        if len(gains) == 0:
+            if resoluteness:
+                all_budget_allocations.append(alloc)
+            else:
+                alloc.sort()
+                if alloc not in all_budget_allocations:
+                    all_budget_allocations.append(alloc)
+            continue
+
+        best_marginal_score = None
+        argmax_marginal_score = []
+        for project, gain in gains.items():
+            if project.cost > 0:
+                total_marginal_score = frac(gain, project.cost)
+            else:
+                total_marginal_score = inf
+            if (
+                best_marginal_score is None
+                or total_marginal_score > best_marginal_score
+            ):
+                best_marginal_score = total_marginal_score
+                argmax_marginal_score = [project]
+            elif total_marginal_score == best_marginal_score:
+                argmax_marginal_score.append(project)
+        tied_projects = tie_breaking.order(instance, profile, argmax_marginal_score)
+        if resoluteness:
+            tied_projects = tied_projects[:1]
+
+        new_states = []
+        for selected_project in tied_projects:
+            new_alloc = copy(alloc)
+            new_alloc.append(selected_project)
+            new_cost = cost + selected_project.cost
+            new_gains = {
+                p: gain
+                for p, gain in gains.items()
+                if p != selected_project and new_cost + p.cost <= instance.budget_limit
+            }
+            new_sats = list(current_sats)
+            if restricted:
+                affected = supporters[selected_project]
+                selection = list(alloc)
+                marginal_gains(selection, current_sats, affected, new_gains, -1)
+            else:
+                affected = range(len(sats))
+                new_gains = {p: 0 for p in new_gains}
+            selection = list(new_alloc)
+            for i in affected:
+                new_sats[i] = sats[i].sat(selection)
+            marginal_gains(selection, new_sats, affected, new_gains, 1)
+            new_states.append((new_alloc, new_cost, new_sats, new_gains))
+        states.extend(reversed(new_states))
+
     if resoluteness:
         return all_budget_allocations[0]
     else:
         return all_budget_allocations
 
 
+def greedy_utilitarian_scheme_lazy(
+    instance: Instance,
+    profile: AbstractProfile,
+    sat_profile: GroupSatisfactionMeasure,
+    budget_allocation: BudgetAllocation,
+    tie_breaking: TieBreakingRule,
+    analytics: bool = False,
+) -> BudgetAllocation:
+    """
+    Lazy version of the inner algorithm for the greedy rule, for resolute outcomes and submodular satisfaction
+    measures, such as :py:class:`~pabutools.election.satisfaction.functionalsatisfaction.CC_Sat` or
+    :py:class:`~pabutools.election.satisfaction.functionalsatisfaction.Cost_Sqrt_Sat`. The projects are stored in a
+    priority queue keyed by their last computed marginal satisfaction divided by their cost. For submodular
+    satisfaction measures, the marginal satisfaction of a project can only decrease as projects are selected, so a
+    stale value is an upper bound on the actual one. In each round, only the projects at the top of the queue whose
+    value is stale are re-evaluated (this is the accelerated greedy algorithm of Minoux). The outcome is the same as the
+    one of :py:func:`~pabutools.rules.greedywelfare.greedywelfare_rule.greedy_utilitarian_scheme`, but is not
+    guaranteed to be if the satisfaction measure is not submodular.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+        tie_breaking : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        analytics: bool, optional
+            (De)Activate the calculation of analytics. The score recorded for each project is its last computed
+            marginal satisfaction divided by its cost, that is, its score when it was selected for the selected
+            projects. Defaults to False.
+    Returns
+    -------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The selected projects.
+    """
+    sats = list(sat_profile)
+    multiplicities = [sat_profile.multiplicity(sat) for sat in sats]
+    restricted = all(sat.restricted_to_ballot for sat in sats)
+
+    selection = BudgetAllocation(
+        budget_allocation, details=GreedyWelfareAllocationDetails()
+    )
+    remaining_budget = instance.budget_limit - total_cost(selection)
+    feasible_projects = sorted(
+        p for p in instance if p not in selection and p.cost <= remaining_budget
+    )
+    voter_projects = greedy_voter_projects(
+        instance, sats, feasible_projects, restricted
+    )
+    supporters = {p: [] for p in feasible_projects}
+    for i, projects in enumerate(voter_projects):
+        for p in projects:
+            supporters[p].append(i)
+
+    # The satisfaction of the voters is computed on the selected projects they mention if it only depends on those
+    if restricted:
+        voter_selections = [[p for p in selection if p in sat.ballot] for sat in sats]
+    else:
+        voter_selections = [list(selection)] * len(sats)
+    current_sats = [sat.sat(voter_selections[i]) for i, sat in enumerate(sats)]
+
+    def marginal_score(project):
+        if project.cost == 0:
+            return inf
+        gain = 0
+        for i in supporters[project]:
+            voter_selection = voter_selections[i]
+            voter_selection.append(project)
+            diff = sats[i].sat(voter_selection) - current_sats[i]
+            voter_selection.pop()
+            if diff:
+                gain += diff * multiplicities[i]
+        return frac(gain, project.cost)
+
+    # The rank in the sorted list of feasible projects avoids comparing projects when the scores are equal
+    queue = [(-marginal_score(p), rank, p) for rank, p in enumerate(feasible_projects)]
+    heapq.heapify(queue)
+    up_to_date = set(feasible_projects)
+    if analytics:
+        project_details = {
+            p: GreedyWelfareProjectDetails(p, score=-neg_score)
+            for neg_score, _, p in queue
+        }
+        selection.details.projects.extend(project_details[p] for p in feasible_projects)
+
+    while True:
+        best_score = None
+        tied_projects = []
+        while queue:
+            neg_score, rank, project = queue[0]
+            if best_score is not None and -neg_score < best_score:
+                break
+            heapq.heappop(queue)
+            if project.cost > remaining_budget:
+                continue
+            if project in up_to_date:
+                best_score = -neg_score
+                tied_projects.append((rank, project))
+                continue
+            up_to_date.add(project)
+            score = marginal_score(project)
+            if analytics:
+                project_details[project].score = score
+            heapq.heappush(queue, (-score, rank, project))
+        if not tied_projects:
+            return selection
+        ranks = {project: rank for rank, project in tied_projects}
+        tied_projects = tie_breaking.order(instance, profile, list(ranks))
+        selected_project = tied_projects[0]
+        for project in tied_projects[1:]:
+            heapq.heappush(queue, (-best_score, ranks[project], project))
+        selection.append(selected_project)
+        remaining_budget -= selected_project.cost
+        if analytics:
+            selection.details.mark_as_selected(selected_project, remaining_budget)
+        if restricted:
+            for i in supporters[selected_project]:
+                voter_selections[i].append(selected_project)
+                current_sats[i] = sats[i].sat(voter_selections[i])
+                up_to_date.difference_update(voter_projects[i])
+        elif sats:
+            voter_selections[0].append(selected_project)
+            current_sats = [sat.sat(voter_selections[0]) for sat in sats]
+            up_to_date.clear()
+
+
 def greedy_utilitarian_scheme_additive(
     instance: Instance,
     profile: AbstractProfile,
@@ -183,8 +397,8 @@ def greedy_utilitarian_scheme_additive(
             sat_profile,
             budget_allocation,
             tie_breaking,
-            resoluteness,
-            analytics,
+            resoluteness=resoluteness,
+            analytics=analytics,
         )
 
     projects = sorted(instance)
@@ -192,33 +406,42 @@ def greedy_utilitarian_scheme_additive(
         projects.remove(project)
     projects = tie_breaking.order(instance, profile, projects)
 
+    total_sats = sat_profile.total_satisfaction_projects(projects)
+
     def satisfaction_density(proj):
-        total_sat = sat_profile.total_satisfaction_project(proj)
+        total_sat = total_sats[proj]
         if total_sat > 0:
             if proj.cost > 0:
                 return frac(total_sat, proj.cost)
             return inf
         return 0
 
+    densities = {project: satisfaction_density(project) for project in projects}
     selection = BudgetAllocation(
         budget_allocation, details=GreedyWelfareAllocationDetails()
     )
     if analytics:
         selection.details.projects.extend(
             [
-                GreedyWelfareProjectDetails(
-                    project, score=satisfaction_density(project)
-                )
+                GreedyWelfareProjectDetails(project, score=densities[project])
                 for project in projects
             ]
         )
     # We sort based on a tuple to ensure ties are broken as intended
-    ordered_projects = sorted(
-        projects, key=lambda p: (-satisfaction_density(p), projects.index(p))
-    )
+    ranks = {project: rank for rank, project in enumerate(projects)}
+    ordered_projects = sorted(projects, key=lambda p: (-densities[p], ranks[p]))
+
+    # Cheapest project among the ones not yet considered, to stop as soon as none of them fits in the budget
+    cheapest_remaining = [None] * len(ordered_projects)
+    cheapest = inf
+    for index in range(len(ordered_projects) - 1, -1, -1):
+        cheapest = min(cheapest, ordered_projects[index].cost)
+        cheapest_remaining[index] = cheapest
 
     remaining_budget = instance.budget_limit - total_cost(budget_allocation)
-    for project in ordered_projects:
+    for index, project in enumerate(ordered_projects):
+        if cheapest_remaining[index] > remaining_budget:
+            break
         if project.cost <= remaining_budget:
             selection.append(project)
             remaining_budget -= project.cost
@@ -237,6 +460,7 @@ def greedy_utilitarian_welfare(
     resoluteness: bool = True,
     initial_budget_allocation: Collection[Project] | None = None,
     analytics: bool = False,
+    lazy: bool = False,
 ) -> BudgetAllocation | list[BudgetAllocation]:
     """
     General greedy scheme for approximating the utilitarian welfare. It selects projects in rounds, each time selecting
@@ -270,6 +494,11 @@ def greedy_utilitarian_welfare(
             Defaults to True.
         analytics: bool, optional
             (De)Activate the calculation of analytics. Defaults to False.
+        lazy: bool, optional
+            Set to `True` to only re-evaluate the marginal satisfaction of the projects when they could be selected,
+            see :py:func:`~pabutools.rules.greedywelfare.greedywelfare_rule.greedy_utilitarian_scheme_lazy`. This is
+            only correct for submodular satisfaction measures and only used for resolute outcomes with non-additive
+            satisfaction measures. Defaults to `False`.
 
     Returns
     -------
@@ -303,6 +532,15 @@ def greedy_utilitarian_welfare(
             resoluteness=resoluteness,
             analytics=analytics,
         )
+    if lazy and resoluteness:
+        return greedy_utilitarian_scheme_lazy(
+            instance,
+            profile,
+            sat_profile,
+            budget_allocation,
+            tie_breaking,
+            analytics=analytics,
+        )
     return greedy_utilitarian_scheme(
         instance,
         profile,
@@ -4,13 +4,17 @@ Welfare-maximizing rules.
 
 from __future__ import annotations
 
-from collections.abc import Collection, Iterable
+from collections.abc import Collection, Iterable, Iterator
+from fractions import Fraction
+from time import perf_counter
 
 import mip
 from mip import Model, xsum, maximize, BINARY
 
 import math
 
+import numpy as np
+
 from pabutools.election import (
     Instance,
     SatisfactionMeasure,
@@ -19,8 +23,9 @@ from pabutools.election import (
     GroupSatisfactionMeasure,
     AbstractProfile,
 )
-from pabutools.rules.budgetallocation import BudgetAllocation
-from pabutools.utils import DocEnum
+from pabutools.fractions import as_numeric_array
+from pabutools.rules.budgetallocation import BudgetAllocation, AllocationDetails
+from pabutools.utils import DocEnum, Numeric
 
 
 class MaxAddUtilWelfareAlgo(DocEnum):
@@ -41,6 +46,49 @@ class MaxAddUtilWelfareAlgo(DocEnum):
         "the outcome.",
     )
 
+    DYNAMIC_PROGRAMMING = (
+        3,
+        "Uses the pseudo-polynomial dynamic programming algorithm for knapsack problems, "
+        "over the budget axis once the costs have been scaled to small integers.",
+    )
+
+
+DP_MAX_TABLE_SIZE = 2 * 10**7
+"""Largest number of cells (projects times scaled budget) for which the dynamic programming algorithm is used by
+default."""
+
+DP_ENUMERATION_MAX_TABLE_SIZE = 2 * 10**6
+"""Largest number of cells (projects times scaled budget) for which the dynamic programming algorithm is used by
+default for irresolute outcomes. The whole table of profits is then kept in memory, instead of one bit per cell."""
+
+PRIMAL_DUAL_MAX_PROJECTS = 300
+"""Largest number of projects for which the primal/dual algorithm, that is recursive, is used by default."""
+
+
+class MaxWelfareAllocationDetails(AllocationDetails):
+    """
+    Details of a run of :py:func:`~pabutools.rules.maxwelfare.max_additive_utilitarian_welfare`.
+
+    Parameters
+    ----------
+        inner_algo : :py:class:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo`
+            The inner algorithm used.
+        computation_time : float
+            The time spent in the inner algorithm, in seconds.
+
+    Attributes
+    ----------
+        inner_algo : :py:class:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo`
+            The inner algorithm used.
+        computation_time : float
+            The time spent in the inner algorithm, in seconds.
+    """
+
+    def __init__(self, inner_algo: MaxAddUtilWelfareAlgo, computation_time: float):
+        super().__init__()
+        self.inner_algo = inner_algo
+        self.computation_time = computation_time
+
 
 def max_additive_utilitarian_welfare_ilp_scheme(
     instance: Instance,
@@ -69,7 +117,7 @@ def max_additive_utilitarian_welfare_ilp_scheme(
             The selected projects if resolute (:code:`resoluteness == True`), or the set of selected projects if irresolute
             (:code:`resoluteness == False`).
     """
-    score = {p: sat_profile.total_satisfaction_project(p) for p in instance}
+    score = sat_profile.total_satisfaction_projects(instance)
 
     mip_model = Model("MaxWelfare")
     mip_model.verbose = 0
@@ -130,14 +178,15 @@ def max_additive_utilitarian_welfare_primal_dual_scheme(
     budget_allocation = BudgetAllocation(initial_budget_allocation)
 
     items = []
-    for p in instance:
-        if p not in budget_allocation:
-            profit = sat_profile.total_satisfaction_project(p)
-            if p.cost == 0:
-                if profit > 0:
-                    budget_allocation.append(p)
-            else:
-                items.append(KnapsackItem(p, p.cost, profit))
+    profits = sat_profile.total_satisfaction_projects(
+        [p for p in instance if p not in budget_allocation]
+    )
+    for p, profit in profits.items():
+        if p.cost == 0:
+            if profit > 0:
+                budget_allocation.append(p)
+        else:
+            items.append(KnapsackItem(p, p.cost, profit))
 
     current_budget_limit = instance.budget_limit - total_cost(budget_allocation)
     result = primal_dual_branch(items, current_budget_limit)
@@ -145,6 +194,346 @@ def max_additive_utilitarian_welfare_primal_dual_scheme(
     return budget_allocation
 
 
+def as_fraction(value: Numeric) -> Fraction:
+    """
+    Converts a number into an exact Python fraction.
+
+    Parameters
+    ----------
+        value : Numeric
+            The number, either an integer, a float or a gmpy2 rational.
+
+    Returns
+    -------
+        Fraction
+            The corresponding fraction.
+    """
+    if isinstance(value, float):
+        return Fraction(value)
+    return Fraction(int(value.numerator), int(value.denominator))
+
+
+def knapsack_integer_weights(
+    costs: Iterable[Numeric], capacity: Numeric
+) -> tuple[list[int], int]:
+    """
+    Scales the costs and the capacity of a knapsack problem so that the costs become integers that are as small as
+    possible: the costs are first multiplied by the least common multiple of their denominators, and then divided by
+    the greatest common divisor of the resulting integers. The capacity is scaled in the same way and rounded down,
+    which does not change the set of feasible solutions.
+
+    Parameters
+    ----------
+        costs : Iterable[Numeric]
+            The costs, assumed to be positive.
+        capacity : Numeric
+            The capacity.
+
+    Returns
+    -------
+        tuple[list[int], int]
+            The scaled costs and the scaled capacity.
+    """
+    costs = [as_fraction(c) for c in costs]
+    multiplier = math.lcm(*(c.denominator for c in costs))
+    weights = [int(c * multiplier) for c in costs]
+    divisor = math.gcd(*weights)
+    if divisor > 1:
+        weights = [w // divisor for w in weights]
+        multiplier = Fraction(multiplier, divisor)
+    capacity = as_fraction(capacity)
+    return weights, math.floor(capacity * multiplier)
+
+
+def knapsack_profit_array(profits: list[Numeric]) -> np.ndarray:
+    """
+    Converts the profits of a knapsack problem into a NumPy array. Integer profits are stored as native 64-bit
+    integers when they cannot overflow, the other ones with the dtype given by
+    :py:func:`~pabutools.fractions.numeric_dtype`.
+
+    Parameters
+    ----------
+        profits : list[Numeric]
+            The profit of each item.
+
+    Returns
+    -------
+        np.ndarray
+            The profits.
+    """
+    if all(int(p) == p for p in profits) and sum(abs(int(p)) for p in profits) < 2**62:
+        return np.array([int(p) for p in profits], dtype=np.int64)
+    return as_numeric_array(profits)
+
+
+def dynamic_programming_knapsack(
+    profits: list[Numeric], weights: list[int], capacity: int
+) -> list[int]:
+    """
+    Solves a 0/1 knapsack problem with integer weights by dynamic programming over the capacity. The table of the
+    best profit for each capacity is updated one item at a time with NumPy operations, and the decisions are stored
+    to recover an optimal solution at the end. Runs in time and space proportional to the number of items times the
+    capacity.
+
+    Parameters
+    ----------
+        profits : list[Numeric]
+            The profit of each item.
+        weights : list[int]
+            The weight of each item, positive integers.
+        capacity : int
+            The capacity, an integer.
+
+    Returns
+    -------
+        list[int]
+            The indices of the items of an optimal solution.
+    """
+    if capacity < 0:
+        return []
+    profits = knapsack_profit_array(profits)
+    best = np.zeros(capacity + 1, dtype=profits.dtype)
+    taken = np.zeros((len(weights), capacity + 1), dtype=bool)
+    for i, (profit, weight) in enumerate(zip(profits, weights)):
+        if weight > capacity or profit <= 0:
+            continue
+        with_item = best[: capacity + 1 - weight] + profit
+        improved = with_item > best[weight:]
+        best[weight:][improved] = with_item[improved]
+        taken[i, weight:] = improved
+
+    selected = []
+    remaining = capacity
+    for i in range(len(weights) - 1, -1, -1):
+        if taken[i, remaining]:
+            selected.append(i)
+            remaining -= weights[i]
+    selected.reverse()
+    return selected
+
+
+def dynamic_programming_knapsack_table(
+    profits: list[Numeric], weights: list[int], capacity: int
+) -> list[np.ndarray]:
+    """
+    Computes the full table of the dynamic programming algorithm for the 0/1 knapsack problem: the row `i` of the
+    table gives, for each capacity up to `capacity`, the best profit that can be achieved with the first `i` items.
+    Unlike :py:func:`~pabutools.rules.maxwelfare.dynamic_programming_knapsack`, items with a weight of 0 are
+    supported.
+
+    Parameters
+    ----------
+        profits : list[Numeric]
+            The profit of each item.
+        weights : list[int]
+            The weight of each item, non-negative integers.
+        capacity : int
+            The capacity, a non-negative integer.
+
+    Returns
+    -------
+        list[np.ndarray]
+            The rows of the table, there is one more row than there are items.
+    """
+    profits = knapsack_profit_array(profits)
+    rows = [np.zeros(capacity + 1, dtype=profits.dtype)]
+    for profit, weight in zip(profits, weights):
+        previous = rows[-1]
+        row = previous.copy()
+        if weight <= capacity:
+            with_item = previous[: capacity + 1 - weight] + profit
+            without_item = previous[weight:]
+            row[weight:] = np.where(with_item > without_item, with_item, without_item)
+        rows.append(row)
+    return rows
+
+
+def enumerate_knapsack_optima(
+    profits: list[Numeric], weights: list[int], capacity: int
+) -> Iterator[list[int]]:
+    """
+    Enumerates all the optimal solutions of a 0/1 knapsack problem with integer weights. The table of
+    :py:func:`~pabutools.rules.maxwelfare.dynamic_programming_knapsack_table` is computed once, and the solutions are
+    then read from it backwards: an item can be left out (respectively taken) only if the best profit without it
+    (respectively with it) is still the optimal one. Every branch that is explored thus leads to an optimal solution,
+    and each solution is found in time linear in the number of items. The solutions are generated lazily, so that the
+    enumeration can be stopped at any time.
+
+    Ties are detected by comparing profits, they are thus only exact with integer or rational profits.
+
+    Parameters
+    ----------
+        profits : list[Numeric]
+            The profit of each item.
+        weights : list[int]
+            The weight of each item, non-negative integers.
+        capacity : int
+            The capacity, an integer.
+
+    Yields
+    ------
+        list[int]
+            The sorted indices of the items of each optimal solution.
+    """
+    if capacity < 0:
+        return
+    rows = dynamic_programming_knapsack_table(profits, weights, capacity)
+    profits = knapsack_profit_array(profits)
+    # Explicit depth-first exploration: (number of items still to decide, remaining capacity, items taken)
+    states = [(len(weights), capacity, [])]
+    while states:
+        i, remaining, taken = states.pop()
+        if i == 0:
+            yield sorted(taken)
+            continue
+        target = rows[i][remaining]
+        weight = weights[i - 1]
+        if (
+            weight <= remaining
+            and rows[i - 1][remaining - weight] + profits[i - 1] == target
+        ):
+            states.append((i - 1, remaining - weight, taken + [i - 1]))
+        if rows[i - 1][remaining] == target:
+            states.append((i - 1, remaining, taken))
+
+
+def max_additive_utilitarian_welfare_dp_scheme(
+    instance: Instance,
+    sat_profile: GroupSatisfactionMeasure,
+    initial_budget_allocation: Collection[Project],
+) -> BudgetAllocation:
+    """
+    Computes a budget allocation maximising the additive utilitarian welfare by dynamic programming, see
+    :py:func:`~pabutools.rules.maxwelfare.dynamic_programming_knapsack`. The costs are first scaled to integers, see
+    :py:func:`~pabutools.rules.maxwelfare.knapsack_integer_weights`. Note that there is no control over the way ties
+    are broken.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        initial_budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+
+    Returns
+    -------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The selected projects.
+    """
+    budget_allocation = BudgetAllocation(initial_budget_allocation)
+    profits = sat_profile.total_satisfaction_projects(
+        [p for p in instance if p not in budget_allocation]
+    )
+    projects = []
+    for p, profit in profits.items():
+        if p.cost == 0:
+            if profit > 0:
+                budget_allocation.append(p)
+        else:
+            projects.append(p)
+    if not projects:
+        return budget_allocation
+
+    weights, capacity = knapsack_integer_weights(
+        [p.cost for p in projects],
+        instance.budget_limit - total_cost(budget_allocation),
+    )
+    selected = dynamic_programming_knapsack(
+        [profits[p] for p in projects], weights, capacity
+    )
+    budget_allocation.extend(projects[i] for i in selected)
+    return budget_allocation
+
+
+def max_additive_utilitarian_welfare_dp_enumeration_scheme(
+    instance: Instance,
+    sat_profile: GroupSatisfactionMeasure,
+    initial_budget_allocation: Collection[Project],
+) -> Iterator[BudgetAllocation]:
+    """
+    Enumerates all the budget allocations maximising the additive utilitarian welfare, see
+    :py:func:`~pabutools.rules.maxwelfare.enumerate_knapsack_optima`. Contrary to the ILP solver, which needs to solve
+    the problem again after each budget allocation has been found, the dynamic programming table is only computed
+    once. The budget allocations are generated lazily.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        initial_budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+
+    Yields
+    ------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The budget allocations maximising the utilitarian welfare, each one exactly once.
+    """
+    projects = sorted(p for p in instance if p not in initial_budget_allocation)
+    profits = sat_profile.total_satisfaction_projects(projects)
+    capacity = instance.budget_limit - total_cost(initial_budget_allocation)
+    if capacity < 0:
+        return
+    weights, scaled_capacity = knapsack_integer_weights(
+        [p.cost for p in projects], capacity
+    )
+    for selected in enumerate_knapsack_optima(
+        [profits[p] for p in projects], weights, scaled_capacity
+    ):
+        yield BudgetAllocation(
+            list(initial_budget_allocation) + [projects[i] for i in selected]
+        )
+
+
+def max_additive_utilitarian_welfare_auto_algo(
+    instance: Instance,
+    initial_budget_allocation: Collection[Project],
+    resoluteness: bool = True,
+) -> MaxAddUtilWelfareAlgo:
+    """
+    Chooses the inner algorithm used by :py:func:`~pabutools.rules.maxwelfare.max_additive_utilitarian_welfare` when
+    none is specified. The dynamic programming algorithm is used if the scaled budget is small enough (see
+    :py:data:`~pabutools.rules.maxwelfare.DP_MAX_TABLE_SIZE`, and
+    :py:data:`~pabutools.rules.maxwelfare.DP_ENUMERATION_MAX_TABLE_SIZE` for irresolute outcomes). Otherwise, resolute
+    outcomes are computed with the primal/dual algorithm if there are not too many projects (see
+    :py:data:`~pabutools.rules.maxwelfare.PRIMAL_DUAL_MAX_PROJECTS`), and the ILP solver is used in all other cases.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        initial_budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+        resoluteness : bool, optional
+            Whether the outcome should be resolute or not. Defaults to True.
+
+    Returns
+    -------
+        :py:class:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo`
+            The algorithm to use.
+    """
+    costs = [
+        p.cost for p in instance if p not in initial_budget_allocation and p.cost > 0
+    ]
+    if not costs:
+        return MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING
+    capacity = instance.budget_limit - total_cost(initial_budget_allocation)
+    max_table_size = (
+        DP_MAX_TABLE_SIZE if resoluteness else DP_ENUMERATION_MAX_TABLE_SIZE
+    )
+    # Only look at the denominators first, to avoid computing huge weights in float mode
+    if math.lcm(*(as_fraction(c).denominator for c in costs)) < 2**32:
+        _, scaled_capacity = knapsack_integer_weights(costs, capacity)
+        if len(costs) * (scaled_capacity + 1) <= max_table_size:
+            return MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING
+    if resoluteness and len(costs) <= PRIMAL_DUAL_MAX_PROJECTS:
+        return MaxAddUtilWelfareAlgo.PRIMAL_DUAL
+    return MaxAddUtilWelfareAlgo.ILP_SOLVER
+
+
 class KnapsackItem:
     def __init__(self, project, weight, profit):
         self.project = project
@@ -318,10 +707,11 @@ def max_additive_utilitarian_welfare(
     satisfaction is computed using the satisfaction measure given as a parameter. The satisfaction
     measure is assumed to be additive.
 
-    The outcome can be computed either via a integer linear program solver or with a primal/dual
-    approach. Note that depending on the selected algorithm, not all functionalities are supported
-    (with the ILP solver ties cannot be handled while the primal/dual approach does not support
-    irresolute outcomes).
+    The outcome can be computed either via a integer linear program solver, with a primal/dual
+    approach or by dynamic programming. Note that depending on the selected algorithm, not all
+    functionalities are supported (with the ILP solver ties cannot be handled while the primal/dual
+    approach does not support irresolute outcomes). To go through the tied budget allocations one
+    at a time, see :py:func:`~pabutools.rules.maxwelfare.iter_max_additive_utilitarian_welfare`.
 
     Parameters
     ----------
@@ -345,9 +735,10 @@ def max_additive_utilitarian_welfare(
         inner_algo: :py:class:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo`, optional
             The inner algorithm used. See :py:class:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo`
             for the available choices.
-            Defaults to :py:enum:mem:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo.PRIMAL_DUAL`
-            if :code:`resoluteness == True`, otherwise defaults to
-            :py:enum:mem:`~pabutools.rules.maxwelfare.MaxAddUtilWelfareAlgo.ILP_SOLVER`.
+            Defaults to the algorithm chosen by
+            :py:func:`~pabutools.rules.maxwelfare.max_additive_utilitarian_welfare_auto_algo`, based on the
+            resoluteness, the scaled budget and the number of projects. The algorithm used and the time it took are
+            stored in the details of the outcome, see :py:class:`~pabutools.rules.maxwelfare.MaxWelfareAllocationDetails`.
 
     Returns
     -------
@@ -366,22 +757,32 @@ def max_additive_utilitarian_welfare(
     else:
         if sat_profile is None:
             sat_profile = profile.as_sat_profile(sat_class=sat_class)
-    if inner_algo:
-        if inner_algo == MaxAddUtilWelfareAlgo.PRIMAL_DUAL and not resoluteness:
-            raise ValueError(
-                "The primal/dual algorithm does not support irresolute outcomes."
-            )
-    else:
-        if resoluteness:
-            inner_algo = MaxAddUtilWelfareAlgo.PRIMAL_DUAL
-        else:
-            inner_algo = MaxAddUtilWelfareAlgo.ILP_SOLVER
+    if inner_algo is None:
+        inner_algo = max_additive_utilitarian_welfare_auto_algo(
+            instance, budget_allocation, resoluteness
+        )
+    elif inner_algo == MaxAddUtilWelfareAlgo.PRIMAL_DUAL and not resoluteness:
+        raise ValueError(
+            "The primal/dual algorithm does not support irresolute outcomes."
+        )
+    start_time = perf_counter()
     if inner_algo == MaxAddUtilWelfareAlgo.PRIMAL_DUAL:
-        return max_additive_utilitarian_welfare_primal_dual_scheme(
+        outcome = max_additive_utilitarian_welfare_primal_dual_scheme(
             instance, sat_profile, budget_allocation
         )
+    elif inner_algo == MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING:
+        if resoluteness:
+            outcome = max_additive_utilitarian_welfare_dp_scheme(
+                instance, sat_profile, budget_allocation
+            )
+        else:
+            outcome = list(
+                max_additive_utilitarian_welfare_dp_enumeration_scheme(
+                    instance, sat_profile, budget_allocation
+                )
+            )
     elif inner_algo == MaxAddUtilWelfareAlgo.ILP_SOLVER:
-        return max_additive_utilitarian_welfare_ilp_scheme(
+        outcome = max_additive_utilitarian_welfare_ilp_scheme(
             instance, sat_profile, budget_allocation, resoluteness
         )
     else:
@@ -389,3 +790,57 @@ def max_additive_utilitarian_welfare(
             "The parameter 'inner_algo' needs to be a member of the "
             "MaxAddUtilWelfareAlgo enumeration."
         )
+    details = MaxWelfareAllocationDetails(inner_algo, perf_counter() - start_time)
+    if resoluteness:
+        outcome.details = details
+    else:
+        for budget_allocation in outcome:
+            budget_allocation.details = details
+    return outcome
+
+
+def iter_max_additive_utilitarian_welfare(
+    instance: Instance,
+    profile: AbstractProfile,
+    sat_class: type[SatisfactionMeasure] | None = None,
+    sat_profile: GroupSatisfactionMeasure | None = None,
+    initial_budget_allocation: Collection[Project] | None = None,
+) -> Iterator[BudgetAllocation]:
+    """
+    Generates, one at a time, all the budget allocations maximising the utilitarian social welfare for an additive
+    satisfaction measure, that is, the irresolute outcome of
+    :py:func:`~pabutools.rules.maxwelfare.max_additive_utilitarian_welfare`. The budget allocations are enumerated
+    from a dynamic programming table that is computed once, see
+    :py:func:`~pabutools.rules.maxwelfare.max_additive_utilitarian_welfare_dp_enumeration_scheme`. Since they are
+    generated lazily, the enumeration can be stopped early, for instance to check whether there is a tie at all.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The class defining the satisfaction function used to measure the social welfare. If no satisfaction is
+            provided, a satisfaction profile needs to be provided. If a satisfation profile is provided, the
+            satisfaction argument is disregarded.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The satisfaction profile corresponding to the instance and the profile. If no satisfaction profile is
+            provided, but a satisfaction function is, the former is computed from the latter.
+        initial_budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+
+    Yields
+    ------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The budget allocations maximising the utilitarian welfare.
+    """
+    if initial_budget_allocation is None:
+        initial_budget_allocation = []
+    if sat_profile is None:
+        if sat_class is None:
+            raise ValueError("Satisfaction and sat_profile cannot both be None.")
+        sat_profile = profile.as_sat_profile(sat_class=sat_class)
+    return max_additive_utilitarian_welfare_dp_enumeration_scheme(
+        instance, sat_profile, BudgetAllocation(initial_budget_allocation)
+    )
@@ -3,16 +3,40 @@ from pabutools.rules.mes.mes_rule import (
     naive_mes,
     method_of_equal_shares_scheme,
     mes_inner_algo,
+    mes_lazy_inner_algo,
+    mes_irresolute_inner_algo,
+    mes_project_affordability,
     affordability_poor_rich,
 )
+from pabutools.rules.mes.mes_numpy import (
+    method_of_equal_shares_numpy_scheme,
+    mes_numpy_inner_algo,
+    MESArrays,
+)
+from pabutools.rules.mes.mes_incremental import (
+    method_of_equal_shares_incremental,
+    method_of_equal_shares_incremental_scheme,
+    mes_stable_inner_algo,
+    StableBudgetRange,
+)
 from pabutools.rules.mes.mes_details import MESAllocationDetails, MESIteration
 
 __all__ = [
     "method_of_equal_shares",
     "method_of_equal_shares_scheme",
     "mes_inner_algo",
+    "mes_lazy_inner_algo",
+    "mes_irresolute_inner_algo",
+    "mes_project_affordability",
     "naive_mes",
     "affordability_poor_rich",
+    "method_of_equal_shares_numpy_scheme",
+    "mes_numpy_inner_algo",
+    "MESArrays",
+    "method_of_equal_shares_incremental",
+    "method_of_equal_shares_incremental_scheme",
+    "mes_stable_inner_algo",
+    "StableBudgetRange",
     "MESAllocationDetails",
     "MESIteration",
 ]
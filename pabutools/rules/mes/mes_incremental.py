@@ -0,0 +1,620 @@
+"""
+Incremental computation of the iterated method of equal shares.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+from itertools import count
+from math import ceil, floor
+
+from pabutools.election import AbstractApprovalProfile
+from pabutools.election.instance import Instance, Project
+from pabutools.election.profile import AbstractProfile
+from pabutools.election.satisfaction import SatisfactionMeasure
+from pabutools.election.satisfaction.satisfactionmeasure import GroupSatisfactionMeasure
+from pabutools.fractions import frac
+from pabutools.rules.budgetallocation import BudgetAllocation
+from pabutools.rules.mes.mes_rule import MESProject, MESVoter, mes_voters_and_projects
+from pabutools.tiebreaking import TieBreakingRule, lexico_tie_breaking
+from pabutools.utils import Numeric
+
+AffineFunction = tuple[Numeric, Numeric]
+"""
+Affine function of the initial budget per voter `b`, represented by the pair `(slope, intercept)` standing for
+`slope * b + intercept`.
+"""
+
+
+class StableBudgetRange:
+    """
+    Range of initial budget per voter over which a run of the method of equal shares is guaranteed to go through
+    exactly the same steps as the run for the budget `budget`. It is bounded below by `budget` and above by `upper`.
+    Every quantity computed during a run (budget of the voters, affordability factors, etc.) is an affine function of
+    the initial budget per voter as long as the same steps are taken. All the comparisons made during the run are
+    thus recorded as constraints on affine functions, each of them tightening the upper bound.
+
+    When `right_of_budget` is `True`, the run is the one for initial budgets infinitesimally larger than `budget`:
+    comparisons between values that are equal for `budget` are decided by the slope of the corresponding affine
+    functions. The budget `budget` itself is then excluded from the range.
+
+    Parameters
+    ----------
+        budget : Numeric
+            The initial budget per voter of the run.
+        right_of_budget : bool, optional
+            Set to `True` to run the rule for initial budgets infinitesimally larger than `budget`.
+            Defaults to `False`.
+
+    Attributes
+    ----------
+        budget : Numeric
+            The initial budget per voter of the run.
+        right_of_budget : bool
+            Whether the run is the one for initial budgets infinitesimally larger than `budget`.
+        upper : Numeric | None
+            The upper bound of the range, `None` if the range is unbounded.
+        upper_included : bool
+            Whether the upper bound belongs to the range.
+    """
+
+    def __init__(self, budget: Numeric, right_of_budget: bool = False):
+        self.budget: Numeric = budget
+        self.right_of_budget: bool = right_of_budget
+        self.upper: Numeric | None = None
+        self.upper_included: bool = False
+
+    def key(self, function: AffineFunction) -> Numeric | tuple[Numeric, Numeric]:
+        """
+        Returns the key used to compare the values of affine functions for the run. It is the value of the function
+        at `budget`, paired with its slope if `right_of_budget` is `True`.
+
+        Parameters
+        ----------
+            function : AffineFunction
+                The affine function.
+
+        Returns
+        -------
+            Numeric | tuple[Numeric, Numeric]
+                The key of the function.
+        """
+        value = function[0] * self.budget + function[1]
+        if self.right_of_budget:
+            return value, function[0]
+        return value
+
+    def is_non_negative(self, function: AffineFunction) -> bool:
+        """
+        Tests whether the affine function is non-negative for the run.
+
+        Parameters
+        ----------
+            function : AffineFunction
+                The affine function.
+
+        Returns
+        -------
+            bool
+                `True` if the function is non-negative.
+        """
+        value = function[0] * self.budget + function[1]
+        if self.right_of_budget and value == 0:
+            return function[0] >= 0
+        return value >= 0
+
+    def is_positive(self, function: AffineFunction) -> bool:
+        """
+        Tests whether the affine function is positive for the run.
+
+        Parameters
+        ----------
+            function : AffineFunction
+                The affine function.
+
+        Returns
+        -------
+            bool
+                `True` if the function is positive.
+        """
+        value = function[0] * self.budget + function[1]
+        if self.right_of_budget and value == 0:
+            return function[0] > 0
+        return value > 0
+
+    def bound(self, upper: Numeric, included: bool) -> None:
+        """
+        Tightens the upper bound of the range.
+
+        Parameters
+        ----------
+            upper : Numeric
+                The new upper bound.
+            included : bool
+                Whether the new upper bound belongs to the range.
+        """
+        if self.upper is None or upper < self.upper:
+            self.upper = upper
+            self.upper_included = included
+        elif upper == self.upper:
+            self.upper_included = self.upper_included and included
+
+    def require_non_negative(self, function: AffineFunction, strict: bool = False):
+        """
+        Records that the affine function, which is non-negative (positive if `strict`) for the run, must remain so.
+
+        Parameters
+        ----------
+            function : AffineFunction
+                The affine function.
+            strict : bool, optional
+                Set to `True` if the function needs to be positive.
+        """
+        slope, intercept = function
+        if slope < 0:
+            self.bound(frac(-intercept, slope), not strict)
+
+    def require_zero(self, function: AffineFunction):
+        """
+        Records that the affine function, which is zero for the run, must remain so.
+
+        Parameters
+        ----------
+            function : AffineFunction
+                The affine function.
+        """
+        if function[0] != 0:
+            self.bound(self.budget, True)
+
+
+def affine_sub(f: AffineFunction, g: AffineFunction) -> AffineFunction:
+    """
+    Returns the difference between two affine functions.
+
+    Parameters
+    ----------
+        f : AffineFunction
+            The first function.
+        g : AffineFunction
+            The second function.
+
+    Returns
+    -------
+        AffineFunction
+            The function `f - g`.
+    """
+    return f[0] - g[0], f[1] - g[1]
+
+
+def affine_scale(f: AffineFunction, factor: Numeric) -> AffineFunction:
+    """
+    Multiplies an affine function by a scalar.
+
+    Parameters
+    ----------
+        f : AffineFunction
+            The function.
+        factor : Numeric
+            The scalar.
+
+    Returns
+    -------
+        AffineFunction
+            The function `factor * f`.
+    """
+    return f[0] * factor, f[1] * factor
+
+
+def mes_stable_affordability(
+    voters: list[MESVoter],
+    budgets: list[AffineFunction],
+    project: MESProject,
+    stable_range: StableBudgetRange,
+) -> AffineFunction | None:
+    """
+    Computes the affordability factor of a project as an affine function of the initial budget per voter, following
+    the same steps as :py:func:`~pabutools.rules.mes.mes_rule.mes_project_affordability`. The constraints under which
+    the same value is obtained are recorded in the stable range.
+
+    Parameters
+    ----------
+        voters: list[MESVoter]
+            The list of the voters, formatted for MES.
+        budgets : list[AffineFunction]
+            The budget of each voter as an affine function of the initial budget per voter.
+        project: MESProject
+            The project under consideration.
+        stable_range : :py:class:`~pabutools.rules.mes.mes_incremental.StableBudgetRange`
+            The stable range of the run.
+
+    Returns
+    -------
+        AffineFunction | None
+            The affordability factor of the project, `None` if it could not be found.
+    """
+    sats = {i: voters[i].sat.sat_project(project) for i in project.supporter_indices}
+    ordered = sorted(
+        project.supporter_indices,
+        key=lambda i: stable_range.key(affine_scale(budgets[i], frac(1, sats[i]))),
+    )
+
+    contribution = (0, 0)
+    denominator = project.total_sat
+    afford_factor = None
+    position = len(ordered)
+    for index, i in enumerate(ordered):
+        supporter = voters[i]
+        supporter_sat = project.supporters_sat(supporter)
+        factor = (
+            frac(-contribution[0], denominator),
+            frac(project.cost - contribution[1], denominator),
+        )
+        if stable_range.is_non_negative(
+            affine_sub(budgets[i], affine_scale(factor, supporter_sat))
+        ):
+            afford_factor = factor
+            position = index
+            break
+        contribution = (
+            contribution[0] + supporter.multiplicity * budgets[i][0],
+            contribution[1] + supporter.multiplicity * budgets[i][1],
+        )
+        denominator -= supporter.multiplicity * supporter_sat
+
+    if afford_factor is not None and all(
+        project.supporters_sat(voters[i]) == sats[i] for i in ordered
+    ):
+        # The affordability factor is the smallest one for which the supporters can afford the project, it only
+        # depends on which supporters pay their whole budget.
+        for index, i in enumerate(ordered):
+            slack = affine_sub(budgets[i], affine_scale(afford_factor, sats[i]))
+            if index < position:
+                slack = affine_scale(slack, -1)
+            stable_range.require_non_negative(slack)
+        return afford_factor
+
+    # Otherwise, the exact same steps need to be taken
+    contribution = (0, 0)
+    denominator = project.total_sat
+    for i in ordered[:position]:
+        supporter_sat = project.supporters_sat(voters[i])
+        factor = (
+            frac(-contribution[0], denominator),
+            frac(project.cost - contribution[1], denominator),
+        )
+        stable_range.require_non_negative(
+            affine_sub(affine_scale(factor, supporter_sat), budgets[i]), strict=True
+        )
+        contribution = (
+            contribution[0] + voters[i].multiplicity * budgets[i][0],
+            contribution[1] + voters[i].multiplicity * budgets[i][1],
+        )
+        denominator -= voters[i].multiplicity * supporter_sat
+    if afford_factor is not None:
+        selected = ordered[position]
+        stable_range.require_non_negative(
+            affine_sub(
+                budgets[selected],
+                affine_scale(afford_factor, project.supporters_sat(voters[selected])),
+            )
+        )
+    for previous, following in zip(ordered, ordered[1 : position + 1]):
+        stable_range.require_non_negative(
+            affine_sub(
+                affine_scale(budgets[following], sats[previous]),
+                affine_scale(budgets[previous], sats[following]),
+            )
+        )
+    if afford_factor is not None:
+        for following in ordered[position + 1 :]:
+            stable_range.require_non_negative(
+                affine_sub(
+                    affine_scale(budgets[following], sats[selected]),
+                    affine_scale(budgets[selected], sats[following]),
+                )
+            )
+    return afford_factor
+
+
+def mes_stable_inner_algo(
+    instance: Instance,
+    profile: AbstractProfile,
+    voters: list[MESVoter],
+    projects: set[MESProject],
+    tie_breaking_rule: TieBreakingRule,
+    current_alloc: BudgetAllocation,
+    stable_range: StableBudgetRange,
+) -> None:
+    """
+    Resolute run of the method of equal shares for the initial budget per voter `stable_range.budget`, taking the
+    same steps as :py:func:`~pabutools.rules.mes.mes_rule.mes_lazy_inner_algo`. On top of the outcome, it computes the
+    range of initial budgets per voter over which the same steps would be taken, and that thus lead to the same
+    outcome. To do so, the budgets of the voters and the affordability factors of the projects are tracked as affine
+    functions of the initial budget per voter.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        voters: list[MESVoter]
+            The list of MESVoters. Their budget is ignored.
+        projects: set[MESProject]
+            The set of MESProjects to take into account.
+        tie_breaking_rule : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        current_alloc: BudgetAllocation
+            The budget allocation that is being built. Only populated via side effects.
+        stable_range : :py:class:`~pabutools.rules.mes.mes_incremental.StableBudgetRange`
+            The stable range of the run. Only populated via side effects.
+    """
+    budgets = [(1, 0) for _ in voters]
+    voter_projects = [[] for _ in voters]
+    for project in projects:
+        for i in project.supporter_indices:
+            voter_projects[i].append(project)
+
+    keys = {p: (0, p.initial_affordability) for p in projects}
+    tie_counter = count()
+    queue = [(stable_range.key(keys[p]), next(tie_counter), p) for p in projects]
+    heapq.heapify(queue)
+    up_to_date = set()
+
+    while True:
+        best_afford = None
+        tied_projects = []
+        put_aside = []
+        while queue:
+            afford, _, project = queue[0]
+            if best_afford is not None and afford > best_afford:
+                break
+            heapq.heappop(queue)
+            if project in up_to_date:
+                best_afford = afford
+                tied_projects.append(project)
+                continue
+            missing_budget = (0, project.cost)
+            for i in project.supporter_indices:
+                missing_budget = affine_sub(
+                    missing_budget, affine_scale(budgets[i], voters[i].multiplicity)
+                )
+            if stable_range.is_positive(missing_budget):
+                stable_range.require_non_negative(missing_budget, strict=True)
+                projects.remove(project)
+                continue
+            new_key = mes_stable_affordability(voters, budgets, project, stable_range)
+            if new_key is None:
+                put_aside.append(project)
+                continue
+            keys[project] = new_key
+            up_to_date.add(project)
+            heapq.heappush(
+                queue, (stable_range.key(new_key), next(tie_counter), project)
+            )
+        if not tied_projects:
+            return
+        best_key = keys[tied_projects[0]]
+        for project in tied_projects[1:]:
+            stable_range.require_zero(affine_sub(keys[project], best_key))
+        for _, _, project in queue:
+            stable_range.require_non_negative(
+                affine_sub(keys[project], best_key), strict=True
+            )
+        for project in put_aside:
+            stable_range.require_non_negative(
+                affine_sub(keys[project], best_key), strict=True
+            )
+        if len(tied_projects) > 1:
+            tied_projects = tie_breaking_rule.order(instance, profile, tied_projects)
+        selected_project = tied_projects[0]
+        for project in tied_projects[1:] + put_aside:
+            heapq.heappush(
+                queue, (stable_range.key(keys[project]), next(tie_counter), project)
+            )
+        current_alloc.append(selected_project.project)
+        projects.remove(selected_project)
+        for i in selected_project.supporter_indices:
+            payment = affine_scale(
+                best_key, selected_project.supporters_sat(voters[i])
+            )
+            slack = affine_sub(budgets[i], payment)
+            if stable_range.is_non_negative(affine_scale(slack, -1)):
+                stable_range.require_non_negative(affine_scale(slack, -1))
+                new_budget = (0, 0)
+            else:
+                stable_range.require_non_negative(slack)
+                new_budget = slack
+            if new_budget != budgets[i]:
+                budgets[i] = new_budget
+                up_to_date.difference_update(voter_projects[i])
+
+
+def method_of_equal_shares_incremental_scheme(
+    instance: Instance,
+    profile: AbstractProfile,
+    sat_profile: GroupSatisfactionMeasure,
+    initial_budget_per_voter: Numeric,
+    initial_budget_allocation: BudgetAllocation,
+    tie_breaking: TieBreakingRule,
+    voter_budget_increment: Numeric | None = None,
+    binary_sat: bool = False,
+    verbose: bool = False,
+) -> tuple[BudgetAllocation, list[Numeric]]:
+    """
+    Computes the outcome of the iterated method of equal shares, skipping the budgets that are guaranteed to lead to
+    the same outcome as the last one computed. Each run of the rule is performed via
+    :py:func:`~pabutools.rules.mes.mes_incremental.mes_stable_inner_algo` that returns the range of initial budgets
+    per voter over which the outcome does not change. All the budget increments falling into that range are skipped.
+
+    If no budget increment is given, the initial budget per voter increases continuously: the next run is performed
+    for the exact budget at which the steps of the rule change, or for budgets infinitesimally larger than it.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        initial_budget_per_voter: Numeric
+            The initial budget of a voter.
+        initial_budget_allocation : list[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+        tie_breaking : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        voter_budget_increment : Numeric, optional
+            The increment added to the initial budget of the voters in the iterated variant of MES. If `None`, the
+            exact budgets at which the outcome can change are used instead.
+            Defaults to `None`.
+        binary_sat : bool, optional
+            Uses the inner algorithm for binary satisfaction if set to `True`.
+        verbose : bool, optional
+            (De)Activate the display of additional information.
+            Defaults to `False`.
+
+    Returns
+    -------
+        tuple[:py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`, list[Numeric]]
+            The selected projects, together with the list of initial budgets per voter for which the rule has been
+            run. Without budget increment, a budget at which the steps of the rule change appears twice: once for the
+            budget itself and once for the budgets infinitesimally larger than it (if they differ).
+    """
+    voters, projects = mes_voters_and_projects(
+        instance,
+        sat_profile,
+        initial_budget_per_voter,
+        initial_budget_allocation,
+        binary_sat,
+        merge_identical_voters=True,
+    )
+    budget_allocation = BudgetAllocation(initial_budget_allocation)
+
+    previous_outcome = budget_allocation
+    visited_budgets = []
+    budget = initial_budget_per_voter
+    right_of_budget = False
+    while True:
+        visited_budgets.append(budget)
+        outcome = BudgetAllocation(budget_allocation)
+        stable_range = StableBudgetRange(budget, right_of_budget)
+        mes_stable_inner_algo(
+            instance,
+            profile,
+            voters,
+            set(projects),
+            tie_breaking,
+            outcome,
+            stable_range,
+        )
+        if verbose:
+            print(
+                f"Budget {float(budget)}{'+' if right_of_budget else ''}: {outcome}, "
+                f"stable up to {stable_range.upper}"
+            )
+        if not instance.is_feasible(outcome):
+            return previous_outcome, visited_budgets
+        if instance.is_exhaustive(outcome, available_projects=projects):
+            return outcome, visited_budgets
+        previous_outcome = outcome
+        if stable_range.upper is None:
+            return outcome, visited_budgets
+        if voter_budget_increment is None:
+            budget = stable_range.upper
+            right_of_budget = stable_range.upper_included
+            continue
+        num_increments = frac(stable_range.upper - budget, voter_budget_increment)
+        if stable_range.upper_included:
+            num_increments = floor(num_increments) + 1
+        else:
+            num_increments = ceil(num_increments)
+        budget += max(num_increments, 1) * voter_budget_increment
+
+
+def method_of_equal_shares_incremental(
+    instance: Instance,
+    profile: AbstractProfile,
+    voter_budget_increment: Numeric | None = None,
+    sat_class: type[SatisfactionMeasure] | None = None,
+    sat_profile: GroupSatisfactionMeasure | None = None,
+    tie_breaking: TieBreakingRule | None = None,
+    initial_budget_allocation: Iterable[Project] | None = None,
+    binary_sat: bool | None = None,
+    verbose: bool = False,
+) -> tuple[BudgetAllocation, list[Numeric]]:
+    """
+    Iterated variant of the Method of Equal Shares (MES), computed incrementally. The outcome is the same as that of
+    :py:func:`~pabutools.rules.mes.mes_rule.method_of_equal_shares` with the same `voter_budget_increment` (in the
+    resolute case), but every run of MES also computes the range of initial budgets per voter for which the rule
+    would take exactly the same steps. The budgets of that range are then skipped instead of being recomputed.
+
+    Without budget increment, the exact completion of MES is computed: the initial budget per voter is increased
+    continuously, jumping directly from one budget at which the steps of the rule change to the next one, until an
+    exhaustive budget allocation is found, or one that is no longer feasible. The outcome is then the one of
+    :py:func:`~pabutools.rules.mes.mes_rule.method_of_equal_shares` for an infinitesimally small budget increment.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        voter_budget_increment : Numeric, optional
+            The increment added to the initial budget of the voters until an exhaustive budget allocation is found,
+            or one that is no longer feasible with the initial budget constraint. If `None`, the budget increases
+            continuously.
+            Defaults to `None`.
+        sat_class : type[:py:class:`~pabutools.election.satisfaction.satisfactionmeasure.SatisfactionMeasure`]
+            The class defining the satisfaction function used to measure the social welfare. If no satisfaction is
+            provided, a satisfaction profile needs to be provided. If a satisfation profile is provided, the
+            satisfaction argument is disregarded.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The satisfaction profile corresponding to the instance and the profile. If no satisfaction profile is
+            provided, but a satisfaction function is, the former is computed from the latter.
+        tie_breaking : :py:class:`~pabutools.tiebreaking.TieBreakingRule`, optional
+            The tie-breaking rule used.
+            Defaults to the lexicographic tie-breaking.
+        initial_budget_allocation : Iterable[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+        binary_sat : bool, optional
+            Uses the inner algorithm for binary satisfaction if set to `True`. Automatically set to `True` if an
+            approval profile is given.
+        verbose : bool, optional
+            (De)Activate the display of additional information.
+            Defaults to `False`.
+
+    Returns
+    -------
+        tuple[:py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`, list[Numeric]]
+            The selected projects, together with the list of initial budgets per voter for which MES has actually been
+            run.
+    """
+    if tie_breaking is None:
+        tie_breaking = lexico_tie_breaking
+    if initial_budget_allocation is not None:
+        budget_allocation = BudgetAllocation(initial_budget_allocation)
+    else:
+        budget_allocation = BudgetAllocation()
+    if sat_class is None:
+        if sat_profile is None:
+            raise ValueError("sat_class and sat_profile cannot both be None")
+    else:
+        if sat_profile is None:
+            sat_profile = profile.as_sat_profile(sat_class=sat_class)
+
+    if binary_sat is None:
+        binary_sat = isinstance(profile, AbstractApprovalProfile)
+
+    return method_of_equal_shares_incremental_scheme(
+        instance,
+        profile,
+        sat_profile,
+        frac(instance.budget_limit, profile.num_ballots()),
+        budget_allocation,
+        tie_breaking,
+        voter_budget_increment,
+        binary_sat=binary_sat,
+        verbose=verbose,
+    )
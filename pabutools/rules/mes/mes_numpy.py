@@ -0,0 +1,447 @@
+"""
+Array-backed implementation of the method of equal shares.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from pabutools.election.instance import Instance, Project
+from pabutools.election.profile import AbstractProfile
+from pabutools.election.satisfaction.satisfactionmeasure import GroupSatisfactionMeasure
+from pabutools.election.satisfaction.satisfactionmatrix import SatisfactionMatrix
+from pabutools.fractions import frac, numeric_dtype, as_numeric_array
+from pabutools.rules.budgetallocation import BudgetAllocation
+from pabutools.tiebreaking import TieBreakingRule
+from pabutools.utils import Numeric
+
+
+class MESArrays:
+    """
+    Array representation of the voters and the projects used in a run of the method of equal shares. The satisfaction
+    of the voters is stored as a sparse project x voter matrix in the compressed sparse row (CSR) format: the
+    supporters of the project with index `k` are the voters
+    `supporter_indices[supporter_indptr[k]:supporter_indptr[k + 1]]`.
+
+    The numbers are stored with the dtype given by :py:func:`~pabutools.fractions.numeric_dtype`. With the default
+    gmpy2 fractions, this is the object dtype: the budgets are fractions of the budget limit and the payments are
+    products of affordability factors and satisfactions, they thus cannot be stored in a native dtype without losing
+    exactness. NumPy then applies the arithmetic element by element on Python objects, which is not faster than a
+    Python loop. The speed-up only comes from the CSR layout, through which only the supporters of a project are
+    visited. The arithmetic is truly vectorised when the `FRACTION` constant of :py:mod:`~pabutools.fractions` is
+    set to floats, the arrays then having the `float64` dtype.
+
+    Parameters
+    ----------
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects to store, in the order in which they will be indexed.
+        binary_sat : bool, optional
+            If `True`, all the supporters of a project are assumed to enjoy the same satisfaction for it, as in
+            :py:func:`~pabutools.rules.mes.mes_rule.method_of_equal_shares_scheme`.
+            Defaults to `False`.
+        instance : :py:class:`~pabutools.election.instance.Instance`, optional
+            The instance. If it is indexed (see :py:meth:`~pabutools.election.instance.Instance.index_projects`) and
+            the satisfaction measures are restricted to the ballots, the supporters of the projects are found by
+            reading every ballot once.
+
+    Attributes
+    ----------
+        projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects with at least one supporter, indexed by their position in the list.
+        costs : list[Numeric]
+            The cost of the projects.
+        total_sats : list[Numeric]
+            The total satisfaction for each project, multiplicities included.
+        multiplicities : np.ndarray
+            The multiplicity of each voter.
+        supporter_indptr : np.ndarray
+            The index pointer of the CSR matrix.
+        supporter_indices : np.ndarray
+            The voter indices of the CSR matrix.
+        supporter_sats : np.ndarray
+            The satisfaction of the supporters, used to order them by budget over satisfaction.
+        supporter_payment_sats : np.ndarray
+            The satisfaction used to compute the payment of the supporters. It differs from `supporter_sats` only if
+            `binary_sat` is `True`.
+        zero_cost_projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects with at least one supporter and a cost of 0. They are always selected.
+    """
+
+    def __init__(
+        self,
+        sat_profile: GroupSatisfactionMeasure,
+        projects: list[Project],
+        binary_sat: bool = False,
+        instance: Instance | None = None,
+    ):
+        sats = list(sat_profile)
+        multiplicities = [sat_profile.multiplicity(sat) for sat in sats]
+        self.multiplicities = np.array(multiplicities, dtype=np.int64)
+        self.projects = []
+        self.costs = []
+        self.total_sats = []
+        indptr = [0]
+        indices = []
+        supporter_sats = []
+        payment_sats = []
+        self.zero_cost_projects = []
+        if isinstance(sat_profile, SatisfactionMatrix):
+            # The supporters of each project are directly read from the matrix
+            matrix_indptr, matrix_rows, matrix_values = sat_profile.by_project()
+
+            def supporters(project):
+                index = sat_profile.project_index.get(project)
+                if index is None:
+                    return []
+                start, end = matrix_indptr[index], matrix_indptr[index + 1]
+                return zip(
+                    matrix_rows[start:end].tolist(), matrix_values[start:end].tolist()
+                )
+
+        elif (
+            instance is not None
+            and instance.is_indexed()
+            and all(sat.restricted_to_ballot for sat in sats)
+        ):
+            # Integer path: only the voters whose ballot mentions the project are considered
+            supporters_by_id = instance.supporters_by_id(sat.ballot for sat in sats)
+
+            def supporters(project):
+                return (
+                    (i, sats[i].sat_project(project))
+                    for i in supporters_by_id[instance.project_id(project)]
+                )
+
+        else:
+
+            def supporters(project):
+                return ((i, sat.sat_project(project)) for i, sat in enumerate(sats))
+
+        for p in projects:
+            project_indices = []
+            project_sats = []
+            total_sat = 0
+            for i, indiv_sat in supporters(p):
+                if indiv_sat > 0:
+                    project_indices.append(i)
+                    project_sats.append(indiv_sat)
+                    total_sat += multiplicities[i] * indiv_sat
+            if total_sat > 0:
+                if p.cost > 0:
+                    self.projects.append(p)
+                    self.costs.append(frac(p.cost))
+                    self.total_sats.append(frac(total_sat))
+                    indices.extend(project_indices)
+                    supporter_sats.extend(project_sats)
+                    if binary_sat:
+                        payment_sats.extend([project_sats[-1]] * len(project_sats))
+                    else:
+                        payment_sats.extend(project_sats)
+                    indptr.append(len(indices))
+                else:
+                    self.zero_cost_projects.append(p)
+        self.supporter_indptr = np.array(indptr, dtype=np.int64)
+        self.supporter_indices = np.array(indices, dtype=np.int64)
+        self.supporter_sats = as_numeric_array(supporter_sats)
+        self.supporter_payment_sats = as_numeric_array(payment_sats)
+
+    def supporters(self, index: int) -> slice:
+        """
+        Returns the slice of the CSR arrays corresponding to the supporters of a project.
+
+        Parameters
+        ----------
+            index : int
+                The index of the project.
+
+        Returns
+        -------
+            slice
+                The slice.
+        """
+        return slice(self.supporter_indptr[index], self.supporter_indptr[index + 1])
+
+    def initial_affordabilities(self) -> list[Numeric]:
+        """
+        Returns the affordability of the projects when no budget has been spent, i.e., the cost divided by the total
+        satisfaction.
+
+        Returns
+        -------
+            list[Numeric]
+                The affordabilities.
+        """
+        return [frac(c, s) for c, s in zip(self.costs, self.total_sats)]
+
+    def available_budget(self, budgets: np.ndarray, index: int) -> Numeric:
+        """
+        Returns the total budget of the supporters of a project.
+
+        Parameters
+        ----------
+            budgets : np.ndarray
+                The budget of the voters.
+            index : int
+                The index of the project.
+
+        Returns
+        -------
+            Numeric
+                The total budget.
+        """
+        voters = self.supporter_indices[self.supporters(index)]
+        return (self.multiplicities[voters] * budgets[voters]).sum()
+
+    def affordability(self, budgets: np.ndarray, index: int) -> Numeric | None:
+        """
+        Computes the affordability factor of a project, assuming that the supporters of the project can afford it.
+        The supporters are sorted by budget over satisfaction and the affordability factor is then found through
+        cumulative sums over the sorted supporters. Returns `None` if no affordability factor could be found.
+
+        Parameters
+        ----------
+            budgets : np.ndarray
+                The budget of the voters.
+            index : int
+                The index of the project.
+
+        Returns
+        -------
+            Numeric | None
+                The affordability factor.
+        """
+        supp = self.supporters(index)
+        voters = self.supporter_indices[supp]
+        voter_budgets = budgets[voters]
+        order = np.argsort(voter_budgets / self.supporter_sats[supp], kind="stable")
+        voter_budgets = voter_budgets[order]
+        multiplicities = self.multiplicities[voters][order]
+        payment_sats = self.supporter_payment_sats[supp][order]
+        zero = as_numeric_array([0])
+        paid_before = np.concatenate(
+            (zero, np.cumsum(multiplicities * voter_budgets)[:-1])
+        )
+        sat_before = np.concatenate(
+            (zero, np.cumsum(multiplicities * payment_sats)[:-1])
+        )
+        factors = (self.costs[index] - paid_before) / (
+            self.total_sats[index] - sat_before
+        )
+        rich = np.flatnonzero(factors * payment_sats <= voter_budgets)
+        if len(rich) == 0:
+            return None
+        return factors[rich[0]]
+
+    def pay(self, budgets: np.ndarray, index: int, afford: Numeric) -> None:
+        """
+        Makes the supporters of a project pay for it, given its affordability factor. The budgets are updated in place.
+
+        Parameters
+        ----------
+            budgets : np.ndarray
+                The budget of the voters.
+            index : int
+                The index of the project.
+            afford : Numeric
+                The affordability factor.
+        """
+        supp = self.supporters(index)
+        voters = self.supporter_indices[supp]
+        budgets[voters] -= np.minimum(
+            budgets[voters], afford * self.supporter_payment_sats[supp]
+        )
+
+
+def mes_numpy_inner_algo(
+    instance: Instance,
+    profile: AbstractProfile,
+    arrays: MESArrays,
+    budgets: np.ndarray,
+    affordabilities: dict[int, Numeric],
+    tie_breaking_rule: TieBreakingRule,
+    current_alloc: BudgetAllocation,
+    all_allocs: list[BudgetAllocation],
+    resoluteness: bool,
+) -> None:
+    """
+    The inner algorithm of the array-backed method of equal shares. It follows exactly the same steps as
+    :py:func:`~pabutools.rules.mes.mes_rule.mes_inner_algo`, the voters and projects being represented by
+    :py:class:`~pabutools.rules.mes.mes_numpy.MESArrays`.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        arrays: :py:class:`~pabutools.rules.mes.mes_numpy.MESArrays`
+            The array representation of the election.
+        budgets: np.ndarray
+            The budget of the voters. Modified in place.
+        affordabilities: dict[int, Numeric]
+            Maps the index of the projects still under consideration to their last known affordability factor, used
+            as a lower bound. Modified in place.
+        tie_breaking_rule : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        current_alloc: BudgetAllocation
+            The budget allocation that is currently being built. Only populated via side effects.
+        all_allocs: list[BudgetAllocation]
+            The set of all budget allocations returned so far. Only populated via side effects.
+        resoluteness : bool
+            Set to `False` to obtain an irresolute outcome, where all tied budget allocations are returned.
+    """
+    while True:
+        tied_projects: list[int] = []
+        best_afford = float("inf")
+        for index in sorted(affordabilities, key=lambda k: affordabilities[k]):
+            if arrays.available_budget(budgets, index) < arrays.costs[index]:
+                del affordabilities[index]
+                continue
+            if affordabilities[index] > best_afford:
+                break
+            afford = arrays.affordability(budgets, index)
+            if afford is None:
+                continue
+            affordabilities[index] = afford
+            if afford < best_afford:
+                best_afford = afford
+                tied_projects = [index]
+            elif afford == best_afford:
+                tied_projects.append(index)
+        if not tied_projects:
+            if resoluteness:
+                all_allocs.append(current_alloc)
+            else:
+                current_alloc.sort()
+                if current_alloc not in all_allocs:
+                    all_allocs.append(current_alloc)
+            return
+        if len(tied_projects) > 1:
+            tied_projects = tie_breaking_rule.order(
+                instance, profile, tied_projects, key=lambda k: arrays.projects[k]
+            )
+        if resoluteness:
+            selected = tied_projects[0]
+            current_alloc.append(arrays.projects[selected])
+            del affordabilities[selected]
+            arrays.pay(budgets, selected, best_afford)
+            continue
+        for selected in tied_projects:
+            new_alloc = BudgetAllocation(current_alloc)
+            new_alloc.append(arrays.projects[selected])
+            new_affordabilities = dict(affordabilities)
+            del new_affordabilities[selected]
+            new_budgets = budgets.copy()
+            arrays.pay(new_budgets, selected, best_afford)
+            mes_numpy_inner_algo(
+                instance,
+                profile,
+                arrays,
+                new_budgets,
+                new_affordabilities,
+                tie_breaking_rule,
+                new_alloc,
+                all_allocs,
+                resoluteness,
+            )
+        return
+
+
+def method_of_equal_shares_numpy_scheme(
+    instance: Instance,
+    profile: AbstractProfile,
+    sat_profile: GroupSatisfactionMeasure,
+    initial_budget_per_voter: Numeric,
+    initial_budget_allocation: BudgetAllocation,
+    tie_breaking: TieBreakingRule,
+    resoluteness: bool = True,
+    voter_budget_increment=None,
+    binary_sat: bool = False,
+) -> BudgetAllocation | list[BudgetAllocation]:
+    """
+    Array-backed version of :py:func:`~pabutools.rules.mes.mes_rule.method_of_equal_shares_scheme`. The budgets and
+    the multiplicities of the voters, together with their satisfaction for the projects, are stored in contiguous
+    NumPy arrays and the affordability of the projects is computed with sorts and cumulative sums over the supporters
+    of the project. The outcome is the same as that of the default implementation. With exact gmpy2 fractions, the
+    arrays have the object dtype and the arithmetic is not vectorised, see
+    :py:class:`~pabutools.rules.mes.mes_numpy.MESArrays`.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        initial_budget_per_voter: Numeric
+            The initial budget of a voter.
+        initial_budget_allocation : list[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty.
+        tie_breaking : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        resoluteness : bool, optional
+            Set to `False` to obtain an irresolute outcome, where all tied budget allocations are returned.
+            Defaults to True.
+        voter_budget_increment : Numeric, optional
+            Any value that is not `None` will lead to the iterated variant of MES where `voter_budget_increment` units
+            of budget are added to the initial budget of the voters until an exhaustive budget allocation is found, or
+            one that is no longer feasible with the initial budget constraint.
+        binary_sat : bool, optional
+            Uses the inner algorithm for binary satisfaction if set to `True`. Should typically be used with approval
+            ballots to gain on the runtime.
+
+    Returns
+    -------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation` | list[:py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`]
+            The selected projects if resolute (:code:`resoluteness == True`), or the set of selected projects if irresolute
+            (:code:`resoluteness == False`).
+    """
+    arrays = MESArrays(
+        sat_profile,
+        [p for p in instance if p not in initial_budget_allocation],
+        binary_sat=binary_sat,
+        instance=instance,
+    )
+    initial_budget_allocation.extend(arrays.zero_cost_projects)
+    budget_allocation = BudgetAllocation(initial_budget_allocation)
+    initial_affordabilities = arrays.initial_affordabilities()
+
+    previous_outcome: BudgetAllocation | list[BudgetAllocation] = budget_allocation
+
+    while True:
+        all_budget_allocations: list[BudgetAllocation] = []
+        mes_numpy_inner_algo(
+            instance,
+            profile,
+            arrays,
+            as_numeric_array([initial_budget_per_voter] * len(arrays.multiplicities)),
+            dict(enumerate(initial_affordabilities)),
+            tie_breaking,
+            BudgetAllocation(budget_allocation),
+            all_budget_allocations,
+            resoluteness,
+        )
+        if resoluteness:
+            outcome = all_budget_allocations[0]
+            if voter_budget_increment is None:
+                return outcome
+            if not instance.is_feasible(outcome):
+                return previous_outcome
+            if instance.is_exhaustive(outcome, available_projects=arrays.projects):
+                return outcome
+            previous_outcome = outcome
+        else:
+            if voter_budget_increment is None:
+                return all_budget_allocations
+            if any(not instance.is_feasible(o) for o in all_budget_allocations):
+                return previous_outcome
+            if any(
+                instance.is_exhaustive(o, available_projects=arrays.projects)
+                for o in all_budget_allocations
+            ):
+                return all_budget_allocations
+            previous_outcome = all_budget_allocations
+        initial_budget_per_voter += voter_budget_increment
@@ -4,8 +4,10 @@ The method of equal shares.
 
 from __future__ import annotations
 
+import heapq
 from copy import copy, deepcopy
 from collections.abc import Iterable
+from itertools import count
 
 from pabutools.rules.budgetallocation import BudgetAllocation
 from pabutools.rules.mes.mes_details import (
@@ -13,14 +15,17 @@ from pabutools.rules.mes.mes_details import (
     MESIteration,
     MESProjectDetails,
 )
+from pabutools.rules.mes.mes_numpy import method_of_equal_shares_numpy_scheme
 from pabutools.utils import Numeric
 
 from pabutools.election import AbstractApprovalProfile
 from pabutools.election.satisfaction.satisfactionmeasure import GroupSatisfactionMeasure
 from pabutools.election.ballot.ballot import AbstractBallot
+from pabutools.election.ballot.approvalballot import AbstractApprovalBallot
+from pabutools.election.ballot.cardinalballot import AbstractCardinalBallot
 from pabutools.election.instance import Instance, Project
 from pabutools.election.profile import AbstractProfile
-from pabutools.election.satisfaction import SatisfactionMeasure
+from pabutools.election.satisfaction import SatisfactionMeasure, SatisfactionMatrix
 from pabutools.tiebreaking import lexico_tie_breaking
 from pabutools.fractions import frac
 from pabutools.tiebreaking import TieBreakingRule
@@ -118,7 +123,10 @@ class MESVoter:
         """
         res = self.budget_over_sat_map.get((proj, self.budget), None)
         if res is None:
-            res = frac(self.budget, self.sat.sat_project(proj))
+            if isinstance(proj, MESProject):
+                res = frac(self.budget, proj.supporters_sat(self))
+            else:
+                res = frac(self.budget, self.sat.sat_project(proj))
             self.budget_over_sat_map[(proj, self.budget)] = res
         return res
 
@@ -132,7 +140,8 @@ class MESVoter:
 class MESProject(Project):
     """
     Class used to summarise the projects in a run of MES. Mostly use to store details that can be retrieved
-    efficiently.
+    efficiently. The satisfaction of the supporters is stored in `sat_supporter_map`, indexed by the index of the
+    voters, or in `unique_sat_supporter` if it is the same for all supporters.
     """
 
     def __init__(self, project):
@@ -148,7 +157,10 @@ class MESProject(Project):
     def supporters_sat(self, supporter: MESVoter):
         if self.unique_sat_supporter:
             return self.unique_sat_supporter
-        return supporter.sat.sat_project(self)
+        sat = self.sat_supporter_map.get(supporter.index)
+        if sat is None:
+            sat = supporter.sat.sat_project(self)
+        return sat
 
     def __str__(self):
         return f"MESProject[{self.name}, {float(self.affordability)}]"
@@ -242,7 +254,7 @@ def naive_mes(
             if indiv_sat > 0:
                 total_sat += v.total_sat_project(p)
                 mes_p.supporter_indices.append(i)
-                mes_p.sat_supporter_map[v] = indiv_sat
+                mes_p.sat_supporter_map[i] = indiv_sat
         if total_sat > 0:
             if p.cost > 0:
                 mes_p.total_sat = total_sat
@@ -480,6 +492,450 @@ def mes_inner_algo(
             )
 
 
+def mes_project_affordability(
+    voters: list[MESVoter], project: MESProject
+) -> Numeric | None:
+    """
+    Computes the affordability factor of a project given the current budget of the voters, as done in
+    :py:func:`~pabutools.rules.mes.mes_rule.mes_inner_algo`. The supporters are assumed to be able to afford the
+    project together. Returns `None` if no affordability factor is found.
+
+    Parameters
+    ----------
+        voters: list[MESVoter]
+            The list of the voters, formatted for MES.
+        project: MESProject
+            The project under consideration.
+
+    Returns
+    -------
+        Numeric | None
+            The affordability factor of the project.
+    """
+    project.supporter_indices.sort(
+        key=lambda i: voters[i].budget_over_sat_project(project)
+    )
+    current_contribution = 0
+    denominator = project.total_sat
+    for i in project.supporter_indices:
+        supporter = voters[i]
+        afford_factor = frac(project.cost - current_contribution, denominator)
+        if afford_factor * project.supporters_sat(supporter) <= supporter.budget:
+            return afford_factor
+        current_contribution += supporter.total_budget()
+        denominator -= supporter.multiplicity * project.supporters_sat(supporter)
+    return None
+
+
+def mes_lazy_inner_algo(
+    instance: Instance,
+    profile: AbstractProfile,
+    voters: list[MESVoter],
+    projects: set[MESProject],
+    tie_breaking_rule: TieBreakingRule,
+    current_alloc: BudgetAllocation,
+    all_allocs: list[BudgetAllocation],
+    verbose: bool = False,
+) -> None:
+    """
+    Lazy version of :py:func:`~pabutools.rules.mes.mes_rule.mes_inner_algo` for resolute outcomes. The projects are
+    stored in a priority queue keyed by their last computed affordability factor. Since the budget of the voters can
+    only decrease, the affordability factor of a project can only increase, so a stale value is a lower bound on the
+    actual one. In each round, only the projects at the top of the queue whose value is stale are re-evaluated.
+    After a project is selected, the value of a project is marked as stale only if one of its supporters paid for the
+    selected project.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        voters: list[MESVoter]
+            The list of MESVoters, already instantiated with the necessary inner values.
+        projects: set[MESProject]
+            The set of MESProjects to take into account, already instantiated with the necessary inner
+            values.
+        tie_breaking_rule : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        current_alloc: BudgetAllocation
+            The budget allocation that is currently being built. Only populated via side effects.
+        all_allocs: list[BudgetAllocation]
+            The set of all budget allocations returned so far. Only populated via side effects.
+        verbose : bool, optional
+            (De)Activate the display of additional information.
+    """
+    voter_projects = [[] for _ in voters]
+    for project in projects:
+        for i in project.supporter_indices:
+            voter_projects[i].append(project)
+
+    tie_counter = count()
+    queue = [(p.affordability, next(tie_counter), p) for p in projects]
+    heapq.heapify(queue)
+    up_to_date = set()
+
+    while True:
+        best_afford = None
+        tied_projects = []
+        put_aside = []
+        while queue:
+            afford, _, project = queue[0]
+            if best_afford is not None and afford > best_afford:
+                break
+            heapq.heappop(queue)
+            if project in up_to_date:
+                best_afford = afford
+                tied_projects.append(project)
+                continue
+            available_budget = sum(
+                voters[i].total_budget() for i in project.supporter_indices
+            )
+            if available_budget < project.cost:
+                if verbose:
+                    print(
+                        f"\t\t Removed for lack of budget: "
+                        f"{float(available_budget)} < {float(project.cost)}"
+                    )
+                projects.remove(project)
+                continue
+            new_afford = mes_project_affordability(voters, project)
+            if new_afford is None:
+                put_aside.append(project)
+                continue
+            project.affordability = new_afford
+            up_to_date.add(project)
+            heapq.heappush(queue, (new_afford, next(tie_counter), project))
+        if verbose:
+            print(f"{tied_projects}")
+        if not tied_projects:
+            all_allocs.append(current_alloc)
+            return
+        if len(tied_projects) > 1:
+            tied_projects = tie_breaking_rule.order(instance, profile, tied_projects)
+        selected_project = tied_projects[0]
+        for project in tied_projects[1:] + put_aside:
+            heapq.heappush(queue, (project.affordability, next(tie_counter), project))
+        current_alloc.append(selected_project.project)
+        projects.remove(selected_project)
+        for i in selected_project.supporter_indices:
+            supporter = voters[i]
+            payment = min(
+                supporter.budget,
+                best_afford * selected_project.supporters_sat(supporter),
+            )
+            if payment > 0:
+                supporter.budget -= payment
+                up_to_date.difference_update(voter_projects[i])
+
+
+def mes_irresolute_inner_algo(
+    instance: Instance,
+    profile: AbstractProfile,
+    voters: list[MESVoter],
+    projects: set[MESProject],
+    tie_breaking_rule: TieBreakingRule,
+    current_alloc: BudgetAllocation,
+    all_allocs: list[BudgetAllocation],
+    visited_states: set | None = None,
+    verbose: bool = False,
+) -> None:
+    """
+    Version of :py:func:`~pabutools.rules.mes.mes_rule.mes_inner_algo` for irresolute outcomes in which the branches
+    corresponding to tied projects share the same voters, projects and budget allocation. Instead of being copied for
+    each branch, they are modified in place and the changes are undone when backtracking. Moreover, two branches
+    reaching the same set of selected projects with the same budgets for the voters lead to the same budget
+    allocations: only the first one is explored.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        voters: list[MESVoter]
+            The list of MESVoters, already instantiated with the necessary inner values.
+        projects: set[MESProject]
+            The set of MESProjects to take into account, already instantiated with the necessary inner
+            values.
+        tie_breaking_rule : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+        current_alloc: BudgetAllocation
+            The budget allocation that is currently being built. Restored to its initial value upon return.
+        all_allocs: list[BudgetAllocation]
+            The set of all budget allocations returned so far. Only populated via side effects.
+        visited_states: set, optional
+            The states (set of selected projects and budgets of the voters) that have already been explored.
+        verbose : bool, optional
+            (De)Activate the display of additional information.
+    """
+    if visited_states is None:
+        visited_states = set()
+    state = (frozenset(current_alloc), tuple(voter.budget for voter in voters))
+    if state in visited_states:
+        return
+    visited_states.add(state)
+
+    removed_projects = []
+    previous_affordabilities = []
+    tied_projects = []
+    best_afford = float("inf")
+    for project in sorted(projects, key=lambda p: p.affordability):
+        available_budget = sum(
+            voters[i].total_budget() for i in project.supporter_indices
+        )
+        if available_budget < project.cost:
+            projects.remove(project)
+            removed_projects.append(project)
+            continue
+        if project.affordability > best_afford:
+            break
+        afford_factor = mes_project_affordability(voters, project)
+        if afford_factor is not None:
+            previous_affordabilities.append((project, project.affordability))
+            project.affordability = afford_factor
+            if afford_factor < best_afford:
+                best_afford = afford_factor
+                tied_projects = [project]
+            elif afford_factor == best_afford:
+                tied_projects.append(project)
+    if verbose:
+        print(f"{tied_projects}")
+
+    if not tied_projects:
+        final_alloc = BudgetAllocation(sorted(current_alloc), current_alloc.details)
+        if final_alloc not in all_allocs:
+            all_allocs.append(final_alloc)
+    else:
+        if len(tied_projects) > 1:
+            tied_projects = tie_breaking_rule.order(instance, profile, tied_projects)
+        for selected_project in tied_projects:
+            previous_budgets = []
+            for i in selected_project.supporter_indices:
+                supporter = voters[i]
+                previous_budgets.append((supporter, supporter.budget))
+                supporter.budget -= min(
+                    supporter.budget,
+                    best_afford * selected_project.supporters_sat(supporter),
+                )
+            current_alloc.append(selected_project.project)
+            projects.remove(selected_project)
+            mes_irresolute_inner_algo(
+                instance,
+                profile,
+                voters,
+                projects,
+                tie_breaking_rule,
+                current_alloc,
+                all_allocs,
+                visited_states,
+                verbose,
+            )
+            projects.add(selected_project)
+            current_alloc.pop()
+            for supporter, budget in previous_budgets:
+                supporter.budget = budget
+
+    for project, affordability in previous_affordabilities:
+        project.affordability = affordability
+    projects.update(removed_projects)
+
+
+def ballot_content_key(ballot: AbstractBallot) -> tuple | frozenset:
+    """
+    Returns a hashable key describing the content of a ballot, ignoring its name and metadata: two ballots have the
+    same key if and only if they approve of, score or rank the projects in the same way.
+
+    Parameters
+    ----------
+        ballot: :py:class:`~pabutools.election.ballot.ballot.AbstractBallot`
+            The ballot.
+
+    Returns
+    -------
+        tuple | frozenset
+            The key.
+    """
+    if isinstance(ballot, AbstractCardinalBallot):
+        return frozenset(ballot.items())
+    if isinstance(ballot, AbstractApprovalBallot):
+        return frozenset(ballot)
+    return tuple(ballot)
+
+
+def merge_mes_voters(
+    voters: list[MESVoter], keys: list
+) -> tuple[list[MESVoter], list[int], list[bool]]:
+    """
+    Merges the voters sharing the same key. The first voter with a given key represents all of them: its
+    multiplicity is increased by the multiplicities of the others and its index is set to its position in the list of
+    merged voters.
+
+    Parameters
+    ----------
+        voters: list[MESVoter]
+            The voters.
+        keys: list
+            The key of each voter.
+
+    Returns
+    -------
+        tuple[list[MESVoter], list[int], list[bool]]
+            The merged voters, the index of the merged voter of each voter, and whether each voter represents its
+            group.
+    """
+    group_index = {}
+    new_index = []
+    is_representative = []
+    merged_voters = []
+    for voter, key in zip(voters, keys):
+        index = group_index.get(key)
+        is_representative.append(index is None)
+        if index is None:
+            index = len(merged_voters)
+            group_index[key] = index
+            voter.index = index
+            merged_voters.append(voter)
+        else:
+            merged_voters[index].multiplicity += voter.multiplicity
+        new_index.append(index)
+    return merged_voters, new_index, is_representative
+
+
+def mes_voters_and_projects(
+    instance: Instance,
+    sat_profile: GroupSatisfactionMeasure,
+    initial_budget_per_voter: Numeric,
+    initial_budget_allocation: BudgetAllocation,
+    binary_sat: bool = False,
+    merge_identical_voters: bool = False,
+) -> tuple[list[MESVoter], set[MESProject]]:
+    """
+    Builds the voters and the projects used in a run of the method of equal shares. Projects that are not part of the
+    initial budget allocation and that are supported by at least one voter are returned, except for the ones with
+    cost 0 that are directly appended to the initial budget allocation.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        sat_profile : :py:class:`~pabutools.election.satisfaction.satisfactionmeasure.GroupSatisfactionMeasure`
+            The profile of satisfaction functions.
+        initial_budget_per_voter: Numeric
+            The initial budget of a voter.
+        initial_budget_allocation : list[:py:class:`~pabutools.election.instance.Project`]
+            An initial budget allocation, typically empty. Modified in place.
+        binary_sat : bool, optional
+            Set to `True` if the satisfaction of a voter for a project is the same for all supporters.
+        merge_identical_voters : bool, optional
+            Set to `True` to merge the voters that have the same satisfaction for all the projects into a single voter
+            whose multiplicity is the sum of theirs. Such voters always have the same budget during a run of MES, so
+            the outcome is the same, but the rule then scales with the number of distinct satisfaction vectors rather
+            than with the number of voters. The satisfaction measures of voters submitting ballots with the same
+            content (see :py:func:`~pabutools.rules.mes.mes_rule.ballot_content_key`) are assumed to be the same, and
+            are thus only evaluated for one of them. Should not be used when the budget of each voter is reported.
+            Defaults to `False`.
+
+    Returns
+    -------
+        tuple[list[MESVoter], set[MESProject]]
+            The voters and the projects.
+    """
+    voters = []
+    for index, sat in enumerate(sat_profile):
+        voters.append(
+            MESVoter(
+                index,
+                sat.ballot,
+                sat,
+                initial_budget_per_voter,
+                sat_profile.multiplicity(sat),
+            )
+        )
+        index += 1
+
+    if merge_identical_voters and not isinstance(sat_profile, SatisfactionMatrix):
+        # Voters submitting the same ballot have the same satisfaction, it is computed for one of them only
+        voters = merge_mes_voters(
+            voters, [ballot_content_key(voter.ballot) for voter in voters]
+        )[0]
+
+    if isinstance(sat_profile, SatisfactionMatrix):
+        # The supporters of each project are directly read from the matrix
+        indptr, rows, values = sat_profile.by_project()
+
+        def supporters(project):
+            index = sat_profile.project_index.get(project)
+            if index is None:
+                return []
+            start, end = indptr[index], indptr[index + 1]
+            return zip(rows[start:end].tolist(), values[start:end].tolist())
+
+    elif instance.is_indexed() and all(v.sat.restricted_to_ballot for v in voters):
+        # Integer path: only the voters whose ballot mentions the project are considered
+        supporters_by_id = instance.supporters_by_id(v.sat.ballot for v in voters)
+
+        def supporters(project):
+            return (
+                (i, voters[i].sat.sat_project(project))
+                for i in supporters_by_id[instance.project_id(project)]
+            )
+
+    else:
+
+        def supporters(project):
+            return ((i, v.sat.sat_project(project)) for i, v in enumerate(voters))
+
+    candidates = sorted(instance.difference(set(initial_budget_allocation)))
+    project_supporters = [
+        [(i, indiv_sat) for i, indiv_sat in supporters(p) if indiv_sat > 0]
+        for p in candidates
+    ]
+
+    if merge_identical_voters:
+        # Voters are grouped on their satisfaction vector, the first voter of each group represents the group
+        sat_vectors = [[] for _ in voters]
+        for k, supps in enumerate(project_supporters):
+            for i, indiv_sat in supps:
+                sat_vectors[i].append((k, indiv_sat))
+        merged_voters, new_index, is_representative = merge_mes_voters(
+            voters, [tuple(sat_vector) for sat_vector in sat_vectors]
+        )
+        if len(merged_voters) < len(voters):
+            voters = merged_voters
+            project_supporters = [
+                [
+                    (new_index[i], indiv_sat)
+                    for i, indiv_sat in supps
+                    if is_representative[i]
+                ]
+                for supps in project_supporters
+            ]
+
+    projects = set()
+    for p, supps in zip(candidates, project_supporters):
+        mes_p = MESProject(p)
+        total_sat = 0
+        for i, indiv_sat in supps:
+            v = voters[i]
+            total_sat += v.multiplicity * indiv_sat
+            mes_p.supporter_indices.append(i)
+            if binary_sat:
+                mes_p.unique_sat_supporter = indiv_sat
+            else:
+                mes_p.sat_supporter_map[i] = indiv_sat
+        if total_sat > 0:
+            if p.cost > 0:
+                mes_p.total_sat = total_sat
+                afford = frac(p.cost, total_sat)
+                mes_p.initial_affordability = afford
+                mes_p.affordability = afford
+                projects.add(mes_p)
+            else:
+                initial_budget_allocation.append(p)
+    return voters, projects
+
+
 def method_of_equal_shares_scheme(
     instance: Instance,
     profile: AbstractProfile,
@@ -540,41 +996,15 @@ def method_of_equal_shares_scheme(
     """
     if verbose:
         print(f"Initial budget per voter is: {initial_budget_per_voter}")
-    voters = []
-    for index, sat in enumerate(sat_profile):
-        voters.append(
-            MESVoter(
-                index,
-                sat.ballot,
-                sat,
-                initial_budget_per_voter,
-                sat_profile.multiplicity(sat),
-            )
-        )
-        index += 1
-
-    projects = set()
-    for p in instance.difference(set(initial_budget_allocation)):
-        mes_p = MESProject(p)
-        total_sat = 0
-        for i, v in enumerate(voters):
-            indiv_sat = v.sat.sat_project(p)
-            if indiv_sat > 0:
-                total_sat += v.total_sat_project(p)
-                mes_p.supporter_indices.append(i)
-                if binary_sat:
-                    mes_p.unique_sat_supporter = indiv_sat
-                else:
-                    mes_p.sat_supporter_map[v] = indiv_sat
-        if total_sat > 0:
-            if p.cost > 0:
-                mes_p.total_sat = total_sat
-                afford = frac(p.cost, total_sat)
-                mes_p.initial_affordability = afford
-                mes_p.affordability = afford
-                projects.add(mes_p)
-            else:
-                initial_budget_allocation.append(p)
+    # Without analytics, the budget of the individual voters is never reported and identical voters can be merged
+    voters, projects = mes_voters_and_projects(
+        instance,
+        sat_profile,
+        initial_budget_per_voter,
+        initial_budget_allocation,
+        binary_sat,
+        merge_identical_voters=not analytics,
+    )
 
     budget_allocation = BudgetAllocation(
         initial_budget_allocation,
@@ -597,19 +1027,42 @@ def method_of_equal_shares_scheme(
 
     while True:
         all_budget_allocations: list[BudgetAllocation] = []
-        mes_inner_algo(
-            instance,
-            profile,
-            voters,
-            copy(projects),
-            tie_breaking,
-            deepcopy(budget_allocation),
-            all_budget_allocations,
-            resoluteness,
-            skipped_mes_project,
-            analytics,
-            verbose,
-        )
+        if not resoluteness and not analytics and skipped_mes_project is None:
+            mes_irresolute_inner_algo(
+                instance,
+                profile,
+                voters,
+                copy(projects),
+                tie_breaking,
+                deepcopy(budget_allocation),
+                all_budget_allocations,
+                verbose=verbose,
+            )
+        elif resoluteness and not analytics and skipped_mes_project is None:
+            mes_lazy_inner_algo(
+                instance,
+                profile,
+                voters,
+                copy(projects),
+                tie_breaking,
+                deepcopy(budget_allocation),
+                all_budget_allocations,
+                verbose,
+            )
+        else:
+            mes_inner_algo(
+                instance,
+                profile,
+                voters,
+                copy(projects),
+                tie_breaking,
+                deepcopy(budget_allocation),
+                all_budget_allocations,
+                resoluteness,
+                skipped_mes_project,
+                analytics,
+                verbose,
+            )
         if resoluteness:
             outcome = all_budget_allocations[0]
             if voter_budget_increment is None:
@@ -651,6 +1104,7 @@ def method_of_equal_shares(
     skipped_project: Project | None = None,
     analytics: bool = False,
     verbose: bool = False,
+    backend: str = "python",
 ) -> BudgetAllocation | list[BudgetAllocation]:
     """
     The Method of Equal Shares (MES). See the website `equalshares.net <https://equalshares.net/>`_
@@ -697,6 +1151,13 @@ def method_of_equal_shares(
         verbose : bool, optional
             (De)Activate the display of additional information.
             Defaults to `False`.
+        backend : str, optional
+            The implementation used to compute the outcome. Either `"python"`, for the default implementation, or
+            `"numpy"` for :py:func:`~pabutools.rules.mes.mes_numpy.method_of_equal_shares_numpy_scheme`, in which
+            budgets and satisfactions are stored in NumPy arrays. The latter scales better with the number of voters
+            but supports neither analytics nor the `skipped_project` argument. With exact fractions, the arrays have
+            the object dtype and the arithmetic is not vectorised.
+            Defaults to `"python"`.
 
     Returns
     -------
@@ -720,6 +1181,27 @@ def method_of_equal_shares(
     if binary_sat is None:
         binary_sat = isinstance(profile, AbstractApprovalProfile)
 
+    if backend == "numpy":
+        if analytics or skipped_project is not None:
+            raise ValueError(
+                "The numpy backend of MES does not support analytics or skipped projects."
+            )
+        return method_of_equal_shares_numpy_scheme(
+            instance,
+            profile,
+            sat_profile,
+            frac(instance.budget_limit, profile.num_ballots()),
+            budget_allocation,
+            tie_breaking,
+            resoluteness=resoluteness,
+            voter_budget_increment=voter_budget_increment,
+            binary_sat=binary_sat,
+        )
+    if backend != "python":
+        raise ValueError(
+            f"The backend '{backend}' is invalid, it needs to be in [python, numpy]."
+        )
+
     return method_of_equal_shares_scheme(
         instance,
         profile,
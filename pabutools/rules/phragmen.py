@@ -5,12 +5,13 @@ Phragmén's methods.
 from __future__ import annotations
 
 from collections.abc import Collection
-from copy import deepcopy
+
+import numpy as np
 
 from pabutools.rules.budgetallocation import BudgetAllocation
 from pabutools.utils import Numeric
 
-from pabutools.fractions import frac
+from pabutools.fractions import frac, numeric_dtype, as_numeric_array
 from pabutools.election import (
     Instance,
     Project,
@@ -55,6 +56,348 @@ class PhragmenVoter:
         return self.multiplicity * self.load
 
 
+def phragmen_new_max_load(
+    load_sum: Numeric, cost: Numeric, approval_score: Numeric
+) -> Numeric:
+    """
+    Returns the maximum load the supporters of a project would end up with if the project were selected, that is,
+    the load they all have once the cost of the project is added to their current total load and shared equally
+    between them.
+
+    Parameters
+    ----------
+        load_sum : Numeric
+            The total load of the supporters of the project, multiplicities included.
+        cost : Numeric
+            The cost of the project.
+        approval_score : Numeric
+            The number of supporters of the project, multiplicities included.
+
+    Returns
+    -------
+        Numeric
+            The new maximum load, infinite if the project has no supporters.
+    """
+    if approval_score == 0:
+        return float("inf")
+    return frac(load_sum + cost, approval_score)
+
+
+def phragmen_grouped_voters(
+    voters: list[PhragmenVoter],
+    project_index: dict[Project, int],
+    instance: Instance | None = None,
+) -> tuple[list[PhragmenVoter], list[list[int]]]:
+    """
+    Merges the voters that approve of the same projects, among the ones that can be selected, and that have the same
+    initial load. Such voters have the same load during the whole run of the Phragmén's sequential rule, they can thus
+    be replaced by a single voter whose multiplicity is the sum of theirs.
+
+    Parameters
+    ----------
+        voters : list[:py:class:`~pabutools.rules.phragmen.PhragmenVoter`]
+            The voters.
+        project_index : dict[:py:class:`~pabutools.election.instance.Project`, int]
+            The index of each project that can be selected.
+        instance : :py:class:`~pabutools.election.instance.Instance`, optional
+            The instance. If it is indexed (see :py:meth:`~pabutools.election.instance.Instance.index_projects`),
+            the ballots are converted through the ids of the projects rather than by hashing the projects.
+
+    Returns
+    -------
+        tuple[list[:py:class:`~pabutools.rules.phragmen.PhragmenVoter`], list[list[int]]]
+            The merged voters and, for each of them, the indices of the projects they approve of.
+    """
+    if instance is not None and instance.is_indexed():
+        local_index = [-1] * len(instance)
+        for p, k in project_index.items():
+            local_index[instance.project_id(p)] = k
+
+        def approved_indices(ballot):
+            indices = (local_index[i] for i in instance.project_ids(ballot))
+            return tuple(sorted(k for k in indices if k >= 0))
+
+    else:
+
+        def approved_indices(ballot):
+            return tuple(sorted(project_index[p] for p in ballot if p in project_index))
+
+    groups = dict()
+    for voter in voters:
+        approved = approved_indices(voter.ballot)
+        key = (approved, voter.load)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = PhragmenVoter(voter.ballot, voter.load, voter.multiplicity)
+        else:
+            group.multiplicity += voter.multiplicity
+    return list(groups.values()), [list(approved) for approved, _ in groups]
+
+
+class PhragmenState:
+    """
+    State of a run of the Phragmén's sequential rule, in which the projects are represented by their indices. The
+    total load of the supporters of every project, and the maximum load they would end up with if the project were
+    selected, are kept up to date as projects are selected, so that only the supporters of the selected project need
+    to be visited.
+
+    Voters only ever have one of few different loads: their initial load, or the load of the supporters of one of the
+    selected projects. The loads are thus stored once in `load_values`, and voters only hold the index of their load.
+    This way, the supporters of a selected project can be grouped by load, and the load sums are updated once per
+    group and per project.
+
+    Parameters
+    ----------
+        remaining : list[bool]
+            Whether each project can still be selected.
+        load_ids : list[int]
+            The index in `load_values` of the load of each voter.
+        load_values : list[Numeric]
+            The loads.
+        load_sums : list[Numeric]
+            The total load of the supporters of each project, multiplicities included.
+        max_loads : list[Numeric]
+            The maximum load of the supporters of each project if it were selected.
+        budget_allocation : :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The projects selected so far.
+        cost : Numeric
+            The total cost of the projects selected so far.
+
+    Attributes
+    ----------
+        remaining : list[bool]
+            Whether each project can still be selected.
+        load_ids : list[int]
+            The index in `load_values` of the load of each voter.
+        load_values : list[Numeric]
+            The loads.
+        load_sums : list[Numeric]
+            The total load of the supporters of each project, multiplicities included.
+        max_loads : list[Numeric]
+            The maximum load of the supporters of each project if it were selected.
+        budget_allocation : :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The projects selected so far.
+        cost : Numeric
+            The total cost of the projects selected so far.
+    """
+
+    def __init__(
+        self,
+        remaining: list[bool],
+        load_ids: list[int],
+        load_values: list[Numeric],
+        load_sums: list[Numeric],
+        max_loads: list[Numeric],
+        budget_allocation: BudgetAllocation,
+        cost: Numeric,
+    ):
+        self.remaining = remaining
+        self.load_ids = load_ids
+        self.load_values = load_values
+        self.load_sums = load_sums
+        self.max_loads = max_loads
+        self.budget_allocation = budget_allocation
+        self.cost = cost
+
+    def copy(self) -> PhragmenState:
+        return PhragmenState(
+            list(self.remaining),
+            list(self.load_ids),
+            list(self.load_values),
+            list(self.load_sums),
+            list(self.max_loads),
+            BudgetAllocation(self.budget_allocation),
+            self.cost,
+        )
+
+    def select(
+        self,
+        index: int,
+        max_load: Numeric,
+        projects: list[Project],
+        voters: list[PhragmenVoter],
+        supporters: list[list[int]],
+        voter_projects: list[list[int]],
+        approval_scores: list[Numeric],
+    ) -> None:
+        """
+        Selects a project: its supporters all end up with the given maximum load, and the load sums of the other
+        projects they support are updated accordingly.
+
+        Parameters
+        ----------
+            index : int
+                The index of the selected project.
+            max_load : Numeric
+                The new load of the supporters of the project.
+            projects : list[:py:class:`~pabutools.election.instance.Project`]
+                The projects, indexed by their position in the list.
+            voters : list[:py:class:`~pabutools.rules.phragmen.PhragmenVoter`]
+                The voters.
+            supporters : list[list[int]]
+                The indices of the supporters of each project.
+            voter_projects : list[list[int]]
+                The indices of the projects approved by each voter.
+            approval_scores : list[Numeric]
+                The approval score of each project.
+        """
+        remaining = self.remaining
+        load_ids = self.load_ids
+        remaining[index] = False
+        self.budget_allocation.append(projects[index])
+        self.cost += projects[index].cost
+
+        # For each previous load of the supporters, the number of supporters with that load approving each project
+        counts_per_load = dict()
+        new_load_id = len(self.load_values)
+        self.load_values.append(max_load)
+        for i in supporters[index]:
+            counts = counts_per_load.get(load_ids[i])
+            if counts is None:
+                counts = [0] * len(projects)
+                counts_per_load[load_ids[i]] = counts
+            multiplicity = voters[i].multiplicity
+            for k in voter_projects[i]:
+                counts[k] += multiplicity
+            load_ids[i] = new_load_id
+
+        touched = set()
+        for load_id, counts in counts_per_load.items():
+            delta = max_load - self.load_values[load_id]
+            if delta == 0:
+                continue
+            for k, count in enumerate(counts):
+                if count > 0 and remaining[k]:
+                    self.load_sums[k] += count * delta
+                    touched.add(k)
+        for k in touched:
+            self.max_loads[k] = phragmen_new_max_load(
+                self.load_sums[k], projects[k].cost, approval_scores[k]
+            )
+
+
+def sequential_phragmen_numpy(
+    instance: Instance,
+    profile: AbstractApprovalProfile,
+    projects: list[Project],
+    voters: list[PhragmenVoter],
+    voter_projects: list[list[int]],
+    budget_allocation: BudgetAllocation,
+    cost: Numeric,
+    tie_breaking: TieBreakingRule,
+) -> BudgetAllocation:
+    """
+    Array-backed resolute version of the Phragmén's sequential rule, see
+    :py:func:`~pabutools.rules.phragmen.sequential_phragmen`. The approvals are stored in compressed sparse row (CSR)
+    format in both directions, and, as in :py:class:`~pabutools.rules.phragmen.PhragmenState`, the voters only hold
+    the index of their load. Selecting a project thus only touches the ballots of its supporters, which are counted
+    per previous load and per project with NumPy. The dtype of the loads is given by
+    :py:func:`~pabutools.fractions.numeric_dtype`.
+
+    Parameters
+    ----------
+        instance: :py:class:`~pabutools.election.instance.Instance`
+            The instance.
+        profile : :py:class:`~pabutools.election.profile.profile.AbstractProfile`
+            The profile.
+        projects : list[:py:class:`~pabutools.election.instance.Project`]
+            The projects that can be selected, indexed by their position in the list.
+        voters : list[:py:class:`~pabutools.rules.phragmen.PhragmenVoter`]
+            The voters, with their initial loads.
+        voter_projects : list[list[int]]
+            The indices of the projects approved by each voter.
+        budget_allocation : :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The initial budget allocation, it is modified in place.
+        cost : Numeric
+            The total cost of the initial budget allocation.
+        tie_breaking : :py:class:`~pabutools.tiebreaking.TieBreakingRule`
+            The tie-breaking rule used.
+
+    Returns
+    -------
+        :py:class:`~pabutools.rules.budgetallocation.BudgetAllocation`
+            The selected projects.
+    """
+    num_projects = len(projects)
+    voter_indptr = np.zeros(len(voters) + 1, dtype=np.int64)
+    np.cumsum([len(approved) for approved in voter_projects], out=voter_indptr[1:])
+    voter_indices = np.array(
+        [k for approved in voter_projects for k in approved], dtype=np.int64
+    )
+    approval_voters = np.repeat(np.arange(len(voters)), np.diff(voter_indptr))
+    supporter_indices = approval_voters[np.argsort(voter_indices, kind="stable")]
+    supporter_indptr = np.zeros(num_projects + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(voter_indices, minlength=num_projects), out=supporter_indptr[1:]
+    )
+    multiplicities = np.array([v.multiplicity for v in voters], dtype=np.int64)
+
+    def counts_per_load(voter_subset, load_ids):
+        # Number of voters from the subset (multiplicities included) approving each project they approve of, for each
+        # of their load ids
+        starts = voter_indptr[voter_subset]
+        lengths = voter_indptr[voter_subset + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions += np.arange(len(positions))
+        touched, project_ranks = np.unique(voter_indices[positions], return_inverse=True)
+        unique_ids, id_ranks = np.unique(load_ids[voter_subset], return_inverse=True)
+        counts = np.bincount(
+            np.repeat(id_ranks, lengths) * len(touched) + project_ranks,
+            weights=np.repeat(multiplicities[voter_subset], lengths),
+            minlength=len(unique_ids) * len(touched),
+        )
+        counts = counts.astype(np.int64).astype(object)
+        return unique_ids, touched, counts.reshape(len(unique_ids), len(touched))
+
+    load_values = list({v.load: None for v in voters})
+    load_value_ids = {load: load_id for load_id, load in enumerate(load_values)}
+    load_ids = np.array([load_value_ids[v.load] for v in voters], dtype=np.int64)
+    approval_scores = np.zeros(num_projects, dtype=object)
+    load_sums = np.zeros(num_projects, dtype=numeric_dtype())
+    unique_ids, touched, counts = counts_per_load(np.arange(len(voters)), load_ids)
+    for load_id, load_counts in zip(unique_ids, counts):
+        approval_scores[touched] += load_counts
+        load_sums[touched] += as_numeric_array(load_counts) * frac(load_values[load_id])
+    max_loads = np.array(
+        [
+            phragmen_new_max_load(load_sums[k], p.cost, approval_scores[k])
+            for k, p in enumerate(projects)
+        ],
+        dtype=object,
+    )
+    remaining = np.ones(num_projects, dtype=bool)
+
+    while remaining.any():
+        min_max_load = max_loads[remaining].min()
+        tied = [
+            projects[k] for k in np.flatnonzero(remaining & (max_loads == min_max_load))
+        ]
+        if any(cost + p.cost > instance.budget_limit for p in tied):
+            break
+        selected = tie_breaking.order(instance, profile, tied)[0]
+        index = projects.index(selected)
+        remaining[index] = False
+        budget_allocation.append(selected)
+        cost += selected.cost
+
+        supps = supporter_indices[
+            supporter_indptr[index] : supporter_indptr[index + 1]
+        ]
+        unique_ids, touched, counts = counts_per_load(supps, load_ids)
+        for load_id, load_counts in zip(unique_ids, counts):
+            delta = min_max_load - load_values[load_id]
+            if delta != 0:
+                load_sums[touched] += as_numeric_array(load_counts) * delta
+        for k in touched:
+            max_loads[k] = phragmen_new_max_load(
+                load_sums[k], projects[k].cost, approval_scores[k]
+            )
+        load_ids[supps] = len(load_values)
+        load_values.append(min_max_load)
+    budget_allocation.sort()
+    return budget_allocation
+
+
 def sequential_phragmen(
     instance: Instance,
     profile: AbstractApprovalProfile,
@@ -62,6 +405,7 @@ def sequential_phragmen(
     initial_budget_allocation: Collection[Project] | None = None,
     tie_breaking: TieBreakingRule | None = None,
     resoluteness: bool = True,
+    backend: str = "python",
 ) -> BudgetAllocation | list[BudgetAllocation]:
     """
     Phragmén's sequential rule. It works as follows. Voters receive money in a virtual currency. They all start with a
@@ -87,6 +431,11 @@ def sequential_phragmen(
         resoluteness : bool, optional
             Set to `False` to obtain an irresolute outcome, where all tied budget allocations are returned.
             Defaults to True.
+        backend : str, optional
+            The implementation used: `"python"`, or `"numpy"` for
+            :py:func:`~pabutools.rules.phragmen.sequential_phragmen_numpy`, in which the loads are stored in NumPy
+            arrays. The latter only supports resolute outcomes.
+            Defaults to `"python"`.
 
     Returns
     -------
@@ -94,92 +443,6 @@ def sequential_phragmen(
             The selected projects if resolute (:code:`resoluteness == True`), or the set of selected projects if irresolute
             (:code:`resoluteness == False`).
     """
-
-    def aux(
-        inst,
-        projects,
-        prof,
-        voters,
-        supporters,
-        approval_scores,
-        alloc,
-        cost,
-        allocs,
-        resolute,
-    ):
-        if len(projects) == 0:
-            alloc.sort()
-            if alloc not in allocs:
-                allocs.append(alloc)
-        else:
-            min_new_maxload = None
-            arg_min_new_maxload = None
-            for project in projects:
-                if approval_scores[project] == 0:
-                    new_maxload = float("inf")
-                else:
-                    new_maxload = frac(
-                        sum(voters[i].total_load() for i in supporters[project])
-                        + project.cost,
-                        approval_scores[project],
-                    )
-                if min_new_maxload is None or new_maxload < min_new_maxload:
-                    min_new_maxload = new_maxload
-                    arg_min_new_maxload = [project]
-                elif min_new_maxload == new_maxload:
-                    arg_min_new_maxload.append(project)
-
-            if any(
-                cost + project.cost > inst.budget_limit
-                for project in arg_min_new_maxload
-            ):
-                alloc.sort()
-                if alloc not in allocs:
-                    allocs.append(alloc)
-            else:
-                tied_projects = tie_breaking.order(inst, prof, arg_min_new_maxload)
-                if resolute:
-                    selected_project = tied_projects[0]
-                    for voter in voters:
-                        if selected_project in voter.ballot:
-                            voter.load = min_new_maxload
-                    alloc.append(selected_project)
-                    projects.remove(selected_project)
-                    aux(
-                        inst,
-                        projects,
-                        prof,
-                        voters,
-                        supporters,
-                        approval_scores,
-                        alloc,
-                        cost + selected_project.cost,
-                        allocs,
-                        resolute,
-                    )
-                else:
-                    for selected_project in tied_projects:
-                        new_voters = deepcopy(voters)
-                        for voter in new_voters:
-                            if selected_project in voter.ballot:
-                                voter.load = min_new_maxload
-                        new_alloc = deepcopy(alloc) + [selected_project]
-                        new_cost = cost + selected_project.cost
-                        new_projs = deepcopy(projects)
-                        new_projs.remove(selected_project)
-                        aux(
-                            inst,
-                            new_projs,
-                            prof,
-                            new_voters,
-                            supporters,
-                            approval_scores,
-                            new_alloc,
-                            new_cost,
-                            allocs,
-                            resolute,
-                        )
-
     if tie_breaking is None:
         tie_breaking = lexico_tie_breaking
     if initial_budget_allocation is None:
@@ -201,26 +464,99 @@ def sequential_phragmen(
             PhragmenVoter(b, initial_loads[i], profile.multiplicity(b))
             for i, b in enumerate(profile)
         ]
-    supps = {
-        proj: [i for i, v in enumerate(voters_details) if proj in v.ballot]
-        for proj in initial_projects
-    }
 
-    scores = {project: profile.approval_score(project) for project in instance}
+    projects = list(initial_projects)
+    project_index = {p: k for k, p in enumerate(projects)}
+    voters, voter_projects = phragmen_grouped_voters(
+        voters_details, project_index, instance
+    )
+
+    if backend == "numpy":
+        if not resoluteness:
+            raise ValueError(
+                "The numpy backend of sequential Phragmén only supports resolute outcomes."
+            )
+        return sequential_phragmen_numpy(
+            instance,
+            profile,
+            projects,
+            voters,
+            voter_projects,
+            initial_budget_allocation,
+            current_cost,
+            tie_breaking,
+        )
+    if backend != "python":
+        raise ValueError(
+            f"The backend '{backend}' is invalid, it needs to be in [python, numpy]."
+        )
+
+    supporters = [[] for _ in projects]
+    for i, approved in enumerate(voter_projects):
+        for k in approved:
+            supporters[k].append(i)
+    approval_scores = [sum(voters[i].multiplicity for i in supps) for supps in supporters]
+    load_sums = [sum(voters[i].total_load() for i in supps) for supps in supporters]
+    max_loads = [
+        phragmen_new_max_load(load_sums[k], p.cost, approval_scores[k])
+        for k, p in enumerate(projects)
+    ]
 
     all_budget_allocations: list[BudgetAllocation] = []
-    aux(
-        instance,
-        initial_projects,
-        profile,
-        voters_details,
-        supps,
-        scores,
-        initial_budget_allocation,
-        current_cost,
-        all_budget_allocations,
-        resoluteness,
-    )
+    # Explicit depth-first exploration of the tied branches, the recursion limit would be hit on large instances
+    load_values = list({v.load: None for v in voters})
+    load_value_ids = {load: load_id for load_id, load in enumerate(load_values)}
+    states = [
+        PhragmenState(
+            [True] * len(projects),
+            [load_value_ids[v.load] for v in voters],
+            load_values,
+            load_sums,
+            max_loads,
+            initial_budget_allocation,
+            current_cost,
+        )
+    ]
+    while states:
+        state = states.pop()
+        min_new_maxload = None
+        arg_min_new_maxload = None
+        for k, project in enumerate(projects):
+            if not state.remaining[k]:
+                continue
+            new_maxload = state.max_loads[k]
+            if min_new_maxload is None or new_maxload < min_new_maxload:
+                min_new_maxload = new_maxload
+                arg_min_new_maxload = [project]
+            elif min_new_maxload == new_maxload:
+                arg_min_new_maxload.append(project)
+
+        if min_new_maxload is None or any(
+            state.cost + project.cost > instance.budget_limit
+            for project in arg_min_new_maxload
+        ):
+            alloc = state.budget_allocation
+            alloc.sort()
+            if alloc not in all_budget_allocations:
+                all_budget_allocations.append(alloc)
+            continue
+
+        tied_projects = tie_breaking.order(instance, profile, arg_min_new_maxload)
+        if resoluteness:
+            tied_projects = tied_projects[:1]
+        new_states = [(state.copy(), p) for p in tied_projects[:-1]]
+        new_states.append((state, tied_projects[-1]))
+        for new_state, selected_project in new_states:
+            new_state.select(
+                project_index[selected_project],
+                min_new_maxload,
+                projects,
+                voters,
+                supporters,
+                voter_projects,
+                approval_scores,
+            )
+        states.extend(new_state for new_state, _ in reversed(new_states))
 
     if resoluteness:
         return all_budget_allocations[0]
@@ -1,3 +1,4 @@
+import random
 from unittest import TestCase
 from parameterized import parameterized
 
@@ -7,6 +8,8 @@ from pabutools.analysis.profileproperties import *
 from pabutools.analysis.votersatisfaction import *
 from pabutools.analysis.category import *
 from pabutools.analysis.mesanalytics import *
+from pabutools.analysis.cohesiveness import cohesive_groups
+from pabutools.analysis.justifiedrepresentation import *
 from pabutools.election import CardinalProfile
 from pabutools.election.profile.approvalprofile import (
     ApprovalProfile,
@@ -29,6 +32,75 @@ from pabutools.rules.mes.mes_details import MESProjectDetails
 
 
 class TestAnalysis(TestCase):
+    def test_justified_representation(self):
+        projects = [Project(str(i), 1) for i in range(4)]
+        instance = Instance(projects, budget_limit=4)
+        profile = ApprovalProfile(
+            [ApprovalBallot(projects[:2]) for _ in range(2)]
+            + [ApprovalBallot(projects[2:]) for _ in range(2)]
+        )
+        assert is_EJR_approval(instance, profile, Cardinality_Sat, projects)
+        assert is_PJR_approval(instance, profile, Cardinality_Sat, projects)
+        assert is_strong_EJR_approval(instance, profile, Cardinality_Sat, projects)
+        group, project_set = find_EJR_violation_approval(
+            instance, profile, Cardinality_Sat, projects[:1] + projects[2:]
+        )
+        assert sorted(project_set) == projects[:2]
+        assert group == list(profile[:2])
+        assert find_PJR_violation_approval(
+            instance, profile, Cardinality_Sat, projects[:1] + projects[2:]
+        ) == (list(profile[:2]), projects[:2])
+        assert is_EJR_one_approval(
+            instance, profile, Cardinality_Sat, projects[:1] + projects[2:]
+        )
+
+        card_profile = CardinalProfile(
+            [CardinalBallot({projects[0]: 3, projects[1]: 1}) for _ in range(2)]
+            + [CardinalBallot({projects[2]: 2, projects[3]: 2}) for _ in range(2)]
+        )
+        assert is_EJR_cardinal(instance, card_profile, projects)
+        group, project_set = find_EJR_violation_cardinal(
+            instance, card_profile, projects[1:]
+        )
+        assert group == list(card_profile[:2]) and projects[0] in project_set
+        assert is_PJR_one_cardinal(instance, card_profile, projects[1:])
+
+        # Compare to the enumeration of all the cohesive groups on small random instances
+        rng = random.Random(12)
+        for _ in range(15):
+            projects = [Project(str(i), rng.randint(1, 4)) for i in range(4)]
+            instance = Instance(projects, budget_limit=rng.randint(3, 8))
+            profile = ApprovalProfile(
+                [
+                    ApprovalBallot(rng.sample(projects, rng.randint(1, 3)))
+                    for _ in range(5)
+                ]
+            )
+            allocation = [p for p in projects if rng.random() < 0.4]
+            ejr = all(
+                any(
+                    Cost_Sat(instance, profile, b).sat(allocation)
+                    >= total_cost(project_set)
+                    for b in group
+                )
+                for group, project_set in cohesive_groups(instance, profile)
+            )
+            violation = find_EJR_violation_approval(
+                instance, profile, Cost_Sat, allocation
+            )
+            assert ejr == (violation is None)
+            if violation is not None:
+                group, project_set = violation
+                assert all(set(project_set) <= set(b) for b in group)
+                assert all(
+                    Cost_Sat(instance, profile, b).sat(allocation)
+                    < total_cost(project_set)
+                    for b in group
+                )
+                assert total_cost(project_set) * len(profile) <= (
+                    len(group) * instance.budget_limit
+                )
+
     def test_satisfaction_properties(self):
         projects = [Project(str(i), 10 + i) for i in range(10)]
         instance = Instance(projects, budget_limit=90)
@@ -97,6 +97,10 @@ class TestBallot(TestCase):
             == set(frozen_ballot3)
         )
         assert ballot.name == frozen_ballot2.name == frozen_ballot3.name
+        assert frozen_ballot1 == frozen_ballot2 == frozen_ballot3
+        assert FrozenApprovalBallot([p4, p2, p1, p3]) == frozen_ballot1
+        assert hash(FrozenApprovalBallot([p4, p2, p1, p3])) == hash(frozen_ballot1)
+        assert list(frozen_ballot1) == sorted([p1, p2, p3, p4])
         assert ballot.meta == frozen_ballot2.meta == frozen_ballot3.meta
 
         # Test the random generation of approval ballots
@@ -1,5 +1,9 @@
 from unittest import TestCase
+import random
+
 from pabutools.election.instance import *
+from pabutools.fractions import frac
+from pabutools.utils import powerset
 
 
 class TestInstance(TestCase):
@@ -63,6 +67,15 @@ class TestInstance(TestCase):
         assert total_cost(projects) == 110
         assert max_budget_allocation_cardinality(projects, budget_limit=30) == 5
         assert max_budget_allocation_cost(projects, budget_limit=29) == 28
+        assert max_budget_allocation_cost(projects, budget_limit=200) == 110
+        assert max_budget_allocation_cost([], budget_limit=29) == 0
+        assert max_budget_allocation_score(
+            {p: i % 3 for i, p in enumerate(projects)}, budget_limit=29
+        ) == max(
+            sum(i % 3 for i, p in enumerate(projects) if p in s)
+            for s in powerset(projects)
+            if total_cost(s) <= 29
+        )
         project = Project("p", 10)
         assert project == Project("p", 2)
         assert project == "p"
@@ -78,3 +91,64 @@ class TestInstance(TestCase):
         assert isinstance(project.cost, int)
         project = Project("test", 2.5)
         assert not isinstance(project.cost, float)
+
+    def test_max_budget_allocation_dp(self):
+        import pabutools.election.instance as instance_module
+
+        for seed in range(10):
+            random.seed(seed)
+            projects = [
+                Project("p{}".format(i), random.randint(1, 50) * 1000)
+                for i in range(12)
+            ]
+            budget_limit = random.randint(50, 300) * 1000
+            scores = {p: random.randint(-2, 5) for p in projects}
+            # The subset sum and the ILP agree
+            dp_cost = max_budget_allocation_cost(projects, budget_limit)
+            capacity = instance_module.SUBSET_SUM_MAX_CAPACITY
+            instance_module.SUBSET_SUM_MAX_CAPACITY = -1
+            try:
+                assert dp_cost == max_budget_allocation_cost(projects, budget_limit)
+            finally:
+                instance_module.SUBSET_SUM_MAX_CAPACITY = capacity
+            # Brute force for the scores
+            feasible = [s for s in powerset(projects) if total_cost(s) <= budget_limit]
+            assert max_budget_allocation_score(scores, budget_limit) == max(
+                sum(scores[p] for p in s) for s in feasible
+            )
+            assert dp_cost == max(total_cost(s) for s in feasible)
+
+        # Non-integer costs use the ILP
+        projects = [
+            Project("p1", frac(3, 2)),
+            Project("p2", frac(5, 2)),
+            Project("p3", 2),
+        ]
+        assert max_budget_allocation_cost(projects, 4) == frac(4)
+        assert (
+            max_budget_allocation_score({projects[0]: frac(1, 2), projects[1]: 1}, 3)
+            == 1
+        )
+
+    def test_indexed_instance(self):
+        projects = [Project("p{}".format(i), 1) for i in range(5)]
+        inst = Instance(reversed(projects), budget_limit=3)
+        assert not inst.is_indexed()
+        assert inst.index_projects() == projects
+        assert inst.is_indexed()
+        assert [p.index for p in projects] == list(range(5))
+        # Projects that are not stored in the instance are looked up by name
+        assert inst.project_id(Project("p3", 1)) == 3
+        assert inst.project_id(Project("p7", 1)) is None
+        assert inst.project_ids([projects[4], Project("p1", 1), Project("p7", 1)]) == [
+            1,
+            4,
+        ]
+        assert inst.supporters_by_id(
+            [[projects[0], projects[2]], [projects[2]], []]
+        ) == [[0], [], [0, 1], [], []]
+        # Changing the projects requires re-indexing
+        inst.add(Project("p5", 1))
+        assert not inst.is_indexed()
+        inst.index_projects()
+        assert inst.is_indexed()
@@ -1,8 +1,10 @@
 from unittest import TestCase
 
-from pabutools.election import OrdinalBallot
+from pabutools.election import OrdinalBallot, Instance, ApprovalBallot
 from pabutools.election.pabulib import (
     parse_pabulib,
+    iter_pabulib,
+    load_pabulib_corpus,
     parse_pabulib_from_string,
     parse_pabulib_from_url,
     write_pabulib,
@@ -10,10 +12,17 @@ from pabutools.election.pabulib import (
 )
 
 import os
+import shutil
+import tempfile
 
 from tests.test_class_inheritence import check_members_equality
 
 
+def polish_cardinal_or_approval(meta):
+    # Defined at module level so that it can be pickled when the workers are not forked
+    return meta["country"] == "Poland" and meta["vote_type"] != "ordinal"
+
+
 class TestPabulib(TestCase):
     def test_approval(self):
         contents = """META
@@ -722,3 +731,151 @@ voter_id;age;sex;voting_method;vote
         check_members_equality(profile, profile_out)
         os.remove("test.pb")
         os.remove("test_out.pb")
+
+    def test_iter_pabulib(self):
+        contents = """META
+key;value
+description;Test
+num_projects;3
+num_votes;3
+budget;10
+vote_type;approval
+PROJECTS
+project_id;cost;category
+1;5;education
+2;4;sport
+3;7;None
+VOTES
+voter_id;vote
+1;1,2
+2;3
+
+3;2"""
+        with open("test_iter.pb", "w", encoding="utf-8") as f:
+            f.write(contents)
+        items = iter_pabulib("test_iter.pb")
+        instance = next(items)
+        assert isinstance(instance, Instance)
+        assert instance.budget_limit == 10
+        assert instance.categories == {"education", "sport"}
+        assert instance.file_name == "test_iter.pb"
+        ballots = list(items)
+        assert all(isinstance(ballot, ApprovalBallot) for ballot in ballots)
+        assert [ballot.meta["voter_id"] for ballot in ballots] == ["1", "2", "3"]
+
+        parsed_instance, parsed_profile = parse_pabulib("test_iter.pb")
+        check_members_equality(instance, parsed_instance)
+        assert list(parsed_profile) == ballots
+        assert parse_pabulib_from_string(contents)[1] == parsed_profile
+        os.remove("test_iter.pb")
+
+    def test_parse_as_multiprofile(self):
+        contents = """META
+key;value
+description;Test
+num_projects;3
+num_votes;4
+budget;10
+vote_type;{}
+max_length;2
+PROJECTS
+project_id;cost
+1;5
+2;4
+3;7
+VOTES
+voter_id;vote;points
+1;1,2;2,1
+2;3;1
+3;2,1;1,2
+4;3;1"""
+        for vote_type in ["approval", "scoring", "cumulative", "ordinal"]:
+            file_content = contents.format(vote_type)
+            profile = parse_pabulib_from_string(file_content)[1]
+            instance, multiprofile = parse_pabulib_from_string(
+                file_content, as_multiprofile=True
+            )
+            expected = profile.as_multiprofile()
+            assert type(multiprofile) == type(expected)
+            assert multiprofile.num_ballots() == 4
+            if vote_type == "approval":
+                assert {frozenset(b): m for b, m in multiprofile.items()} == {
+                    frozenset(b): m for b, m in expected.items()
+                }
+            else:
+                assert dict(multiprofile) == dict(expected)
+            assert multiprofile.legal_max_length == 2
+            assert max(multiprofile.values()) == 2
+
+        # Identical approval votes are merged whatever the order in which the projects are listed
+        num_projects = 50
+        project_ids = [str(i) for i in range(num_projects)]
+        votes = [
+            ",".join(project_ids),
+            ",".join(reversed(project_ids)),
+            ",".join(project_ids[::2] + project_ids[1::2]),
+        ]
+        file_content = (
+            "META\nkey;value\nnum_projects;{}\nnum_votes;3\nbudget;100\nvote_type;approval\n"
+            "PROJECTS\nproject_id;cost\n{}\nVOTES\nvoter_id;vote\n{}".format(
+                num_projects,
+                "\n".join(f"{i};1" for i in project_ids),
+                "\n".join(f"{i};{vote}" for i, vote in enumerate(votes)),
+            )
+        )
+        multiprofile = parse_pabulib_from_string(file_content, as_multiprofile=True)[1]
+        assert len(multiprofile) == 1
+        assert multiprofile.num_ballots() == 3
+
+    def test_load_pabulib_corpus(self):
+        contents = """META
+key;value
+description;Test
+country;{}
+num_projects;3
+num_votes;3
+budget;10
+vote_type;{}
+PROJECTS
+project_id;cost
+1;5
+2;4
+3;7
+VOTES
+voter_id;vote;points
+1;1,2;2,1
+2;3;1
+3;2,1;1,2"""
+        folder = tempfile.mkdtemp()
+        elections = {
+            "a.pb": ("Poland", "approval"),
+            "b.pb": ("Poland", "cumulative"),
+            "c.pb": ("France", "approval"),
+            "d.pb": ("Poland", "ordinal"),
+        }
+        for file_name, (country, vote_type) in elections.items():
+            with open(os.path.join(folder, file_name), "w", encoding="utf-8") as f:
+                f.write(contents.format(country, vote_type))
+        for workers in [1, 2]:
+            results = list(load_pabulib_corpus(folder, workers=workers))
+            assert sorted(r[0] for r in results) == sorted(elections)
+            for file_name, instance, profile in results:
+                expected_instance, expected_profile = parse_pabulib(
+                    os.path.join(folder, file_name)
+                )
+                check_members_equality(instance, expected_instance)
+                assert type(profile) == type(expected_profile)
+                assert list(profile) == list(expected_profile)
+
+            results = load_pabulib_corpus(
+                folder,
+                workers=workers,
+                filter=polish_cardinal_or_approval,
+                as_multiprofile=True,
+            )
+            assert sorted(r[0] for r in results) == ["a.pb", "b.pb"]
+        paths = [os.path.join(folder, "c.pb"), os.path.join(folder, "d.pb")]
+        assert sorted(r[0] for r in load_pabulib_corpus(paths)) == ["c.pb", "d.pb"]
+        with self.assertRaises(ValueError):
+            list(load_pabulib_corpus(folder, workers=0))
+        shutil.rmtree(folder)
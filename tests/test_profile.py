@@ -2,6 +2,7 @@
 Module for testing profiles.
 """
 
+import pickle
 from unittest import TestCase
 
 from pabutools.election import (
@@ -28,6 +29,7 @@ from pabutools.election import (
     Profile,
     Ballot,
     MultiProfile,
+    BitsetApprovalProfile,
 )
 from tests.test_class_inheritence import check_members_equality
 
@@ -186,6 +188,97 @@ class TestProfile(TestCase):
         # Test empty constructor
         ApprovalMultiProfile()
 
+        # Identical ballots are merged whatever the order of their projects
+        profile = ApprovalProfile(
+            [ApprovalBallot(projects[:3]), ApprovalBallot(reversed(projects[:3]))]
+            + [ApprovalBallot([projects[9], projects[0]])] * 3
+        )
+        multiprofile = profile.as_multiprofile()
+        assert len(multiprofile) == 2
+        assert multiprofile.total() == 5
+        assert multiprofile[FrozenApprovalBallot(projects[2::-1])] == 2
+        assert multiprofile[FrozenApprovalBallot([projects[0], projects[9]])] == 3
+        multiprofile.extend(
+            [
+                ApprovalBallot([projects[1], projects[0], projects[2]]),
+                FrozenApprovalBallot([projects[9], projects[0]]),
+            ]
+        )
+        assert len(multiprofile) == 2
+        assert multiprofile.total() == 7
+
+        # The validation is done on the distinct ballots
+        with self.assertRaises(TypeError):
+            ApprovalMultiProfile([FrozenCardinalBallot({projects[0]: 1})] * 2)
+        with self.assertRaises(TypeError):
+            multiprofile.extend([CardinalBallot({projects[0]: 1})] * 3)
+        assert multiprofile.total() == 7
+
+    def test_bitset_approval_profile(self):
+        projects = [Project("p" + str(i), cost=i + 1) for i in range(70)]
+        instance = Instance(projects, budget_limit=10)
+        outsider = Project("outsider", cost=1)
+        profile = get_random_approval_profile(instance, 50)
+        profile.append(ApprovalBallot({projects[0], projects[69], outsider}))
+        profile.append(ApprovalBallot())
+
+        for indexed in [False, True]:
+            if indexed:
+                instance.index_projects()
+            bitset = BitsetApprovalProfile(profile)
+            assert len(bitset) == len(profile)
+            assert bitset.num_words() == 2
+            assert bitset.num_ballots() == profile.num_ballots()
+            scores = bitset.approval_scores()
+            for k, project in enumerate(bitset.projects):
+                assert scores[k] == profile.approval_score(project)
+                assert bitset.approval_score(project) == profile.approval_score(project)
+            assert bitset.approval_score(outsider) == 0
+            subset = projects[:3] + projects[65:]
+            for row, ballot in enumerate(profile):
+                assert bitset.row_projects(row) == sorted(
+                    p for p in ballot if p in instance
+                )
+                assert bitset.intersection_sizes(subset)[row] == len(
+                    ballot.intersection(subset)
+                )
+                assert bitset.ballot_lengths()[row] == len(
+                    ballot.intersection(instance)
+                )
+            pair = [projects[0], projects[69]]
+            assert bitset.num_supporters(pair) == sum(
+                1 for ballot in profile if all(p in ballot for p in pair)
+            )
+            assert bitset.num_supporters([]) == len(profile)
+            co_approvals = bitset.co_approval_matrix()
+            for i, p1 in enumerate(bitset.projects[:5]):
+                for j, p2 in enumerate(bitset.projects[60:]):
+                    assert co_approvals[i, 60 + j] == bitset.num_supporters([p1, p2])
+                assert co_approvals[i, i] == scores[i]
+
+        # Conversions, ballots are restricted to the instance
+        restricted = bitset.as_profile()
+        assert len(restricted) == len(profile)
+        assert outsider not in restricted[-2]
+        assert restricted[-2] == {projects[0], projects[69]}
+        multiprofile = bitset.as_multiprofile()
+        assert multiprofile.num_ballots() == len(profile)
+
+        # Multiprofiles keep their multiplicities
+        multiprofile = ApprovalMultiProfile(
+            [FrozenApprovalBallot(projects[:2])] * 3
+            + [FrozenApprovalBallot(projects[1:4])] * 2,
+            instance=instance,
+        )
+        bitset = BitsetApprovalProfile(multiprofile)
+        assert len(bitset) == 2
+        assert bitset.num_ballots() == 5
+        assert bitset.approval_score(projects[1]) == 5
+        assert bitset.approval_score(projects[3]) == 2
+        assert bitset.num_supporters(projects[:2]) == 3
+        assert bitset.as_multiprofile().total() == 5
+        assert len(bitset.as_profile()) == 5
+
     def test_cardinal_profile(self):
         projects = [Project("p" + str(i), cost=2) for i in range(10)]
         instance = Instance(
@@ -483,3 +576,23 @@ class TestProfile(TestCase):
 
         # Test empty constructor
         OrdinalMultiProfile()
+
+    def test_pickle_profiles(self):
+        projects = [Project("p" + str(i), 1) for i in range(3)]
+        instance = Instance(projects)
+        profiles = [
+            ApprovalProfile(
+                [ApprovalBallot(projects[:2], meta={"age": "30"})],
+                instance=instance,
+                legal_max_length=2,
+            ),
+            CardinalProfile([CardinalBallot({projects[0]: 2})], legal_max_score=3),
+            CumulativeProfile([CumulativeBallot({projects[1]: 1})]),
+            OrdinalProfile([OrdinalBallot(projects[::-1])]),
+        ]
+        for profile in profiles:
+            for p in [profile, profile.as_multiprofile()]:
+                new_p = pickle.loads(pickle.dumps(p))
+                assert type(new_p) == type(p)
+                assert new_p == p
+                check_members_equality(new_p, p)
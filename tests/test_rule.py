@@ -1,10 +1,11 @@
+from copy import deepcopy
 from unittest import TestCase
 from parameterized import parameterized
 
 from pabutools.fractions import frac
 from pabutools.rules.budgetallocation import BudgetAllocation
-from pabutools.election.profile import ApprovalProfile
-from pabutools.election.ballot import ApprovalBallot
+from pabutools.election.profile import ApprovalProfile, CardinalProfile
+from pabutools.election.ballot import ApprovalBallot, CardinalBallot
 from pabutools.election.satisfaction import (
     Cost_Sat,
     Cardinality_Sat,
@@ -14,8 +15,10 @@ from pabutools.election.satisfaction import (
     CC_Sat,
     SatisfactionProfile,
     SatisfactionMultiProfile,
+    SatisfactionMatrix,
     Additive_Cost_Sqrt_Sat,
     Additive_Cost_Log_Sat,
+    Additive_Cardinal_Sat,
 )
 from pabutools.election.instance import Project, Instance, total_cost
 from pabutools.rules.budgetallocation import BudgetAllocation
@@ -25,8 +28,17 @@ from pabutools.rules.exhaustion import (
     exhaustion_by_budget_increase,
 )
 from pabutools.rules.greedywelfare import greedy_utilitarian_welfare
-from pabutools.rules.maxwelfare import max_additive_utilitarian_welfare
-from pabutools.rules.mes import method_of_equal_shares
+from pabutools.rules.maxwelfare import (
+    max_additive_utilitarian_welfare,
+    iter_max_additive_utilitarian_welfare,
+    MaxAddUtilWelfareAlgo,
+    knapsack_integer_weights,
+)
+from pabutools.rules.mes import (
+    method_of_equal_shares,
+    method_of_equal_shares_incremental,
+)
+from pabutools.rules.mes.mes_rule import mes_voters_and_projects
 
 
 def mes_iterated(
@@ -490,20 +502,560 @@ class TestRule(TestCase):
                 )
                 assert outcome1 == outcome2
 
+    def test_greedy_restricted_to_ballot(self):
+        class Unrestricted_CC_Sat(CC_Sat):
+            restricted_to_ballot = False
+
+        for test_election in ALL_TEST_ELECTIONS:
+            for resoluteness in [True, False]:
+                outcome1 = greedy_utilitarian_welfare(
+                    test_election.instance,
+                    test_election.profile,
+                    sat_class=CC_Sat,
+                    resoluteness=resoluteness,
+                    initial_budget_allocation=test_election.initial_alloc,
+                )
+                outcome2 = greedy_utilitarian_welfare(
+                    test_election.instance,
+                    test_election.profile.as_multiprofile(),
+                    sat_class=Unrestricted_CC_Sat,
+                    resoluteness=resoluteness,
+                    initial_budget_allocation=test_election.initial_alloc,
+                )
+                assert outcome1 == outcome2
+
+        # Sub-classes overriding the satisfaction do not inherit the flag
+        class Everything_CC_Sat(CC_Sat):
+            def sat(self, projects):
+                return 1 if projects else 0
+
+            def sat_project(self, project):
+                return 1
+
+        assert not Everything_CC_Sat.restricted_to_ballot
+        instance = Instance([Project("a", 1), Project("b", 1), Project("c", 1)])
+        instance.budget_limit = 1
+        a, b, c = (instance.get_project(name) for name in "abc")
+        profile = ApprovalProfile([ApprovalBallot({a}), ApprovalBallot({b})])
+        outcome = greedy_utilitarian_welfare(
+            instance, profile, sat_class=Everything_CC_Sat, resoluteness=False
+        )
+        assert outcome == [[a], [b], [c]]
+
+    def test_greedy_lazy(self):
+        for test_election in ALL_TEST_ELECTIONS:
+            for sat_class in [CC_Sat, Cost_Sqrt_Sat, Cost_Log_Sat]:
+                for profile in [
+                    test_election.profile,
+                    test_election.profile.as_multiprofile(),
+                ]:
+                    outcome = greedy_utilitarian_welfare(
+                        test_election.instance,
+                        profile,
+                        sat_class=sat_class,
+                        initial_budget_allocation=test_election.initial_alloc,
+                    )
+                    lazy_outcome = greedy_utilitarian_welfare(
+                        test_election.instance,
+                        profile,
+                        sat_class=sat_class,
+                        initial_budget_allocation=test_election.initial_alloc,
+                        lazy=True,
+                        analytics=True,
+                    )
+                    assert outcome == lazy_outcome
+                    for details in lazy_outcome.details.projects:
+                        assert details.discarded == (details.project not in outcome)
+
     def test_max_welfare(self):
         run_sat_rule(max_additive_utilitarian_welfare, verbose=False)
         with self.assertRaises(ValueError):
             max_additive_utilitarian_welfare(Instance(), ApprovalProfile())
 
+    def test_max_welfare_dp(self):
+        for test_election in ALL_TEST_ELECTIONS:
+            sat_profile = test_election.profile.as_sat_profile(Cost_Sat)
+            outcome = max_additive_utilitarian_welfare(
+                test_election.instance,
+                test_election.profile,
+                sat_profile=sat_profile,
+                initial_budget_allocation=test_election.initial_alloc,
+                inner_algo=MaxAddUtilWelfareAlgo.ILP_SOLVER,
+            )
+            # Some costs have huge denominators, the dynamic programming is then not used by default
+            auto_outcome = max_additive_utilitarian_welfare(
+                test_election.instance,
+                test_election.profile,
+                sat_profile=sat_profile,
+                initial_budget_allocation=test_election.initial_alloc,
+            )
+            assert total_cost(auto_outcome) <= test_election.instance.budget_limit
+            assert sat_profile.total_satisfaction(
+                auto_outcome
+            ) == sat_profile.total_satisfaction(outcome)
+            assert auto_outcome.details.computation_time >= 0
+
+        assert knapsack_integer_weights([frac(3, 2), 6, frac(9, 4)], 10) == (
+            [2, 8, 3],
+            13,
+        )
+
+        projects = [Project("p" + str(i), (i % 7 + 1) * 10000) for i in range(50)]
+        instance = Instance(projects, budget_limit=10**6)
+        profile = ApprovalProfile(
+            [ApprovalBallot(projects[i : i + 5]) for i in range(50)]
+        )
+        sat_profile = profile.as_sat_profile(Cost_Sat)
+        outcome = max_additive_utilitarian_welfare(
+            instance, profile, sat_profile=sat_profile
+        )
+        assert outcome.details.inner_algo == MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING
+        ilp_outcome = max_additive_utilitarian_welfare(
+            instance,
+            profile,
+            sat_profile=sat_profile,
+            inner_algo=MaxAddUtilWelfareAlgo.ILP_SOLVER,
+        )
+        assert sat_profile.total_satisfaction(
+            outcome
+        ) == sat_profile.total_satisfaction(ilp_outcome)
+        # Irresolute outcomes are also computed by dynamic programming, checked on a small instance with few ties
+        small_projects = [Project("p0", 1), Project("p1", 2), Project("p2", 3)]
+        small_instance = Instance(small_projects, budget_limit=3)
+        small_profile = ApprovalProfile(
+            [ApprovalBallot(small_projects[:2]), ApprovalBallot(small_projects[1:])]
+        )
+        outcome = max_additive_utilitarian_welfare(
+            small_instance, small_profile, sat_class=Cost_Sat, resoluteness=False
+        )
+        assert [sorted(o) for o in outcome] == [[small_projects[0], small_projects[1]]]
+        assert outcome[0].details.inner_algo == MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING
+
+        with self.assertRaises(ValueError):
+            max_additive_utilitarian_welfare(
+                instance,
+                profile,
+                sat_class=Cost_Sat,
+                resoluteness=False,
+                inner_algo=MaxAddUtilWelfareAlgo.PRIMAL_DUAL,
+            )
+
+    def test_max_welfare_tie_enumeration(self):
+        projects = [Project("p" + str(i), 1) for i in range(6)] + [Project("z", 0)]
+        instance = Instance(projects, budget_limit=3)
+        profile = ApprovalProfile([ApprovalBallot(projects[:6])])
+        # Every set of 3 projects among the first 6 is optimal, with or without the project of cost 0
+        allocations = list(
+            iter_max_additive_utilitarian_welfare(
+                instance, profile, sat_class=Cardinality_Sat
+            )
+        )
+        assert len(allocations) == 40
+        assert len({tuple(sorted(a)) for a in allocations}) == 40
+        for allocation in allocations:
+            assert len([p for p in allocation if p.cost == 1]) == 3
+
+        # The enumeration is lazy
+        allocations = iter_max_additive_utilitarian_welfare(
+            instance, profile, sat_class=Cardinality_Sat
+        )
+        assert len(next(allocations)) in (3, 4)
+
+        small_instance = Instance(projects[:4], budget_limit=2)
+        small_profile = ApprovalProfile([ApprovalBallot(projects[:4])])
+        for initial_budget_allocation in [[], [projects[0]]]:
+            dp_outcome = max_additive_utilitarian_welfare(
+                small_instance,
+                small_profile,
+                sat_class=Cardinality_Sat,
+                resoluteness=False,
+                initial_budget_allocation=initial_budget_allocation,
+                inner_algo=MaxAddUtilWelfareAlgo.DYNAMIC_PROGRAMMING,
+            )
+            ilp_outcome = max_additive_utilitarian_welfare(
+                small_instance,
+                small_profile,
+                sat_class=Cardinality_Sat,
+                resoluteness=False,
+                initial_budget_allocation=initial_budget_allocation,
+                inner_algo=MaxAddUtilWelfareAlgo.ILP_SOLVER,
+            )
+            assert sorted(sorted(a) for a in dp_outcome) == sorted(
+                sorted(a) for a in ilp_outcome
+            )
+
+        with self.assertRaises(ValueError):
+            iter_max_additive_utilitarian_welfare(instance, profile)
+
+    def test_satisfaction_matrix(self):
+        # Rules give the same outcome with a satisfaction matrix as with a satisfaction profile
+        for test_election in ALL_TEST_ELECTIONS:
+            for profile in [
+                test_election.profile,
+                test_election.profile.as_multiprofile(),
+            ]:
+                for sat_class in [Cost_Sat, Cardinality_Sat, CC_Sat]:
+                    sat_profile = profile.as_sat_profile(sat_class)
+                    matrix = SatisfactionMatrix(sat_profile, test_election.instance)
+                    for rule, kwargs in [
+                        (method_of_equal_shares, {}),
+                        (method_of_equal_shares, {"backend": "numpy"}),
+                        (greedy_utilitarian_welfare, {}),
+                    ]:
+                        assert rule(
+                            test_election.instance,
+                            profile,
+                            sat_profile=sat_profile,
+                            **kwargs,
+                        ) == rule(
+                            test_election.instance,
+                            profile,
+                            sat_profile=matrix,
+                            **kwargs,
+                        )
+
+    def test_indexed_instance(self):
+        # Rules give the same outcomes on indexed instances
+        for test_election in ALL_TEST_ELECTIONS:
+            instance, profile, initial_alloc = deepcopy(
+                (
+                    test_election.instance,
+                    test_election.profile,
+                    test_election.initial_alloc,
+                )
+            )
+            instance.index_projects()
+            assert instance.is_indexed()
+            for prof, indexed_prof in [
+                (test_election.profile, profile),
+                (test_election.profile.as_multiprofile(), profile.as_multiprofile()),
+            ]:
+                for resoluteness in [True, False]:
+                    assert sequential_phragmen(
+                        test_election.instance,
+                        prof,
+                        resoluteness=resoluteness,
+                        initial_budget_allocation=test_election.initial_alloc,
+                    ) == sequential_phragmen(
+                        instance,
+                        indexed_prof,
+                        resoluteness=resoluteness,
+                        initial_budget_allocation=initial_alloc,
+                    )
+                    for sat_class in [Cost_Sat, Cardinality_Sat, CC_Sat]:
+                        for rule, kwargs in [
+                            (method_of_equal_shares, {}),
+                            (method_of_equal_shares, {"backend": "numpy"}),
+                            (greedy_utilitarian_welfare, {}),
+                        ]:
+                            assert rule(
+                                test_election.instance,
+                                prof,
+                                sat_class=sat_class,
+                                resoluteness=resoluteness,
+                                initial_budget_allocation=test_election.initial_alloc,
+                                **kwargs,
+                            ) == rule(
+                                instance,
+                                indexed_prof,
+                                sat_class=sat_class,
+                                resoluteness=resoluteness,
+                                initial_budget_allocation=initial_alloc,
+                                **kwargs,
+                            )
+
     def test_phragmen(self):
         run_non_sat_rule(sequential_phragmen)
 
+    def test_phragmen_backends(self):
+        for test_election in ALL_TEST_ELECTIONS:
+            for profile in [
+                test_election.profile,
+                test_election.profile.as_multiprofile(),
+            ]:
+                outcome = sequential_phragmen(
+                    test_election.instance,
+                    profile,
+                    initial_budget_allocation=test_election.initial_alloc,
+                )
+                numpy_outcome = sequential_phragmen(
+                    test_election.instance,
+                    profile,
+                    initial_budget_allocation=test_election.initial_alloc,
+                    backend="numpy",
+                )
+                assert isinstance(numpy_outcome, BudgetAllocation)
+                assert outcome == numpy_outcome
+
+        # Long sequences of selections do not hit the recursion limit
+        projects = [Project("p" + str(i), 1) for i in range(2000)]
+        instance = Instance(projects, budget_limit=2000)
+        profile = ApprovalProfile(
+            [ApprovalBallot(projects[i : i + 3]) for i in range(2000)]
+        )
+        for backend in ["python", "numpy"]:
+            outcome = sequential_phragmen(instance, profile, backend=backend)
+            assert len(outcome) == 2000
+
+        with self.assertRaises(ValueError):
+            sequential_phragmen(Instance(), ApprovalProfile(), backend="c")
+        with self.assertRaises(ValueError):
+            sequential_phragmen(
+                Instance(), ApprovalProfile(), resoluteness=False, backend="numpy"
+            )
+
     def test_mes_approval(self):
         run_sat_rule(method_of_equal_shares, verbose=False)
         run_sat_rule(mes_iterated, verbose=False)
         with self.assertRaises(ValueError):
             method_of_equal_shares(Instance(), ApprovalProfile())
 
+    def test_mes_numpy_backend(self):
+        for test_election in ALL_TEST_ELECTIONS:
+            for profile in [
+                test_election.profile,
+                test_election.profile.as_multiprofile(),
+            ]:
+                for sat_class, expected in test_election.irr_results_sat[
+                    method_of_equal_shares
+                ].items():
+                    if expected is None:
+                        continue
+                    for resoluteness in [True, False]:
+                        for increment in [None, frac(1, 10)]:
+                            outcome = method_of_equal_shares(
+                                test_election.instance,
+                                profile,
+                                sat_class=sat_class,
+                                resoluteness=resoluteness,
+                                initial_budget_allocation=test_election.initial_alloc,
+                                voter_budget_increment=increment,
+                            )
+                            numpy_outcome = method_of_equal_shares(
+                                test_election.instance,
+                                profile,
+                                sat_class=sat_class,
+                                resoluteness=resoluteness,
+                                initial_budget_allocation=test_election.initial_alloc,
+                                voter_budget_increment=increment,
+                                backend="numpy",
+                            )
+                            if resoluteness:
+                                assert isinstance(numpy_outcome, BudgetAllocation)
+                                assert outcome == numpy_outcome
+                            else:
+                                assert sorted(sorted(o) for o in outcome) == sorted(
+                                    sorted(o) for o in numpy_outcome
+                                )
+
+        with self.assertRaises(ValueError):
+            method_of_equal_shares(
+                Instance(), ApprovalProfile(), Cost_Sat, backend="numpy", analytics=True
+            )
+        with self.assertRaises(ValueError):
+            method_of_equal_shares(Instance(), ApprovalProfile(), Cost_Sat, backend="c")
+
+    def test_mes_lazy_inner_algo(self):
+        # The analytics path still runs the full scan of the projects, the default one the lazy queue
+        for test_election in ALL_TEST_ELECTIONS:
+            for profile in [
+                test_election.profile,
+                test_election.profile.as_multiprofile(),
+            ]:
+                for sat_class, expected in test_election.irr_results_sat[
+                    method_of_equal_shares
+                ].items():
+                    if expected is None:
+                        continue
+                    for increment in [None, frac(1, 10)]:
+                        outcome = method_of_equal_shares(
+                            test_election.instance,
+                            profile,
+                            sat_class=sat_class,
+                            initial_budget_allocation=test_election.initial_alloc,
+                            voter_budget_increment=increment,
+                        )
+                        scan_outcome = method_of_equal_shares(
+                            test_election.instance,
+                            profile,
+                            sat_class=sat_class,
+                            initial_budget_allocation=test_election.initial_alloc,
+                            voter_budget_increment=increment,
+                            analytics=True,
+                        )
+                        assert outcome == scan_outcome
+
+    def test_mes_merge_identical_voters(self):
+        projects = [Project("p" + str(i), cost=2 + i % 3) for i in range(6)]
+        instance = Instance(projects, budget_limit=8)
+        ballots = [
+            CardinalBallot({projects[0]: 3, projects[1]: 1, projects[4]: 2}),
+            CardinalBallot({projects[1]: 2, projects[2]: 2}),
+            CardinalBallot({projects[3]: 4, projects[5]: 1}),
+            CardinalBallot({projects[0]: 1, projects[5]: 3}),
+        ]
+        profile = CardinalProfile(
+            [CardinalBallot(ballots[i % 4]) for i in range(7)]
+            + [CardinalBallot(ballots[0]) for _ in range(5)],
+            instance=instance,
+        )
+
+        # One voter per distinct satisfaction vector, with the multiplicities summed up
+        voters, mes_projects = mes_voters_and_projects(
+            instance,
+            profile.as_sat_profile(Additive_Cardinal_Sat),
+            frac(instance.budget_limit, len(profile)),
+            BudgetAllocation(),
+            merge_identical_voters=True,
+        )
+        assert len(voters) == 4
+        assert sorted(v.multiplicity for v in voters) == [1, 2, 2, 7]
+        assert [v.index for v in voters] == list(range(4))
+        for project in mes_projects:
+            assert project.total_sat == sum(
+                b.get(project.project, 0) for b in profile
+            )
+
+        # Merging identical voters does not change the outcome
+        for sat_class in [Additive_Cardinal_Sat, Cardinality_Sat]:
+            for resoluteness in [True, False]:
+                outcome = method_of_equal_shares(
+                    instance, profile, sat_class=sat_class, resoluteness=resoluteness
+                )
+                unmerged_outcome = method_of_equal_shares(
+                    instance,
+                    profile,
+                    sat_class=sat_class,
+                    resoluteness=resoluteness,
+                    analytics=True,
+                )
+                multiprofile_outcome = method_of_equal_shares(
+                    instance,
+                    profile.as_multiprofile(),
+                    sat_class=sat_class,
+                    resoluteness=resoluteness,
+                )
+                if resoluteness:
+                    assert outcome == unmerged_outcome == multiprofile_outcome
+                else:
+                    assert sorted(sorted(o) for o in outcome) == sorted(
+                        sorted(o) for o in unmerged_outcome
+                    )
+                    assert sorted(sorted(o) for o in outcome) == sorted(
+                        sorted(o) for o in multiprofile_outcome
+                    )
+
+    def test_mes_irresolute_shared_state(self):
+        # All projects are tied at each round, many branches lead to the same outcome
+        projects = [Project(str(i), 2) for i in range(7)]
+        instance = Instance(projects, budget_limit=7)
+        profile = ApprovalProfile(
+            [ApprovalBallot([projects[i], projects[(i + 1) % 7]]) for i in range(7)]
+        )
+        outcome = method_of_equal_shares(
+            instance, profile, sat_class=Cost_Sat, resoluteness=False
+        )
+        # The analytics still copy the state for each branch
+        copied_outcome = method_of_equal_shares(
+            instance, profile, sat_class=Cost_Sat, resoluteness=False, analytics=True
+        )
+        assert len(outcome) == 7
+        assert sorted(sorted(o) for o in outcome) == sorted(
+            sorted(o) for o in copied_outcome
+        )
+        for budget_allocation in outcome:
+            assert len(budget_allocation) == 3
+
+    def test_mes_incremental(self):
+        for test_election in ALL_TEST_ELECTIONS:
+            for profile in [
+                test_election.profile,
+                test_election.profile.as_multiprofile(),
+            ]:
+                for sat_class, expected in test_election.irr_results_sat[
+                    method_of_equal_shares
+                ].items():
+                    if expected is None:
+                        continue
+                    for increment in [1, frac(1, 10)]:
+                        outcome = method_of_equal_shares(
+                            test_election.instance,
+                            profile,
+                            sat_class=sat_class,
+                            initial_budget_allocation=test_election.initial_alloc,
+                            voter_budget_increment=increment,
+                        )
+                        (
+                            incremental_outcome,
+                            visited_budgets,
+                        ) = method_of_equal_shares_incremental(
+                            test_election.instance,
+                            profile,
+                            increment,
+                            sat_class=sat_class,
+                            initial_budget_allocation=test_election.initial_alloc,
+                        )
+                        assert outcome == incremental_outcome
+                        initial_budget = frac(
+                            test_election.instance.budget_limit, profile.num_ballots()
+                        )
+                        assert visited_budgets[0] == initial_budget
+                        assert visited_budgets == sorted(set(visited_budgets))
+                        for budget in visited_budgets:
+                            num_increments = frac(budget - initial_budget, increment)
+                            assert num_increments.denominator == 1
+
+        projects = [Project("a", 3), Project("b", 3), Project("c", 4)]
+        instance = Instance(projects, budget_limit=8)
+        profile = ApprovalProfile(
+            [
+                ApprovalBallot([projects[0], projects[2]]),
+                ApprovalBallot([projects[1], projects[2]]),
+            ]
+        )
+        outcome, visited_budgets = method_of_equal_shares_incremental(
+            instance, profile, frac(1, 100), sat_class=Cost_Sat
+        )
+        assert outcome == method_of_equal_shares(
+            instance, profile, Cost_Sat, voter_budget_increment=frac(1, 100)
+        )
+        assert len(visited_budgets) < 10
+
+    def test_mes_exact_completion(self):
+        projects = [Project("a", 3), Project("b", 3), Project("c", 4)]
+        instance = Instance(projects, budget_limit=8)
+        profile = ApprovalProfile(
+            [
+                ApprovalBallot([projects[0], projects[2]]),
+                ApprovalBallot([projects[1], projects[2]]),
+            ]
+        )
+        # c is selected at budget 4, a and b become affordable at budget 5
+        outcome, visited_budgets = method_of_equal_shares_incremental(
+            instance, profile, sat_class=Cost_Sat
+        )
+        assert outcome == [projects[2]]
+        assert visited_budgets == [4, 5]
+
+        for test_election in ALL_TEST_ELECTIONS:
+            for sat_class, expected in test_election.irr_results_sat[
+                method_of_equal_shares
+            ].items():
+                if expected is None:
+                    continue
+                outcome, visited_budgets = method_of_equal_shares_incremental(
+                    test_election.instance,
+                    test_election.profile,
+                    sat_class=sat_class,
+                    initial_budget_allocation=test_election.initial_alloc,
+                )
+                assert test_election.instance.is_feasible(outcome)
+                assert visited_budgets == sorted(visited_budgets)
+                assert visited_budgets[0] == frac(
+                    test_election.instance.budget_limit,
+                    test_election.profile.num_ballots(),
+                )
+
     @parameterized.expand([(True,), (False,)])
     def test_iterated_exhaustion(self, exhaustive_stop):
         projects = [
@@ -137,6 +137,12 @@ class TestSatisfaction(TestCase):
                 )
                 total_sat2 = sat_multiprofile.total_satisfaction(list(instance)[:20])
                 assert total_sat1 == total_sat2
+                for sat_prof in [sat_profile, sat_multiprofile]:
+                    totals = sat_prof.total_satisfaction_projects(instance)
+                    for project in instance:
+                        assert totals[project] == sat_prof.total_satisfaction_project(
+                            project
+                        )
 
     def test_cc_sat(self):
         projects = [Project("p" + str(i), cost=2) for i in range(10)]
@@ -307,6 +313,36 @@ class TestSatisfaction(TestCase):
         assert sat_profile[2].sat([]) == 0
         assert sat_profile[3].sat(projects) == 0
 
+    def test_relative_sat_shared_preprocessing(self):
+        instance = get_random_instance(15, 1, 100)
+        profile = get_random_approval_profile(instance, 40)
+        profile.extend(deepcopy(profile))
+        for sat_class in [
+            Relative_Cardinality_Sat,
+            Relative_Cost_Sat,
+            Relative_Cost_Approx_Normaliser_Sat,
+        ]:
+            sat_profile = SatisfactionProfile(
+                instance=instance, profile=profile, sat_class=sat_class
+            )
+            for i in range(40):
+                # Identical approval sets share their precomputed values
+                assert (
+                    sat_profile[i].precomputed_values
+                    is sat_profile[i + 40].precomputed_values
+                )
+                # Which are the same as when the preprocessing is run for the ballot alone
+                assert (
+                    sat_profile[i].precomputed_values
+                    == sat_class(instance, profile, profile[i]).precomputed_values
+                )
+            sat_multiprofile = SatisfactionMultiProfile(
+                instance=instance, profile=profile, sat_class=sat_class
+            )
+            assert sat_multiprofile.total_satisfaction(
+                instance
+            ) == sat_profile.total_satisfaction(instance)
+
     def test_rel_card_unbounded_sat(self):
         projects = [
             Project("p1", 4),
@@ -438,3 +474,66 @@ class TestSatisfaction(TestCase):
 
         with self.assertRaises(ValueError):
             Additive_Borda_Sat(Instance(), ApprovalProfile(), ApprovalBallot())
+
+    def test_satisfaction_matrix(self):
+        instance = get_random_instance(30, 1, 20)
+        profile = get_random_approval_profile(instance, 50)
+        for sat_class in [Cost_Sat, Cardinality_Sat, CC_Sat, Cost_Sqrt_Sat]:
+            sat_profile = SatisfactionProfile(
+                instance=instance, profile=profile, sat_class=sat_class
+            )
+            for sat_prof in [
+                sat_profile,
+                profile.as_multiprofile().as_sat_profile(sat_class),
+            ]:
+                matrix = SatisfactionMatrix(sat_prof)
+                assert matrix.is_sparse
+                assert len(matrix) == len(sat_prof)
+                for project in instance:
+                    assert matrix.total_satisfaction_project(
+                        project
+                    ) == sat_prof.total_satisfaction_project(project)
+                assert matrix.total_satisfaction(
+                    list(instance)[:10]
+                ) == sat_prof.total_satisfaction(list(instance)[:10])
+                indptr, rows, values = matrix.by_project()
+                for k, project in enumerate(matrix.projects):
+                    assert sum(
+                        matrix.multiplicities[i] * v
+                        for i, v in zip(
+                            rows[indptr[k] : indptr[k + 1]],
+                            values[indptr[k] : indptr[k + 1]],
+                        )
+                    ) == sat_prof.total_satisfaction_project(project)
+
+        # Test the constructor from a profile
+        matrix = SatisfactionMatrix(profile=profile, sat_class=Cost_Sat)
+        assert matrix.instance == instance
+        assert matrix.sat_class == Cost_Sat
+        assert len(matrix.row(0)) == len(profile[0])
+        with self.assertRaises(TypeError):
+            SatisfactionMatrix(profile=profile)
+        SatisfactionMatrix().__str__()
+
+        # Cardinal ballots are stored in a dense matrix
+        p = [Project("p" + str(i), 1) for i in range(4)]
+        instance = Instance(p)
+        profile = CardinalProfile(
+            [CardinalBallot({p[0]: 3, p[1]: 1}), CardinalBallot({p[2]: 2, p[0]: 1})],
+            instance=instance,
+        )
+        matrix = SatisfactionMatrix(profile=profile, sat_class=Additive_Cardinal_Sat)
+        assert not matrix.is_sparse
+        assert matrix.total_satisfaction_projects(p) == {
+            p[0]: 4,
+            p[1]: 1,
+            p[2]: 2,
+            p[3]: 0,
+        }
+        assert matrix.row(1) == {p[0]: 1, p[2]: 2}
+        assert matrix.total_satisfaction(p[:2]) == 5
+
+        # Test remove_satisfied
+        reduced = matrix.remove_satisfied({b.name: 3 for b in profile}, [p[0]])
+        assert len(reduced) == 1
+        assert reduced.total_satisfaction_project(p[0]) == 1
@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+from pabutools.election import (
+    save_election,
+    load_election,
+    ApprovalMultiProfile,
+    Cost_Sat,
+)
+from pabutools.election.pabulib import parse_pabulib_from_string
+from pabutools.rules import greedy_utilitarian_welfare
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_save_load_election(self):
+        contents = """META
+key;value
+description;Test
+num_projects;3
+num_votes;4
+budget;21/2
+vote_type;{}
+max_length;2
+PROJECTS
+project_id;cost;category
+1;5;education
+2;7/2;sport,education
+3;7;None
+VOTES
+voter_id;vote;points;age
+1;1,2;2,1;25
+2;3;3/2;None
+3;2,1;1,2;40
+4;3;3/2;31"""
+        for vote_type in ["approval", "scoring", "cumulative", "ordinal"]:
+            instance, profile = parse_pabulib_from_string(contents.format(vote_type))
+            for multi in [False, True]:
+                if multi:
+                    profile = profile.as_multiprofile()
+                save_election(instance, profile, self.path)
+                new_instance, new_profile = load_election(self.path)
+                assert new_instance == instance
+                assert new_instance.budget_limit == instance.budget_limit
+                assert new_instance.meta == instance.meta
+                assert new_instance.project_meta == instance.project_meta
+                assert new_instance.categories == instance.categories
+                for project in new_instance:
+                    other = instance.get_project(project.name)
+                    assert project.cost == other.cost
+                    assert project.categories == other.categories
+                assert type(new_profile) == type(profile)
+                assert new_profile.legal_max_length == profile.legal_max_length
+                if multi:
+                    assert dict(new_profile) == dict(profile)
+                else:
+                    assert list(new_profile) == list(profile)
+                    assert [b.meta for b in new_profile] == [b.meta for b in profile]
+
+        instance, profile = parse_pabulib_from_string(contents.format("approval"))
+        save_election(instance, profile, self.path)
+        new_instance, multiprofile = load_election(self.path, as_multiprofile=True)
+        assert isinstance(multiprofile, ApprovalMultiProfile)
+        assert multiprofile.num_ballots() == 4
+        assert len(multiprofile) == 2
+        assert greedy_utilitarian_welfare(
+            new_instance, multiprofile, sat_class=Cost_Sat
+        ) == greedy_utilitarian_welfare(instance, profile, sat_class=Cost_Sat)
+
+    def test_load_ignores_stale_arrays(self):
+        contents = """META
+key;value
+num_projects;2
+num_votes;2
+budget;10
+vote_type;approval
+PROJECTS
+project_id;cost
+1;5
+2;6
+VOTES
+voter_id;vote
+1;1,2
+2;2,1"""
+        instance, profile = parse_pabulib_from_string(contents)
+        save_election(instance, profile.as_multiprofile(), self.path)
+        save_election(instance, profile, self.path)
+        with open(os.path.join(self.path, "stale.npy"), "w") as f:
+            f.write("not an array")
+        new_instance, new_profile = load_election(self.path)
+        assert list(new_profile) == list(profile)
+        new_instance, multiprofile = load_election(self.path, as_multiprofile=True)
+        assert len(multiprofile) == 1
+        assert multiprofile.num_ballots() == 2